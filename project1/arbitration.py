@@ -0,0 +1,162 @@
+"""
+arbitration.py - Frame-level resolution of the frames contending for the bus.
+
+Frames that start in the same bus cycle are resolved at once, from their
+stuffed bit sequences, with the same rules as ECU.checkBit:
+
+    bits 1-11 (ID)      a recessive bit overwritten by a dominant one loses
+                        the arbitration (LOWER_FRAME_ID), nothing more is sent
+    bits 12- (no ACK)   a bit that differs from the bus is a BIT_ERROR
+    stuffed region      6 equal bits on the bus are a STUFF_ERROR
+    last bit            the transmission is COMPLITED
+
+After an error the ECU sends its 6 bits error flag, which is part of the
+bus traffic seen by the other ECUs. Sequences are packed into ints, the bus
+is the AND of every sequence (recessive after its end) and each iteration
+jumps straight to the first position where a rule applies to some ECU, so
+the cost depends on the number of events, not on the number of bits.
+"""
+
+from frame import Frame
+from bit_codec import packBits
+
+# Transmission status, same values as the ECU constants
+COMPLITED = "COMPLITED"
+BIT_ERROR = "BIT_ERROR"
+STUFF_ERROR = "STUFF_ERROR"
+LOWER_FRAME_ID = "LOWER_FRAME_ID"
+
+_ID_FIRST = 1  # first bit of the arbitration field
+_ID_LAST = 11  # last bit of the arbitration field
+
+
+def arbitrationKey(bits) -> int:
+    """
+    Get the priority of a frame on the bus.
+
+    ECU.checkBit handles the stuffed bits 1-11 as arbitration field, so the
+    frames whose first 12 stuffed bits are not the lowest lose the arbitration
+    before any other rule applies and never affect the bus.
+
+    Args:
+        bits (tuple): Stuffed frame bits.
+
+    Returns:
+        int: The first 12 stuffed bits as an int, the lowest wins.
+    """
+
+    key = 0
+    for bit in bits[:_ID_LAST + 1]:
+        key = (key << 1) | bit
+    return key
+
+
+def _positions(first: int, last: int, length: int) -> int:
+    """
+    Mask selecting the positions first..last (inclusive) of a length bits MSB-first int.
+
+    Args:
+        first (int): First position.
+        last (int): Last position.
+        length (int): Number of bits of the int.
+
+    Returns:
+        int: The mask, 0 if the range is empty.
+    """
+
+    last = min(last, length - 1)
+    if first > last:
+        return 0
+    return ((1 << (last - first + 1)) - 1) << (length - 1 - last)
+
+
+def resolveContention(transmissions: list) -> tuple:
+    """
+    Resolve the frames that start on the bus in the same cycle.
+
+    Args:
+        transmissions (list): (bits, errorFlag) per ECU: the stuffed frame bits and
+                              the error flag the ECU sends after an error.
+
+    Returns:
+        tuple: (busBits, outcomes) with the list of bits seen on the bus and, per ECU,
+               (status, lastIndex): the transmission status (as returned by
+               ECU.checkBit) and the bus position of the last bit sent by the ECU.
+    """
+
+    sequences = []  # (value, length) sent by each ECU, updated when an outcome is known
+    masks = []  # (positions checked against the bus, stuffed region, last bit) over the frame length
+    outcomes = [None] * len(transmissions)
+    for bits, _ in transmissions:
+        frameEnd = len(bits)
+        ackSlot = frameEnd - Frame.ACK_OFFSET
+        sequences.append(packBits(list(bits)))
+        masks.append((
+            _positions(_ID_FIRST, frameEnd - 1, frameEnd) & ~_positions(ackSlot, ackSlot, frameEnd),
+            _positions(0, frameEnd - Frame.TAIL_LENGTH - 1, frameEnd),
+            1,
+        ))
+
+    active = list(range(len(transmissions)))
+    while active:
+        length = max(sequenceLength for _, sequenceLength in sequences)
+        full = (1 << length) - 1
+
+        # Wired AND, a sequence is recessive after its end
+        bus = full
+        for value, sequenceLength in sequences:
+            bus &= (value << (length - sequenceLength)) | ((1 << (length - sequenceLength)) - 1)
+
+        # Positions that end a run of 6 equal bits on the bus
+        ones = bus
+        zeros = ~bus & full
+        for shift in range(1, 6):
+            ones &= bus >> shift
+            zeros &= ~(bus >> shift)
+        runs = (ones | zeros) & ~_positions(0, 4, length)
+
+        # First position where a rule applies, for each active ECU
+        events = {}
+        for k in active:
+            value, sequenceLength = sequences[k]  # an active ECU still sends its whole frame
+            checked, stuffed, last = masks[k]
+            candidates = ((value ^ (bus >> (length - sequenceLength))) & checked) | (runs >> (length - sequenceLength)) & stuffed | last
+            events[k] = sequenceLength - candidates.bit_length()
+
+        position = min(events.values())
+        still = []
+        for k in active:
+            if events[k] != position:
+                still.append(k)
+                continue
+
+            bits, errorFlag = transmissions[k]
+            busBit = (bus >> (length - 1 - position)) & 1
+            if _ID_FIRST <= position <= _ID_LAST and bits[position] > busBit:
+                status = LOWER_FRAME_ID
+            elif position > _ID_LAST and position != len(bits) - Frame.ACK_OFFSET and bits[position] != busBit:
+                status = BIT_ERROR
+            elif position < len(bits) - Frame.TAIL_LENGTH and (runs >> (length - 1 - position)) & 1:
+                status = STUFF_ERROR
+            else:
+                outcomes[k] = (COMPLITED, position)
+                continue
+
+            # The ECU stops after this bit, followed by its error flag in case of an error
+            value, sequenceLength = sequences[k]
+            value >>= sequenceLength - position - 1
+            sequenceLength = position + 1
+            if status != LOWER_FRAME_ID:
+                flagValue, flagLength = packBits(list(errorFlag))
+                value = (value << flagLength) | flagValue
+                sequenceLength += flagLength
+            sequences[k] = (value, sequenceLength)
+            outcomes[k] = (status, sequenceLength - 1)
+        active = still
+
+    # Final bus traffic
+    length = max(sequenceLength for _, sequenceLength in sequences)
+    bus = (1 << length) - 1
+    for value, sequenceLength in sequences:
+        bus &= (value << (length - sequenceLength)) | ((1 << (length - sequenceLength)) - 1)
+    return [(bus >> (length - 1 - i)) & 1 for i in range(length)], outcomes
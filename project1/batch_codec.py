@@ -0,0 +1,247 @@
+"""
+batch_codec.py - Vectorized encoder/decoder for many CAN frames at once.
+
+Frames are stored as rows of a zero padded uint8 bit matrix together with
+an array holding the number of valid bits of each row. The stuffing rule
+is applied with a column sweep: every step processes one bit position of
+all the frames with NumPy operations, so the Python loop runs once per
+bit position (at most ~100) instead of once per bit of the trace.
+
+The rules are the same used by Frame.getBits and Frame.fromBits, including
+the CRC-15, computed with the same byte-wise lookup table.
+"""
+
+import numpy as np
+from bit_codec import CRC15_TABLE
+
+STUFF_LIMIT = 5  # 5 consecutive bits of the same value require a stuff bit
+
+# Unstuffed frame layout: SOF (1) + ID (11) + DLC (4) + Data (0-64) + CRC (15) + tail (10)
+ID_START = 1
+DLC_START = 12
+DATA_START = 16
+CRC_LENGTH = 15
+TAIL_LENGTH = 10  # CRC delimiter, ACK slot, ACK delimiter, EOF (7), never stuffed
+ACK_SLOT = 1  # Position of the ACK slot in the tail
+MAX_REGION = DATA_START + 64 + CRC_LENGTH  # Longest stuffed region (SOF to CRC)
+
+CRC15_TABLE = np.array(CRC15_TABLE, dtype=np.int64)
+
+
+def crcMany(data: np.ndarray, byteLengths: np.ndarray) -> np.ndarray:
+    """
+    Compute the CRC-15 of many byte sequences, one table lookup per byte column.
+
+    Args:
+        data (np.ndarray): Bytes padded with zeros, shape (N, M).
+        byteLengths (np.ndarray): Number of bytes covered by the CRC in each row, shape (N,).
+
+    Returns:
+        np.ndarray: 15-bit CRC of each row, shape (N,).
+    """
+
+    crc = np.zeros(data.shape[0], dtype=np.int64)
+    for column in range(data.shape[1]):
+        updated = ((crc << 8) & 0x7FFF) ^ CRC15_TABLE[((crc >> 7) ^ data[:, column]) & 0xFF]
+        crc = np.where(column < byteLengths, updated, crc)
+    return crc
+
+
+def encodeFields(ids: np.ndarray, dlcs: np.ndarray, data: np.ndarray, dataLengths: np.ndarray) -> tuple:
+    """
+    Build the unstuffed bit matrix of many frames, from SOF to CRC.
+
+    Args:
+        ids (np.ndarray): Frame identifiers, shape (N,).
+        dlcs (np.ndarray): Data Length Codes, shape (N,).
+        data (np.ndarray): Data bytes padded with zeros, shape (N, 8).
+        dataLengths (np.ndarray): Number of data bytes of each frame, shape (N,).
+
+    Returns:
+        tuple: (bits, lengths), bit matrix of shape (N, 95) and number of bits of each row.
+    """
+
+    count = len(ids)
+    bits = np.zeros((count, MAX_REGION), dtype=np.uint8)
+
+    # SOF is dominant (0), ID and DLC MSB first
+    bits[:, ID_START:DLC_START] = (ids[:, None] >> np.arange(10, -1, -1)) & 1
+    bits[:, DLC_START:DATA_START] = (dlcs[:, None] >> np.arange(3, -1, -1)) & 1
+
+    # Data bytes, the padding bytes are zero so only the CRC must be placed
+    data = data.astype(np.uint8)
+    bits[:, DATA_START:DATA_START + 64] = np.unpackbits(data, axis=1)
+
+    # SOF, ID and DLC are exactly 2 bytes, so the CRC input is byte aligned
+    header = (ids << 4) | dlcs
+    crcInput = np.column_stack(((header >> 8) & 0xFF, header & 0xFF, data))
+    crc = crcMany(crcInput, 2 + dataLengths)
+    crcStart = DATA_START + 8 * dataLengths
+    np.put_along_axis(bits, crcStart[:, None] + np.arange(CRC_LENGTH), (crc[:, None] >> np.arange(14, -1, -1)) & 1, axis=1)
+
+    return bits, crcStart + CRC_LENGTH
+
+
+def stuffMatrix(bits: np.ndarray, lengths: np.ndarray) -> tuple:
+    """
+    Apply bit stuffing to every row of a bit matrix.
+
+    Args:
+        bits (np.ndarray): Unstuffed bits padded with zeros, shape (N, M).
+        lengths (np.ndarray): Number of valid bits of each row, shape (N,).
+
+    Returns:
+        tuple: (stuffed, stuffedLengths), stuffed bit matrix and number of bits of each row.
+    """
+
+    count, width = bits.shape
+    columns = np.ascontiguousarray(bits.T, dtype=np.int8)  # one contiguous array per bit position
+    # Work on the transposed output so that each step writes almost contiguous memory,
+    # there is at most one stuff bit every 4 bits after the first one, plus a scratch row
+    stuffed = np.zeros((width + (width - 1) // 4 + 2, count), dtype=np.uint8)
+    flat = stuffed.reshape(-1)
+
+    lastBit = np.full(count, 2, dtype=np.int8)  # 2 means no previous bit
+    run = np.zeros(count, dtype=np.int8)
+    position = np.arange(count, dtype=np.int64)  # flat index of the next output bit of every frame
+
+    # Sweep the bit positions, tracking the run length of every frame
+    for column in range(width):
+        bit = columns[column]
+        active = column < lengths
+        run = (bit == lastBit) * run + 1
+        stuff = (run == STUFF_LIMIT) & active
+
+        # Rows past their length write a padding 0 at their end, which is harmless
+        flat[position] = bit
+        position += active * count
+        # Frames without a stuff bit write 0 where their next bit will be written
+        flat[position] = stuff * (1 - bit)
+        position += stuff * count
+
+        lastBit = bit ^ stuff  # the stuff bit becomes the last bit
+        run -= (STUFF_LIMIT - 1) * stuff  # and starts a new run of 1
+
+    stuffedLengths = position // count
+    return np.ascontiguousarray(stuffed[:max(int(stuffedLengths.max(initial=0)), 1)].T), stuffedLengths
+
+
+def appendTail(bits: np.ndarray, lengths: np.ndarray) -> tuple:
+    """
+    Append the fixed-form tail (delimiters, recessive ACK slot and EOF) to stuffed frames.
+
+    Args:
+        bits (np.ndarray): Stuffed bits padded with zeros, shape (N, M).
+        lengths (np.ndarray): Number of valid bits of each row, shape (N,).
+
+    Returns:
+        tuple: (frames, lengths), bit matrix with the tail and number of bits of each row.
+    """
+
+    count, width = bits.shape
+    frames = np.zeros((count, width + TAIL_LENGTH), dtype=np.uint8)
+    frames[:, :width] = bits
+    columns = np.arange(width + TAIL_LENGTH)
+    frames |= ((columns >= lengths[:, None]) & (columns < (lengths + TAIL_LENGTH)[:, None])).astype(np.uint8)
+    return frames, lengths + TAIL_LENGTH
+
+
+def destuffMatrix(bits: np.ndarray, lengths: np.ndarray) -> tuple:
+    """
+    Remove bit stuffing from every row of a bit matrix.
+
+    Stuffing is removed from SOF to CRC, the region length is known once the
+    DLC of each row has been de-stuffed. The bits after it are kept as is.
+
+    Args:
+        bits (np.ndarray): Stuffed frames padded with zeros, shape (N, M).
+        lengths (np.ndarray): Number of valid bits of each row, shape (N,).
+
+    Returns:
+        tuple: (unstuffed, unstuffedLengths, stuffErrors), de-stuffed bit matrix, number
+               of bits of each row and True for the rows that violate the stuffing rule.
+    """
+
+    count, width = bits.shape
+    columns = np.ascontiguousarray(bits.T, dtype=np.int8)
+    unstuffed = np.zeros((width + 1, count), dtype=np.uint8)  # transposed output plus a scratch row
+    flat = unstuffed.reshape(-1)
+
+    lastBit = np.full(count, 2, dtype=np.int8)
+    run = np.zeros(count, dtype=np.int8)
+    position = np.arange(count, dtype=np.int64)
+    produced = np.zeros(count, dtype=np.int64)  # de-stuffed bits of each row
+    header = np.zeros(count, dtype=np.int64)  # SOF, ID and DLC
+    regionEnd = np.full(count, np.iinfo(np.int64).max)  # unknown until the DLC is decoded
+    stuffing = np.ones(count, dtype=bool)
+    stuffErrors = np.zeros(count, dtype=bool)
+
+    for column in range(width):
+        bit = columns[column]
+        active = column < lengths
+        skip = stuffing & (run == STUFF_LIMIT) & active  # the bit after 5 equal bits is a stuff bit
+        stuffErrors |= skip & (bit == lastBit)
+        keep = active & ~skip
+
+        # Dropped bits write 0 where the next kept bit will be written
+        flat[position] = bit * keep
+        position += keep * count
+        produced += keep
+
+        # Decode the DLC to know where the stuffed region ends
+        inHeader = keep & (produced <= DATA_START)
+        header = np.where(inHeader, (header << 1) | bit, header)
+        regionEnd = np.where(inHeader & (produced == DATA_START),
+                             DATA_START + 8 * np.minimum(header & 0xF, 8) + CRC_LENGTH, regionEnd)
+
+        run = (bit == lastBit) * run + 1  # a stuff bit starts a new run
+        lastBit = bit
+        # Stop after the region, unless a stuff bit follows its last bit
+        stuffing &= ~((produced >= regionEnd) & (run != STUFF_LIMIT))
+
+    return np.ascontiguousarray(unstuffed[:width].T), position // count, stuffErrors
+
+
+def decodeFields(bits: np.ndarray, lengths: np.ndarray, stuffErrors: np.ndarray) -> tuple:
+    """
+    Decode and validate the fields of many de-stuffed frames.
+
+    Args:
+        bits (np.ndarray): De-stuffed frames padded with zeros, shape (N, M).
+        lengths (np.ndarray): Number of valid bits of each row, shape (N,).
+        stuffErrors (np.ndarray): True for the rows that violate the stuffing rule, shape (N,).
+
+    Returns:
+        tuple: (ids, dlcs, data, valid), with data of shape (N, 8) and valid
+               True for the rows accepted by Frame.fromBits.
+    """
+
+    count = bits.shape[0]
+    # Pad so that every field can be gathered even from short rows
+    padded = np.zeros((count, max(bits.shape[1], MAX_REGION + TAIL_LENGTH)), dtype=np.uint8)
+    padded[:, :bits.shape[1]] = bits
+
+    ids = padded[:, ID_START:DLC_START].astype(np.int64) @ (1 << np.arange(10, -1, -1))
+    dlcs = padded[:, DLC_START:DATA_START].astype(np.int64) @ (1 << np.arange(3, -1, -1))
+    dataLengths = np.minimum(dlcs, 8)
+
+    # The whole frame must be present, CRC and tail position depend on the DLC
+    crcStart = DATA_START + 8 * dataLengths
+    tailStart = crcStart + CRC_LENGTH
+    valid = ~stuffErrors & (dlcs <= 8) & (lengths >= tailStart + TAIL_LENGTH)
+
+    # Delimiters and EOF must be recessive, the ACK slot can be either value
+    tail = np.take_along_axis(padded, tailStart[:, None] + np.arange(TAIL_LENGTH), axis=1)
+    tail[:, ACK_SLOT] = 1
+    valid &= tail.all(axis=1)
+
+    # Validate CRC
+    crcInput = np.packbits(padded[:, :DATA_START + 64], axis=1)
+    crc = np.take_along_axis(padded, crcStart[:, None] + np.arange(CRC_LENGTH), axis=1).astype(np.int64) @ (1 << np.arange(14, -1, -1))
+    valid &= crcMany(crcInput, 2 + dataLengths) == crc
+
+    # Data bytes, bytes past the DLC are cleared
+    data = crcInput[:, 2:]
+    data[np.arange(8) >= dataLengths[:, None]] = 0
+
+    return ids, dlcs, data, valid
@@ -0,0 +1,339 @@
+"""
+benchmark.py - Benchmark suite of the simulator hot paths, with JSON baselines.
+
+Each benchmark runs warm-up rounds first (caches, interned frames, the
+first allocation of the buffers), then timed repetitions; the median and
+the best repetition are reported with their spread. The suite covers:
+
+    getBits / fromBits      Frame codec throughput, frames per second
+    process                 CanBus.process bus cycles per second, driven
+                            with the bits of random frames
+    sim-2 / sim-10 / sim-100
+                            end-to-end bus cycles per wall second, with 2,
+                            10 and 100 ECUs sending periodic frames in
+                            virtual time (bit level, as main.py)
+    busOff                  wall time per attack of main.py, from its start
+                            until the Victim enters BUS_OFF, in virtual time
+
+The cycles/s of process and sim-N count the same thing: the bus cycles
+simulated one at a time (the CanBus.process calls), that is the bits of the
+frames and the idle cycles. The background frames of the simulation are
+fast-forwarded in a single step (see CanBus) and are not counted.
+
+Timings depend on the host, so the baseline file stores the results under
+a key of the host (name, machine and Python version) and is not part of
+the repository. Run the suite with --save to record the baseline of this
+host, and with --compare to print the change of each benchmark against it
+and exit with status 1 on a regression. A slowdown is a regression when it
+exceeds SIGMAS standard errors of the difference of the two medians,
+estimated from the spread of the rounds of both runs (and at least
+MIN_TOLERANCE):
+
+    python benchmark.py --save
+    python benchmark.py --compare
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import platform
+import statistics
+
+from frame import Frame
+from can_bus import CanBus
+from engine import VirtualClock
+from simulation import Simulation
+
+WARMUP = 1  # Untimed rounds before the repetitions
+REPEAT = 5  # Timed repetitions
+SIGMAS = 3.0  # Standard errors of the difference of the medians a slowdown must exceed to be a regression
+MIN_TOLERANCE = 0.05  # Smallest relative slowdown reported as a regression
+BASELINE_FILE = "benchmark_baseline.json"  # Baselines of each host, not committed
+CLOCK = 0.003  # Clock period of main.py, in seconds
+PERIOD = 7  # Victim period of main.py
+FRAMES = 2000  # Random frames of the codec and bus benchmarks
+SIMULATED_TICKS = 30000  # Clock ticks of the end-to-end benchmarks (10000 bus cycles)
+ECU_COUNTS = [2, 10, 100]  # ECUs of the end-to-end benchmarks
+ATTACKS = 5  # Attacks per round of the busOff benchmark
+
+
+def measure(function, warmup: int = WARMUP, repeat: int = REPEAT) -> dict:
+    """
+    Time a function after warm-up rounds.
+
+    Args:
+        function (callable): Runs one round and returns the work done (frames, bits, ...).
+        warmup (int): Untimed rounds.
+        repeat (int): Timed rounds.
+
+    Returns:
+        dict: Work per round and the median, best and standard deviation of the round times in seconds.
+    """
+
+    for _ in range(warmup):
+        function()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        work = function()
+        times.append(time.perf_counter() - start)
+    return {
+        "work": work,
+        "median": statistics.median(times),
+        "best": min(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+    }
+
+
+def randomFrames(count: int, seed: int = 0) -> list:
+    """
+    Build random frames of any DLC, always the same for a seed.
+
+    Args:
+        count (int): Number of frames.
+        seed (int): Seed of the generator.
+
+    Returns:
+        list: (ID, DLC, data) tuples.
+    """
+
+    rng = random.Random(seed)
+    frames = []
+    for _ in range(count):
+        dlc = rng.randint(0, 8)
+        frames.append((rng.randint(0, 0b11111111111), dlc, [rng.randint(0, 255) for _ in range(dlc)]))
+    return frames
+
+
+def processedCycles(canBus: 'CanBus') -> int:
+    """
+    Count the bus cycles simulated one at a time, the unit of the cycles/s benchmarks.
+
+    Args:
+        canBus (CanBus): Bus at the end of a round.
+
+    Returns:
+        int: Ticks of the bus without the fast-forwarded background frames.
+    """
+
+    return canBus.getTick() - canBus.getBackgroundFrames() * canBus.getBackgroundBits()
+
+
+def hostKey() -> str:
+    """Key of the baselines of this host: name, machine and Python version."""
+    return f"{platform.node()}/{platform.machine()}/python-{platform.python_version()}"
+
+
+def benchmarkGetBits() -> callable:
+    """Frame.getBits: frames encoded per round."""
+    frames = randomFrames(FRAMES)
+
+    def run():
+        for ID, dlc, data in frames:
+            Frame(ID, dlc, data).getBits()
+        return len(frames)
+    return run
+
+
+def benchmarkFromBits() -> callable:
+    """Frame.fromBits: frames decoded per round."""
+    encoded = [Frame(*frame).getBits() for frame in randomFrames(FRAMES)]
+
+    def run():
+        for bits in encoded:
+            Frame.fromBits(bits)
+        return len(encoded)
+    return run
+
+
+def benchmarkProcess() -> callable:
+    """CanBus.process: bus cycles per round, a bit and the end of frame as in the simulation."""
+    encoded = [Frame(*frame).getBits() for frame in randomFrames(FRAMES)]
+
+    def run():
+        canBus = CanBus(VirtualClock(CLOCK), idleGap=None)  # no background frames, only the bits of the frames
+        transmitBit, process = canBus.transmitBit, canBus.process
+        for bits in encoded:
+            for bit in bits:
+                transmitBit(bit)
+                process()
+            process()  # WAIT -> IDLE, end of the frame
+        return processedCycles(canBus)
+    return run
+
+
+def benchmarkSimulation(ecus: int) -> callable:
+    """End-to-end simulation of periodic traffic: bus cycles simulated per round."""
+    rng = random.Random(ecus)
+    IDs = rng.sample(range(0b11111111111 + 1), ecus)  # distinct IDs, the traffic has no errors
+    configuration = []
+    for ID in IDs:
+        dlc = rng.randint(1, 4)
+        configuration.append((rng.randint(PERIOD, PERIOD * 3), Frame(ID, dlc, [rng.randint(0, 255) for _ in range(dlc)])))
+
+    def run():
+        simulation = Simulation(CLOCK, verbose=False)
+        for i, (period, frame) in enumerate(configuration):
+            simulation.addECU(f"ECU{i+1}", period, frame)
+        simulation.run(SIMULATED_TICKS)
+        return processedCycles(simulation.canBus)
+    return run
+
+
+def benchmarkBusOff() -> callable:
+    """Attacks of main.py in virtual time: attacks run until the Victim enters BUS_OFF per round."""
+
+    def run():
+        for _ in range(ATTACKS):  # a single attack is too short to time reliably
+            simulation = Simulation(CLOCK, verbose=False)
+            simulation.addAttackScenario(PERIOD)
+            busOffECU = simulation.run()
+            assert busOffECU is not None and busOffECU.name == "Victim"
+        return ATTACKS
+    return run
+
+
+# name -> (setup returning the round function, unit of the value, work per second reported (else seconds per work))
+BENCHMARKS = {
+    "getBits": (benchmarkGetBits, "frames/s", True),
+    "fromBits": (benchmarkFromBits, "frames/s", True),
+    "process": (benchmarkProcess, "cycles/s", True),
+    **{f"sim-{ecus}": (lambda ecus=ecus: benchmarkSimulation(ecus), "cycles/s", True) for ecus in ECU_COUNTS},
+    "busOff": (benchmarkBusOff, "s/attack", False),
+}
+
+
+def runSuite(names: list = None, warmup: int = WARMUP, repeat: int = REPEAT, verbose: bool = True) -> dict:
+    """
+    Run benchmarks.
+
+    Args:
+        names (list, optional): Benchmarks to run (default: all of BENCHMARKS).
+        warmup (int): Untimed rounds of each benchmark.
+        repeat (int): Timed rounds of each benchmark.
+        verbose (bool): Print each result as it is measured.
+
+    Returns:
+        dict: Environment and, per benchmark, its value (median throughput, or median time per unit
+              of work for a duration), unit, whether higher is better, and the raw measure.
+    """
+
+    results = {}
+    for name in names or BENCHMARKS:
+        setup, unit, throughput = BENCHMARKS[name]
+        timing = measure(setup(), warmup, repeat)
+        value = timing["work"] / timing["median"] if throughput else timing["median"] / timing["work"]
+        results[name] = {"value": value, "unit": unit, "higherIsBetter": throughput, **timing}
+        if verbose:
+            spread = timing["stdev"] / timing["median"] if timing["median"] else 0.0
+            print(f"{name:<9} {value:>14,.3f} {unit:<9} (median of {repeat}, best {timing['best']:.4f} s, ±{spread:.1%})")
+
+    return {
+        "host": hostKey(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "warmup": warmup,
+        "repeat": repeat,
+        "benchmarks": results,
+    }
+
+
+def threshold(result: dict, reference: dict, repeat: int, baselineRepeat: int, sigmas: float = SIGMAS) -> float:
+    """
+    Get the relative slowdown above which a benchmark regressed.
+
+    The standard error of a median of n rounds is about 1.25 stdev / sqrt(n); the errors of
+    the two medians add up in quadrature.
+
+    Args:
+        result (dict): Current measure of the benchmark.
+        reference (dict): Baseline measure of the benchmark.
+        repeat (int): Timed rounds of the current measure.
+        baselineRepeat (int): Timed rounds of the baseline measure.
+        sigmas (float): Standard errors of the difference allowed.
+
+    Returns:
+        float: Relative slowdown, at least MIN_TOLERANCE.
+    """
+
+    def error(measure, rounds):
+        return 1.2533 * measure["stdev"] / measure["median"] / math.sqrt(rounds) if measure["median"] else 0.0
+
+    return max(sigmas * math.hypot(error(result, repeat), error(reference, baselineRepeat)), MIN_TOLERANCE)
+
+
+def compare(results: dict, baseline: dict, sigmas: float = SIGMAS) -> list:
+    """
+    Compare results with a baseline of the same host.
+
+    Args:
+        results (dict): Returned by runSuite.
+        baseline (dict): Returned by runSuite (loaded from the baseline file).
+        sigmas (float): Standard errors of the difference of the medians a slowdown must exceed.
+
+    Returns:
+        list: Names of the benchmarks that regressed.
+    """
+
+    regressions = []
+    print(f"{'Benchmark':<9} | {'Baseline':>14} | {'Current':>14} | {'Speedup':>7} | {'Limit':>6}")
+    for name, result in results["benchmarks"].items():
+        reference = baseline["benchmarks"].get(name)
+        if reference is None:
+            print(f"{name:<9} | {'-':>14} | {result['value']:>14,.3f} | {'new':>7} | {'-':>6}")
+            continue
+        # > 1 when faster, for the throughputs and the durations alike
+        speedup = result["value"] / reference["value"] if result["higherIsBetter"] else reference["value"] / result["value"]
+        limit = threshold(result, reference, results["repeat"], baseline["repeat"], sigmas)
+        regressed = speedup < 1 - limit
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<9} | {reference['value']:>14,.3f} | {result['value']:>14,.3f} | {speedup:>6.2f}x | "
+              f"{-limit:>6.0%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark suite of the CAN bus simulator.")
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run among {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--warmup", type=int, default=WARMUP, help="untimed rounds of each benchmark")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="timed rounds of each benchmark")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="JSON file of the baselines of each host")
+    parser.add_argument("--save", action="store_true", help="record the results as the baseline of this host")
+    parser.add_argument("--compare", action="store_true",
+                        help="compare the results with the baseline of this host, exit status 1 on a regression")
+    parser.add_argument("--sigmas", type=float, default=SIGMAS,
+                        help="standard errors of the difference of the medians a slowdown must exceed")
+    arguments = parser.parse_args()
+    for name in arguments.names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark: {name}")
+    if arguments.repeat < 2:
+        parser.error("--repeat must be at least 2 to measure the spread of the rounds")
+
+    baselines = {}
+    if os.path.exists(arguments.baseline):
+        with open(arguments.baseline) as file:
+            baselines = json.load(file)
+    baseline = baselines.get(hostKey())
+    if arguments.compare and baseline is None:
+        parser.error(f"no baseline of {hostKey()} in {arguments.baseline}, record one with --save")
+
+    results = runSuite(arguments.names, arguments.warmup, arguments.repeat)
+
+    if arguments.compare:
+        print()
+        regressions = compare(results, baseline, arguments.sigmas)
+
+    if arguments.save:
+        baselines[hostKey()] = results
+        with open(arguments.baseline, "w") as file:
+            json.dump(baselines, file, indent=2)
+            file.write("\n")
+
+    if arguments.compare and regressions:
+        sys.exit(1)
@@ -0,0 +1,161 @@
+"""
+benchmark_codec.py - Micro-benchmark of the Frame encoder/decoder.
+
+Compares the packed codec used by Frame.getBits/Frame.fromBits with the
+original string/list based implementation (kept below as reference, with the
+CRC and tail added so that both produce the same frames) and
+prints the throughput of both in frames per second.
+"""
+
+import random
+import timeit
+
+from frame import Frame
+
+FRAMES = 2000  # Number of random frames encoded/decoded per run
+REPEAT = 5  # Number of runs, the best one is reported
+
+
+def legacyCrc(bits: list) -> list:
+    """
+    Bit-by-bit CRC-15, as it would be written on top of the bit list representation.
+
+    Args:
+        bits (list): Bits covered by the CRC.
+
+    Returns:
+        list: The 15 CRC bits.
+    """
+
+    crc = 0
+    for bit in bits:
+        crcNext = bit ^ ((crc >> 14) & 1)
+        crc = (crc << 1) & 0x7FFF
+        if crcNext:
+            crc ^= 0x4599
+    return [int(b) for b in f"{crc:015b}"]
+
+
+def legacyGetBits(ID: int, dlc: int, data: list) -> list:
+    """
+    Original Frame.getBits implementation, based on f-strings and list concatenation.
+
+    Args:
+        ID (int): 11-bit identifier.
+        dlc (int): Data Length Code.
+        data (list): List of data bytes.
+
+    Returns:
+        list: The stuffed bit representation of the frame.
+    """
+
+    sof_bits = [0]
+    id_bits = [int(b) for b in f"{ID:011b}"]
+    dlc_bits = [int(b) for b in f"{dlc:04b}"]
+    data_bits = [int(bit) for byte in data for bit in f"{byte:08b}"]
+    bitFrame = sof_bits + id_bits + dlc_bits + data_bits
+    bitFrame = bitFrame + legacyCrc(bitFrame)
+
+    stuffedFrame = []
+    count = 0
+    lastBit = None
+    for bit in bitFrame:
+        stuffedFrame.append(bit)
+        if bit == lastBit:
+            count += 1
+            if count == 5:
+                stuffedFrame.append(1 - bit)
+                bit = 1 - bit
+                count = 1
+        else:
+            count = 1
+        lastBit = bit
+    return stuffedFrame + [1] * 10  # CRC delimiter, ACK slot, ACK delimiter, EOF
+
+
+def legacyFromBits(bits: list) -> tuple:
+    """
+    Original Frame.fromBits implementation, based on string joins and int(..., 2).
+
+    Args:
+        bits (list): List of stuffed bits.
+
+    Returns:
+        tuple: (ID, DLC, data) of the decoded frame, or None if decoding fails.
+    """
+
+    try:
+        unstuffed = []
+        count = 0
+        lastBit = None
+        regionLength = None
+        i = 0
+        while regionLength is None or len(unstuffed) < regionLength or count == 5:
+            bit = bits[i]
+            i += 1
+            if count == 5:  # stuff bit
+                if bit == lastBit:
+                    return None
+                count = 1
+                lastBit = bit
+                continue
+            count = count + 1 if bit == lastBit else 1
+            lastBit = bit
+            unstuffed.append(bit)
+            if len(unstuffed) == 16:
+                regionLength = 16 + int("".join(map(str, unstuffed[12:16])), 2) * 8 + 15
+
+        ID = int("".join(map(str, unstuffed[1:12])), 2)
+        DLC = int("".join(map(str, unstuffed[12:16])), 2)
+        if not (0 <= DLC <= 8):
+            return None
+        data_bits = unstuffed[16:16 + (DLC * 8)]
+        data = [int("".join(map(str, data_bits[i:i + 8])), 2) for i in range(0, len(data_bits), 8)]
+        if legacyCrc(unstuffed[:16 + DLC * 8]) != unstuffed[16 + DLC * 8:]:
+            return None
+        tail = bits[i:i + 10]
+        if len(tail) < 10 or tail[0] != 1 or not all(tail[2:]):
+            return None
+        return ID, DLC, data
+    except Exception:
+        return None
+
+
+def measure(function, items: list) -> float:
+    """
+    Measure the throughput of a function over a list of items.
+
+    Args:
+        function (callable): Function called once per item.
+        items (list): Arguments for the function.
+
+    Returns:
+        float: Best throughput in items per second.
+    """
+
+    best = min(timeit.repeat(lambda: [function(item) for item in items], number=1, repeat=REPEAT))
+    return len(items) / best
+
+
+if __name__ == "__main__":
+    random.seed(0)
+
+    frames = []
+    for i in range(FRAMES):
+        dlc = random.randint(0, 8)
+        frames.append((random.randint(0, 0b11111111111), dlc, [random.randint(0, 255) for _ in range(dlc)]))
+    encoded = [Frame(*frame).getBits() for frame in frames]
+
+    # Both implementations must agree before comparing their speed
+    assert encoded == [legacyGetBits(*frame) for frame in frames]
+    assert [legacyFromBits(bits) for bits in encoded] == [(ID, dlc, data) for ID, dlc, data in frames]
+
+    results = [
+        ("getBits", measure(lambda f: legacyGetBits(*f), frames), measure(lambda f: Frame(*f).getBits(), frames)),
+        ("getPackedBits", measure(lambda f: legacyGetBits(*f), frames), measure(lambda f: Frame(*f).getPackedBits(), frames)),
+        ("fromBits", measure(legacyFromBits, encoded), measure(Frame.fromBits, encoded)),
+    ]
+
+    print(f"{'Operation':<14} | {'Before [frames/s]':>17} | {'After [frames/s]':>16} | {'Speedup':>7}")
+    for name, before, after in results:
+        print(f"{name:<14} | {before:>17,.0f} | {after:>16,.0f} | {after / before:>6.2f}x")
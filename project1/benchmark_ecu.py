@@ -0,0 +1,149 @@
+"""
+benchmark_ecu.py - Per-bit cost of the ECU transmit loop.
+
+Measures getNextBit() + checkBit() per bit for frames of classic CAN sizes
+and for longer bit sequences of CAN FD payload sizes (16-64 bytes, stuffed
+like classic frames, since Frame only encodes up to 8 bytes). The original
+implementation, which stored every bus bit in a list and sliced the last 6
+to check the stuffing rule, is kept below as reference. The cost is
+compared with the duration of a bus cycle (3 clock ticks) to show how much
+room the ECU thread has before it falls behind the clock.
+"""
+
+import random
+import timeit
+
+from ecu import ECU
+from can_bus import CanBus
+from engine import VirtualClock
+from frame import Frame
+
+PAYLOADS = [0, 8, 16, 32, 64]  # Data bytes per frame
+FRAMES = 200  # Number of frames per run
+REPEAT = 5  # Number of runs, the best one is reported
+CLOCK = 0.003  # Clock period of main.py, in seconds
+BUS_TICKS = 3  # Clock ticks per bus cycle
+
+
+class LegacyTransmitter:
+    """
+    Original ECU.startFrame/getNextBit/checkBit bit loop (without the TEC updates).
+    """
+
+    def startFrame(self, bits: tuple):
+        self.frameBits = bits
+        self.bitIndex = 0
+        self.recivedBit = []
+        self.stuffedEnd = len(bits) - Frame.TAIL_LENGTH
+        self.ackSlot = len(bits) - Frame.ACK_OFFSET
+
+    def getNextBit(self) -> int:
+        return self.frameBits[self.bitIndex]
+
+    def checkBit(self, lastSendedBit: int) -> str:
+        i = self.bitIndex
+        frameBits = self.frameBits
+        self.recivedBit.append(lastSendedBit)
+        if 1 <= i <= 11:
+            if frameBits[i] > lastSendedBit:
+                return ECU.LOWER_FRAME_ID
+        elif i > 11 and i != self.ackSlot:
+            if frameBits[i] != lastSendedBit:
+                return ECU.BIT_ERROR
+        if i < self.stuffedEnd and self.checkStuffRule(self.recivedBit):
+            return ECU.STUFF_ERROR
+        self.bitIndex = i + 1
+        if self.bitIndex == len(frameBits):
+            return ECU.COMPLITED
+        return None
+
+    def checkStuffRule(self, recivedBit: list) -> bool:
+        if len(recivedBit) < 6:
+            return False
+        last_six_bits = recivedBit[-6:]
+        return all(bit == 0 for bit in last_six_bits) or all(bit == 1 for bit in last_six_bits)
+
+
+def stuffedBits(payload: int) -> tuple:
+    """
+    Build the stuffed bits of a frame with a payload of any size.
+
+    Args:
+        payload (int): Number of data bytes.
+
+    Returns:
+        tuple: SOF, ID, DLC, data and a random 15 bits CRC with bit stuffing, followed by the 10 bits tail.
+    """
+
+    if payload <= 8:
+        return tuple(Frame(random.randint(0, 0b11111111111), payload, [random.randint(0, 255) for _ in range(payload)]).getBits())
+
+    bits = [0] + [random.randint(0, 1) for _ in range(11 + 4 + payload * 8 + 15)]
+    stuffed = []
+    count = 0
+    lastBit = None
+    for bit in bits:
+        stuffed.append(bit)
+        count = count + 1 if bit == lastBit else 1
+        lastBit = bit
+        if count == 5:
+            stuffed.append(1 - bit)
+            lastBit = 1 - bit
+            count = 1
+    return tuple(stuffed) + (1,) * Frame.TAIL_LENGTH
+
+
+def transmit(transmitter, frames: list, startFrame) -> int:
+    """
+    Send frames alone on the bus, bit by bit.
+
+    Args:
+        transmitter: ECU or LegacyTransmitter.
+        frames (list): Stuffed bits of each frame.
+        startFrame (callable): Starts the transmission of a frame given its bits.
+
+    Returns:
+        int: Number of bits sent.
+    """
+
+    getNextBit = transmitter.getNextBit
+    checkBit = transmitter.checkBit
+    sent = 0
+    for bits in frames:
+        startFrame(bits)
+        status = None
+        while status is None:
+            status = checkBit(getNextBit())  # alone on the bus: the bus bit is the bit sent
+            sent += 1
+        assert status == ECU.COMPLITED
+    return sent
+
+
+def measure(transmitter, frames: list, startFrame) -> float:
+    """
+    Measure the cost of a bit.
+
+    Returns:
+        float: Best time per bit in nanoseconds.
+    """
+
+    bits = sum(len(frame) for frame in frames)
+    best = min(timeit.repeat(lambda: transmit(transmitter, frames, startFrame), number=1, repeat=REPEAT))
+    return best / bits * 1e9
+
+
+if __name__ == "__main__":
+    random.seed(0)
+
+    clock = VirtualClock(CLOCK)
+    ecu = ECU("Benchmark", CanBus(clock), clock)
+    legacy = LegacyTransmitter()
+    budget = BUS_TICKS * CLOCK * 1e9  # duration of a bus cycle in nanoseconds
+
+    print(f"{'Payload [B]':>11} | {'Bits':>4} | {'Before [ns/bit]':>15} | {'After [ns/bit]':>14} | {'Speedup':>7} | {'Bus cycle use':>13}")
+    for payload in PAYLOADS:
+        frames = [stuffedBits(payload) for _ in range(FRAMES)]
+        before = measure(legacy, frames, legacy.startFrame)
+        after = measure(ecu, frames, lambda bits: ecu.startFrame(None, bits))
+        length = sum(len(frame) for frame in frames) // FRAMES
+        print(f"{payload:>11} | {length:>4} | {before:>15,.0f} | {after:>14,.0f} | {before / after:>6.2f}x | {after / budget:>12.5%}")
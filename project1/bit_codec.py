@@ -0,0 +1,296 @@
+"""
+bit_codec.py - Packed bit codec used by the CAN frame encoder/decoder.
+
+Frames are handled as a pair (value, length), where value is a Python int
+holding the bits MSB first. Bit stuffing and de-stuffing are applied with
+precomputed lookup tables that consume up to 8 bits per step, so the hot
+path never builds a per-bit Python list. A list of bits is only produced
+when a caller explicitly asks for one with unpackBits().
+
+The module also provides the byte-wise, table-driven CRC-15 used by CAN.
+"""
+
+# Translation tables between the bytes b"\x00\x01" and the ASCII digits b"01"
+_BIT_TO_ASCII = bytes.maketrans(b"\x00\x01", b"01")
+_ASCII_TO_BIT = bytes.maketrans(b"01", b"\x00\x01")
+
+STUFF_LIMIT = 5  # 5 consecutive bits of the same value require a stuff bit
+STUFF_ERROR = (None, -1)  # De-stuffing state reached when the stuffing rule is violated
+
+CRC15_POLYNOMIAL = 0x4599  # x^15 + x^14 + x^10 + x^8 + x^7 + x^4 + x^3 + 1
+
+
+def packBits(bits: list) -> tuple:
+    """
+    Pack a list of bits into an integer.
+
+    Args:
+        bits (list): List of bits (0 or 1), MSB first.
+
+    Returns:
+        tuple: (value, length) of the packed bits.
+    """
+
+    if not bits:
+        return 0, 0
+    return int(bytes(bits).translate(_BIT_TO_ASCII), 2), len(bits)
+
+
+def unpackBits(value: int, length: int) -> list:
+    """
+    Expand a packed integer into a list of bits.
+
+    Args:
+        value (int): Packed bits, MSB first.
+        length (int): Number of bits in value.
+
+    Returns:
+        list: List of bits (0 or 1).
+    """
+
+    if length == 0:
+        return []
+    return list(format(value, f"0{length}b").encode().translate(_ASCII_TO_BIT))
+
+
+def _stuffStep(state: tuple, bit: int) -> tuple:
+    """
+    Apply the stuffing rule to a single bit.
+
+    Args:
+        state (tuple): (lastBit, count) before the bit, lastBit is None at the start of the frame.
+        bit (int): Bit to encode.
+
+    Returns:
+        tuple: (emitted bits, new state).
+    """
+
+    lastBit, count = state
+    if bit == lastBit:
+        count += 1
+        if count == STUFF_LIMIT:  # add a bit of the opposite value
+            return [bit, 1 - bit], (1 - bit, 1)
+        return [bit], (bit, count)
+    return [bit], (bit, 1)
+
+
+def _destuffStep(state: tuple, bit: int) -> tuple:
+    """
+    Apply the de-stuffing rule to a single bit.
+
+    Args:
+        state (tuple): (lastBit, count) before the bit, count == STUFF_LIMIT means the bit is a stuff bit.
+        bit (int): Received bit.
+
+    Returns:
+        tuple: (emitted bits, new state), the state is STUFF_ERROR if the stuffing rule is violated.
+    """
+
+    lastBit, count = state
+    if state == STUFF_ERROR:
+        return [], STUFF_ERROR
+    if count == STUFF_LIMIT:
+        if bit == lastBit:  # 6 consecutive bits of the same value
+            return [], STUFF_ERROR
+        return [], (bit, 1)  # stuff bit, drop it but it starts a new run
+    if bit == lastBit:
+        return [bit], (bit, count + 1)
+    return [bit], (bit, 1)
+
+
+def _buildTable(step, initialState: tuple) -> tuple:
+    """
+    Precompute a chunk lookup table for a bitwise state machine.
+
+    The table is indexed as table[width][state][chunk] and returns
+    (outValue, outLength, nextState), where state is the index of the
+    state in the returned list of states.
+
+    Args:
+        step (callable): Function (state, bit) -> (emitted bits, new state).
+        initialState (tuple): State at the start of a frame.
+
+    Returns:
+        tuple: (table, states) where states lists every reachable state.
+    """
+
+    # Discover every reachable state
+    states = [initialState]
+    index = {initialState: 0}
+    pending = [initialState]
+    while pending:
+        state = pending.pop()
+        for bit in (0, 1):
+            _, nextState = step(state, bit)
+            if nextState not in index:
+                index[nextState] = len(states)
+                states.append(nextState)
+                pending.append(nextState)
+
+    table = [None]
+    for width in range(1, 9):
+        byState = []
+        for state in states:
+            entries = []
+            for chunk in range(1 << width):
+                current = state
+                outValue = 0
+                outLength = 0
+                for shift in range(width - 1, -1, -1):
+                    emitted, current = step(current, (chunk >> shift) & 1)
+                    for bit in emitted:
+                        outValue = (outValue << 1) | bit
+                        outLength += 1
+                entries.append((outValue, outLength, index[current]))
+            byState.append(entries)
+        table.append(byState)
+    return table, states
+
+
+_STUFF_TABLE, _ = _buildTable(_stuffStep, (None, 0))
+_DESTUFF_TABLE, _DESTUFF_STATES = _buildTable(_destuffStep, (None, 0))
+_DESTUFF_ERROR = _DESTUFF_STATES.index(STUFF_ERROR)
+
+
+def _runTable(table: list, value: int, length: int) -> tuple:
+    """
+    Feed a packed bit sequence through a chunk lookup table.
+
+    Args:
+        table (list): Table built by _buildTable().
+        value (int): Packed input bits.
+        length (int): Number of input bits.
+
+    Returns:
+        tuple: (value, length) of the output bits.
+    """
+
+    if length == 0:
+        return 0, 0
+
+    data = value.to_bytes((length + 7) // 8, "big")
+    head = length % 8
+    state = 0
+    outValue = 0
+    outLength = 0
+
+    start = 0
+    if head:  # leading partial byte
+        outValue, outLength, state = table[head][0][data[0]]
+        start = 1
+
+    byteTable = table[8]
+    for byte in data[start:] if start else data:
+        chunkValue, chunkLength, state = byteTable[state][byte]
+        outValue = (outValue << chunkLength) | chunkValue
+        outLength += chunkLength
+
+    return outValue, outLength
+
+
+def stuff(value: int, length: int) -> tuple:
+    """
+    Apply bit stuffing to a packed bit sequence.
+
+    Args:
+        value (int): Packed bits, MSB first.
+        length (int): Number of bits in value.
+
+    Returns:
+        tuple: (value, length) of the stuffed bits.
+    """
+
+    return _runTable(_STUFF_TABLE, value, length)
+
+
+def destuff(value: int, length: int, limit: int) -> tuple:
+    """
+    Remove bit stuffing from the beginning of a packed bit sequence.
+
+    De-stuffing stops once limit bits have been produced, a stuff bit that
+    follows the last produced bit is consumed as well. The remaining bits
+    (e.g. the fixed-form tail of a frame) are left untouched.
+
+    Args:
+        value (int): Packed stuffed bits, MSB first.
+        length (int): Number of bits in value.
+        limit (int): Number of de-stuffed bits to produce.
+
+    Returns:
+        tuple: (value, length, consumed) of the de-stuffed bits and number of input bits used,
+               or None if the stuffing rule is violated.
+    """
+
+    state = 0
+    outValue = 0
+    outLength = 0
+    consumed = 0
+
+    # A chunk of width bits never produces more than width bits, so the limit is never exceeded
+    byteTable = _DESTUFF_TABLE[8]
+    while outLength + 8 <= limit and consumed + 8 <= length:
+        chunkValue, chunkLength, state = byteTable[state][(value >> (length - consumed - 8)) & 0xFF]
+        outValue = (outValue << chunkLength) | chunkValue
+        outLength += chunkLength
+        consumed += 8
+
+    # Last bits, in smaller chunks
+    while outLength < limit and consumed < length and state != _DESTUFF_ERROR:
+        width = min(8, length - consumed, limit - outLength)
+        chunk = (value >> (length - consumed - width)) & ((1 << width) - 1)
+        chunkValue, chunkLength, state = _DESTUFF_TABLE[width][state][chunk]
+        outValue = (outValue << chunkLength) | chunkValue
+        outLength += chunkLength
+        consumed += width
+
+    if state == _DESTUFF_ERROR:  # the error state is absorbing, checked once
+        return None
+
+    # Stuff bit after the last de-stuffed bit
+    lastBit, count = _DESTUFF_STATES[state]
+    if count == STUFF_LIMIT and consumed < length:
+        if (value >> (length - consumed - 1)) & 1 == lastBit:
+            return None
+        consumed += 1
+
+    return outValue, outLength, consumed
+
+
+def _buildCrcTable() -> list:
+    """
+    Precompute the byte-wise CRC-15 lookup table.
+
+    Returns:
+        list: 256 entries, the CRC register after shifting in each byte value.
+    """
+
+    table = []
+    for byte in range(256):
+        crc = byte << 7  # align the byte with the top of the 15-bit register
+        for _ in range(8):
+            crc <<= 1
+            if crc & 0x8000:
+                crc ^= CRC15_POLYNOMIAL
+        table.append(crc & 0x7FFF)
+    return table
+
+
+CRC15_TABLE = _buildCrcTable()
+
+
+def crc15(data: bytes) -> int:
+    """
+    Compute the CAN CRC-15 of a byte sequence, one table lookup per byte.
+
+    Args:
+        data (bytes): Bytes covered by the CRC, MSB first.
+
+    Returns:
+        int: 15-bit CRC.
+    """
+
+    crc = 0
+    table = CRC15_TABLE
+    for byte in data:
+        crc = ((crc << 8) & 0x7FFF) ^ table[((crc >> 7) ^ byte) & 0xFF]
+    return crc
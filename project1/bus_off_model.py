@@ -0,0 +1,276 @@
+"""
+bus_off_model.py - Bus-off time of the attack without running the simulation.
+
+The outcome of the attack only depends on a few quantities:
+
+    TEC rules       +8 after an error, -1 after a frame sent (not below 0),
+                    ERROR_PASSIVE above 127 (recessive error flag), BUS_OFF
+                    above 255 (see ECU)
+    schedule        the Victim sends at multiples of its period, the attacker
+                    finds the period from the slots 0 and PERIOD and collides
+                    from slot 2 * PERIOD; after an error an ECU retransmits
+                    in the next slot (automatic retransmission) or waits for
+                    the next period
+    collisions      who gets an error and how many bits are on the bus only
+                    depend on the two frames and on the error state of the
+                    two ECUs, so they are resolved once per frame with
+                    resolveContention for the 4 combinations of error flags
+    durations       a frame of n bits lasts n + 1 bus cycles of 3 clock ticks,
+                    a slot without simulated ECUs is a background frame of
+                    3 * idleGap + backgroundBits * backgroundBitTicks ticks
+
+busOffSweep() applies these rules to arrays of configurations at once: each
+iteration handles the next transmission slot of every configuration, so the
+cost grows with the number of attack rounds (a few dozen), not with the
+number of configurations or bus cycles. The results (slots, ticks and TEC
+trajectories) are the ones of Simulation with the Victim and the Adversary
+only; run this module to check them against the simulator.
+"""
+
+import time
+import numpy as np
+
+from frame import Frame
+from frame_cache import FRAME_CACHE
+from arbitration import resolveContention, COMPLITED
+
+TEC_INCREASE = 8
+TEC_DECREASE = 1
+PASSIVE_LIMIT = 127  # ERROR_PASSIVE above this TEC
+BUS_OFF_LIMIT = 255  # BUS_OFF above this TEC
+
+BUS_TICKS = 3  # Clock ticks per bus cycle, as in main.canBusThread
+
+ACTIVE_FLAG = (0,) * 6  # dominant error flag, as ECU
+PASSIVE_FLAG = (1,) * 6  # recessive error flag, as ECU
+
+DEFAULT_DATA = [217, 16, 133, 0, 0, 0, 0, 0]  # Victim data bytes (main.py), padded to 8 bytes
+
+# Who entered BUS_OFF first
+NONE = 0
+VICTIM = 1
+ADVERSARY = 2
+
+
+def collisionTable(victimFrame: 'Frame', adversaryFrame: 'Frame') -> np.ndarray:
+    """
+    Resolve the collision of two frames for every combination of error states.
+
+    Args:
+        victimFrame (Frame): Frame of the Victim.
+        adversaryFrame (Frame): Frame of the Adversary.
+
+    Returns:
+        np.ndarray: int64 array of shape (4, 5), row 2 * victimPassive + adversaryPassive,
+                    columns (victim error, adversary error, bus bits, victim last bit, adversary last bit).
+    """
+
+    victimBits = FRAME_CACHE.getBits(victimFrame)
+    adversaryBits = FRAME_CACHE.getBits(adversaryFrame)
+    table = np.zeros((4, 5), dtype=np.int64)
+    for victimFlag in (ACTIVE_FLAG, PASSIVE_FLAG):
+        for adversaryFlag in (ACTIVE_FLAG, PASSIVE_FLAG):
+            busBits, outcomes = resolveContention([(victimBits, victimFlag), (adversaryBits, adversaryFlag)])
+            (victimStatus, victimLast), (adversaryStatus, adversaryLast) = outcomes
+            row = 2 * (victimFlag is PASSIVE_FLAG) + (adversaryFlag is PASSIVE_FLAG)
+            table[row] = (victimStatus != COMPLITED, adversaryStatus != COMPLITED, len(busBits), victimLast, adversaryLast)
+    return table
+
+
+def busOffSweep(periods, dlcs, clocks, retransmission, ID: int = 671, data: list = None, idleGap: int = 2,
+                backgroundBits: int = 30, backgroundBitTicks: int = 4, maxRounds: int = 1000) -> dict:
+    """
+    Compute the bus-off attack of many configurations at once.
+
+    The parameters are broadcast against each other (scalars or arrays).
+    The Victim sends Frame(ID, dlc, data[:dlc]), the Adversary Frame(ID, 0, []).
+
+    Args:
+        periods (array-like): Victim period in frame slots (>= 1).
+        dlcs (array-like): Victim DLC (0-8), a DLC of 0 never causes an error.
+        clocks (array-like): Clock period in seconds (main.CLOCK).
+        retransmission (array-like): True to retransmit in the next slot after an error, False to wait for the period.
+        ID (int): Frame identifier of the Victim.
+        data (list, optional): Victim data bytes (default: DEFAULT_DATA).
+        idleGap (int): Idle bus cycles before a background frame (see CanBus), not None.
+        backgroundBits (int): Length of a background frame in bus cycles.
+        backgroundBitTicks (int): Clock ticks per bit of a background frame.
+        maxRounds (int): Transmission slots simulated per configuration before giving up.
+
+    Returns:
+        dict: Arrays with the configuration shape:
+              busOff (NONE, VICTIM or ADVERSARY), slot (frame count of the bus-off, -1 if none),
+              ticks (clock tick of the bus-off), time (seconds), collisions, victimTEC and
+              adversaryTEC (final TECs); and the trajectories, with an extra last axis of
+              rounds: slots (slot of each transmission round, -1 after the end),
+              victimTECs and adversaryTECs (TEC after each round).
+    """
+
+    periods, dlcs, clocks, retransmission = np.broadcast_arrays(
+        np.asarray(periods, dtype=np.int64), np.asarray(dlcs, dtype=np.int64),
+        np.asarray(clocks, dtype=np.float64), np.asarray(retransmission, dtype=bool))
+    shape = periods.shape
+    period = periods.ravel()
+    dlc = dlcs.ravel()
+    retransmit = retransmission.ravel()
+    data = DEFAULT_DATA if data is None else list(data)
+
+    # Collision outcomes and frame durations, once per DLC
+    adversaryFrame = Frame(ID, 0, [])
+    adversaryTicks = BUS_TICKS * (len(FRAME_CACHE.getBits(adversaryFrame)) + 1)
+    tables = np.zeros((9, 4, 5), dtype=np.int64)
+    victimTicks = np.zeros(9, dtype=np.int64)
+    for length in np.unique(dlc):
+        victimFrame = Frame(ID, int(length), data[:length])
+        tables[length] = collisionTable(victimFrame, adversaryFrame)
+        victimTicks[length] = BUS_TICKS * (len(FRAME_CACHE.getBits(victimFrame)) + 1)
+    backgroundTicks = BUS_TICKS * idleGap + backgroundBits * backgroundBitTicks
+
+    count = len(period)
+    victimTEC = np.zeros(count, dtype=np.int64)
+    adversaryTEC = np.zeros(count, dtype=np.int64)
+    collisions = np.zeros(count, dtype=np.int64)
+    busOff = np.full(count, NONE, dtype=np.int64)
+    busOffSlot = np.full(count, -1, dtype=np.int64)
+    busOffTicks = np.full(count, -1, dtype=np.int64)
+
+    # The Victim sends alone in the slots 0 and period, both ECUs are due in the slot 2 * period
+    ticks = 2 * victimTicks[dlc] + (2 * period - 2) * backgroundTicks
+    victimSlot = 2 * period
+    adversarySlot = 2 * period
+    free = 2 * period  # first slot whose duration is not in ticks yet
+
+    # A frame with the same bits as the attacker's never fails
+    active = np.flatnonzero(tables[dlc][:, :, :2].any(axis=(1, 2)))
+    slots, victimTECs, adversaryTECs = [], [], []
+
+    for _ in range(maxRounds):
+        if not len(active):
+            break
+        p = period[active]
+        v = victimTEC[active]
+        a = adversaryTEC[active]
+        vSlot = victimSlot[active]
+        aSlot = adversarySlot[active]
+        slot = np.minimum(vSlot, aSlot)
+        start = ticks[active] + (slot - free[active]) * backgroundTicks  # background slots in between
+
+        victimSends = vSlot == slot
+        adversarySends = aSlot == slot
+        both = victimSends & adversarySends
+        row = tables[dlc[active], 2 * (v > PASSIVE_LIMIT) + (a > PASSIVE_LIMIT)]
+        victimError = both & (row[:, 0] == 1)
+        adversaryError = both & (row[:, 1] == 1)
+
+        v = np.where(victimError, v + TEC_INCREASE, np.where(victimSends, np.maximum(v - TEC_DECREASE, 0), v))
+        a = np.where(adversaryError, a + TEC_INCREASE, np.where(adversarySends, np.maximum(a - TEC_DECREASE, 0), a))
+        duration = np.where(both, BUS_TICKS * (row[:, 2] + 1),
+                            np.where(victimSends, victimTicks[dlc[active]], adversaryTicks))
+
+        # Next slot: the next one after an error (retransmission), else the next multiple of the period
+        nextPeriod = -(-(slot + 1) // p) * p
+        retry = retransmit[active]
+        victimSlot[active] = np.where(victimSends, np.where(victimError & retry, slot + 1, nextPeriod), vSlot)
+        adversarySlot[active] = np.where(adversarySends, np.where(adversaryError & retry, slot + 1, nextPeriod), aSlot)
+
+        victimTEC[active] = v
+        adversaryTEC[active] = a
+        collisions[active] += both
+        ticks[active] = start + duration
+        free[active] = slot + 1
+
+        trajectory = np.full((3, count), -1, dtype=np.int64)
+        trajectory[:, active] = slot, v, a
+        slots.append(trajectory[0])
+        victimTECs.append(trajectory[1])
+        adversaryTECs.append(trajectory[2])
+
+        # The simulation stops when the first ECU ends its transmission in BUS_OFF
+        victimOff = v > BUS_OFF_LIMIT
+        adversaryOff = a > BUS_OFF_LIMIT
+        victimFirst = victimOff & ~(adversaryOff & (row[:, 4] < row[:, 3]))
+        ended = victimOff | adversaryOff
+        busOff[active[ended]] = np.where(victimFirst, VICTIM, ADVERSARY)[ended]
+        busOffSlot[active[ended]] = slot[ended]
+        busOffTicks[active[ended]] = (start + BUS_TICKS * (np.where(victimFirst, row[:, 3], row[:, 4]) + 1))[ended]
+        active = active[~ended]
+
+    def rounds(trajectory: list) -> np.ndarray:
+        """Stack a trajectory as (configurations..., rounds)."""
+        if not trajectory:
+            return np.zeros(shape + (0,), dtype=np.int64)
+        return np.stack(trajectory, axis=-1).reshape(shape + (len(trajectory),))
+
+    return {
+        "busOff": busOff.reshape(shape),
+        "slot": busOffSlot.reshape(shape),
+        "ticks": busOffTicks.reshape(shape),
+        "time": np.where(busOffTicks >= 0, busOffTicks * clocks.ravel(), np.nan).reshape(shape),
+        "collisions": collisions.reshape(shape),
+        "victimTEC": victimTEC.reshape(shape),
+        "adversaryTEC": adversaryTEC.reshape(shape),
+        "slots": rounds(slots),
+        "victimTECs": rounds(victimTECs),
+        "adversaryTECs": rounds(adversaryTECs),
+    }
+
+
+def simulate(period: int, dlc: int, clock: float, retransmission: bool, ID: int = 671, data: list = None) -> tuple:
+    """
+    Run the same configuration on the simulator, for validation.
+
+    Args:
+        period (int): Victim period in frame slots.
+        dlc (int): Victim DLC.
+        clock (float): Clock period in seconds.
+        retransmission (bool): Automatic retransmission after an error.
+        ID (int): Frame identifier of the Victim.
+        data (list, optional): Victim data bytes (default: DEFAULT_DATA).
+
+    Returns:
+        tuple: (busOff, slot, ticks, victimTEC, adversaryTEC) as returned by busOffSweep.
+    """
+
+    from simulation import Simulation  # the model itself does not need the simulator
+
+    data = DEFAULT_DATA if data is None else list(data)
+    simulation = Simulation(clock, verbose=False, priorityScheduling=True, retransmission=retransmission)
+    simulation.addECU("Victim", period, Frame(ID, dlc, data[:dlc]))
+    simulation.addAttacker("Adversary")
+    ecu = simulation.run(maxTick=10 ** 6)
+    if ecu is None:
+        return NONE, -1, -1, None, None
+
+    victim, adversary = simulation.getECUs()
+    lastSlot = simulation.canBus.getCount()
+    return (VICTIM if ecu is victim else ADVERSARY, lastSlot, round(simulation.getBusOffTime() / clock),
+            victim.getTEC(), adversary.getTEC())
+
+
+if __name__ == "__main__":
+    # Validate the model against the simulator
+    configurations = [(period, dlc, retransmission)
+                      for period in (1, 2, 3, 5, 7, 11, 16, 17, 30)
+                      for dlc in (0, 1, 3, 8)
+                      for retransmission in (True, False)]
+    period, dlc, retransmission = (np.array(column) for column in zip(*configurations))
+    model = busOffSweep(period, dlc, 0.003, retransmission)
+
+    mismatches = 0
+    for k, configuration in enumerate(configurations):
+        expected = simulate(*configuration[:2], 0.003, configuration[2])
+        found = (int(model["busOff"][k]), int(model["slot"][k]), int(model["ticks"][k]),
+                 int(model["victimTEC"][k]), int(model["adversaryTEC"][k]))
+        if expected[0] == NONE:
+            found = (found[0], -1, -1, None, None) if found[0] == NONE else found
+        if found != expected:
+            mismatches += 1
+            print(f"Mismatch {configuration}: model {found}, simulator {expected}")
+    print(f"Validated {len(configurations)} configurations against the simulator, {mismatches} mismatches")
+
+    # Parameter sweep
+    grid = np.meshgrid(np.arange(1, 101), np.arange(1, 9), [0.001, 0.003, 0.01], [True, False], indexing="ij")
+    start = time.perf_counter()
+    sweep = busOffSweep(*grid)
+    elapsed = time.perf_counter() - start
+    print(f"Swept {sweep['slot'].size} configurations in {elapsed * 1000:.1f} ms")
@@ -0,0 +1,344 @@
+"""
+bus_trace.py - Compact binary recording of the CAN bus traffic.
+
+A trace file starts with a 16 bytes header followed by fixed size records
+of 24 bytes (little endian):
+
+    tick   int64   bus cycle at the end of the frame
+    ID     uint16  frame identifier, NO_ID if the arbitration field was not received
+    DLC    uint8   data length code (0 if unknown)
+    flags  uint8   ERROR_* flags, NAME for node name records
+    node   uint16  index of the transmitting ECU, NO_NODE if unknown
+    data   8 bytes data bytes, padded with zeros
+    bits   uint16  number of bits seen on the bus
+
+Node names are stored inline as NAME records: node is the index being
+declared and data holds up to 8 bytes of the name (DLC bytes are used),
+longer names span consecutive NAME records. The file is append-only: each
+TraceWriter starts a new run with a RUN record, and the ticks and the node
+indices of a run start again from the values of its own simulation.
+
+TraceWriter is a CanBus listener and needs only the standard library.
+TraceReader memory-maps the file with NumPy and builds a per-ID index
+sorted by tick, so range queries never parse the whole trace.
+"""
+
+import os
+import mmap
+import struct
+from collections import namedtuple
+from frame import Frame
+from frame_decoder import FrameDecoder
+
+MAGIC = b"CANTRACE"
+VERSION = 2  # 2: RUN records (version 1 traces are read as a single run)
+HEADER = struct.Struct("<8sHH4x")  # magic, version, record size
+RECORD = struct.Struct("<qHBBH8sH")  # tick, ID, DLC, flags, node, data, bits
+
+# Record flags
+ERROR_STUFF = 0x01
+ERROR_CRC = 0x02
+ERROR_FORM = 0x04
+RUN = 0x40
+NAME = 0x80
+
+NO_ID = 0xFFFF
+NO_NODE = 0xFFFF
+
+TraceRecord = namedtuple("TraceRecord", ["tick", "ID", "DLC", "flags", "node", "data", "bits"])
+
+_ERROR_FLAGS = {Frame.STUFF_ERROR: ERROR_STUFF, Frame.CRC_ERROR: ERROR_CRC, Frame.FORM_ERROR: ERROR_FORM}
+
+
+class TraceWriter:
+    """
+    Records every frame seen on a CanBus into a binary trace file.
+
+    Register it with CanBus.addListener(). Records are packed into an
+    in-memory buffer and written in blocks, call close() at the end of
+    the simulation to flush the last block.
+    """
+
+    def __init__(self, canBus: 'CanBus', path: str, bufferRecords: int = 4096):
+        """
+        Open (or create) a trace file for appending.
+
+        Args:
+            canBus (CanBus): Bus being recorded, used to read the tick and the sender.
+            path (str): Path of the trace file.
+            bufferRecords (int): Number of records buffered before writing to the file.
+        """
+
+        self.__canBus = canBus
+        self.__file = open(path, "ab")
+        self.__bufferSize = bufferRecords * RECORD.size
+        self.__buffer = bytearray()
+        self.__nodes = {}  # ECU name -> node index
+        self.__bits = 0  # bits of the current frame
+        self.__decoder = FrameDecoder()
+
+        if self.__file.tell() == 0:
+            self.__file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        # Start of a run, its ticks and node indices are independent from the previous runs
+        self.__buffer += RECORD.pack(canBus.getTick(), NO_ID, 0, RUN, NO_NODE, b"", 0)
+
+    def feedBit(self, bit: int):
+        """
+        Receive a bit from the bus (CanBus listener).
+
+        Args:
+            bit (int): The bit (0 or 1).
+        """
+
+        self.__bits += 1
+        self.__decoder.feedBit(bit)
+
+    def endFrame(self):
+        """
+        Record the frame that just ended on the bus (CanBus listener).
+        """
+
+        decoder = self.__decoder
+        frame = decoder.getFrame()
+        error = decoder.getError()
+        if frame is None and error is None:  # frame ended before the EOF
+            error = Frame.FORM_ERROR
+
+        ID = decoder.getID()
+        dlc = decoder.getDLC() if decoder.getDLC() is not None and decoder.getDLC() <= 8 else 0
+        data = frame.getData() if frame is not None else b""
+
+        self.__buffer += RECORD.pack(
+            self.__canBus.getTick(),
+            NO_ID if ID is None else ID,
+            dlc,
+            _ERROR_FLAGS.get(error, 0),
+            self.__node(self.__canBus.getSender()),
+            data,
+            min(self.__bits, 0xFFFF),
+        )
+        self.__bits = 0
+        decoder.endFrame()
+
+        if len(self.__buffer) >= self.__bufferSize:
+            self.flush()
+
+    def __node(self, name: str) -> int:
+        """
+        Get the index of an ECU, declaring its name in the trace the first time.
+
+        Args:
+            name (str): Name of the ECU, None if unknown.
+
+        Returns:
+            int: Node index.
+        """
+
+        if name is None:
+            return NO_NODE
+
+        node = self.__nodes.get(name)
+        if node is None:
+            node = len(self.__nodes)
+            self.__nodes[name] = node
+            encoded = name.encode()
+            for i in range(0, max(len(encoded), 1), 8):
+                chunk = encoded[i:i + 8]
+                self.__buffer += RECORD.pack(self.__canBus.getTick(), NO_ID, len(chunk), NAME, node, chunk, 0)
+        return node
+
+    def flush(self):
+        """Write the buffered records to the file."""
+        self.__file.write(self.__buffer)
+        self.__file.flush()
+        self.__buffer.clear()
+
+    def close(self):
+        """Flush the buffered records and close the file."""
+        self.flush()
+        self.__file.close()
+
+
+class TraceReader:
+    """
+    Reads a binary trace file through a memory map.
+
+    The records are exposed as a NumPy structured array backed by the map
+    (no copy). A per-ID index of the records, sorted by tick (then by run),
+    is built once and stored next to the trace, so queries by ID and tick
+    range only touch the selected records. The cache is keyed on the size
+    and the modification time of the trace.
+    """
+
+    def __init__(self, path: str, indexPath: str = None):
+        """
+        Open a trace file.
+
+        Args:
+            path (str): Path of the trace file.
+            indexPath (str, optional): Path of the index cache (default: path + ".idx.npz").
+        """
+
+        import numpy as np  # optional dependency, only needed to analyse traces
+        self.__np = np
+
+        self.__file = open(path, "rb")
+        self.__map = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, recordSize = HEADER.unpack_from(self.__map, 0)
+        if magic != MAGIC or version not in (1, VERSION) or recordSize != RECORD.size:
+            raise ValueError(f"{path} is not a supported bus trace")
+
+        dtype = np.dtype([("tick", "<i8"), ("ID", "<u2"), ("DLC", "u1"), ("flags", "u1"),
+                          ("node", "<u2"), ("data", "u1", (8,)), ("bits", "<u2")])
+        count = (len(self.__map) - HEADER.size) // RECORD.size  # a partially written record is ignored
+        self.__records = np.frombuffer(self.__map, dtype=dtype, count=count, offset=HEADER.size)
+        # Run of each record, records before the first RUN record (version 1) belong to run 0
+        self.__runs = np.maximum(np.cumsum((self.__records["flags"] & RUN) != 0) - 1, 0)
+
+        self.__names = self.__readNames()
+        self.__buildIndex(indexPath if indexPath is not None else path + ".idx.npz")
+
+    def __readNames(self) -> dict:
+        """
+        Collect the node names declared in the trace.
+
+        Returns:
+            dict: (run, node index) -> ECU name.
+        """
+
+        names = {}
+        for row in self.__np.flatnonzero(self.__records["flags"] & NAME):
+            record = self.__records[row]
+            key = (int(self.__runs[row]), int(record["node"]))
+            names[key] = names.get(key, "") + bytes(record["data"][:record["DLC"]]).decode()
+        return names
+
+    def __buildIndex(self, indexPath: str):
+        """
+        Build (or load) the per-ID index of the frame records.
+
+        Args:
+            indexPath (str): Path of the index cache.
+        """
+
+        np = self.__np
+        status = os.fstat(self.__file.fileno())
+        size, mtime = status.st_size, status.st_mtime_ns  # a rewritten trace invalidates the cache
+
+        if os.path.exists(indexPath):
+            cached = np.load(indexPath)
+            if "size" in cached.files and int(cached["size"]) == size and int(cached["mtime"]) == mtime:
+                self.__order, self.__ids, self.__starts = cached["order"], cached["ids"], cached["starts"]
+                self.__ticks = self.__records["tick"][self.__order]
+                return
+
+        # Runs restart from tick 0, so the file order is not the tick order: sort by (ID, tick),
+        # records with the same tick stay in file order (run order)
+        frames = np.flatnonzero((self.__records["flags"] & (NAME | RUN)) == 0)
+        self.__order = frames[np.lexsort((self.__records["tick"][frames], self.__records["ID"][frames]))]
+        self.__ids, self.__starts = np.unique(self.__records["ID"][self.__order], return_index=True)
+        self.__ticks = self.__records["tick"][self.__order]
+
+        try:
+            np.savez(indexPath, size=size, mtime=mtime, order=self.__order, ids=self.__ids, starts=self.__starts)
+        except OSError:
+            pass  # read-only location, the index is rebuilt next time
+
+    def getRecords(self):
+        """
+        Get every record of the trace.
+
+        Returns:
+            np.ndarray: Structured array backed by the memory map (read-only).
+        """
+
+        return self.__records
+
+    def getIDs(self) -> list:
+        """Get the IDs that appear in the trace."""
+        return [int(ID) for ID in self.__ids if ID != NO_ID]
+
+    def getRunCount(self) -> int:
+        """Get the number of runs recorded in the trace."""
+        return int(self.__runs[-1]) + 1 if len(self.__runs) else 0
+
+    def getRuns(self, rows):
+        """
+        Get the run of records.
+
+        Args:
+            rows (np.ndarray): Record indices or a boolean mask of getRecords().
+
+        Returns:
+            np.ndarray: Run of each record.
+        """
+
+        return self.__runs[rows]
+
+    def getNodeName(self, node: int, run: int = None) -> str:
+        """
+        Get the name of the ECU with the given node index.
+
+        Args:
+            node (int): Node index.
+            run (int, optional): Run of the node index (default: the last run declaring it).
+
+        Returns:
+            str: Name of the ECU, None if the node is not declared.
+        """
+
+        if run is not None:
+            return self.__names.get((run, node))
+        runs = [name for (nodeRun, index), name in sorted(self.__names.items()) if index == node]
+        return runs[-1] if runs else None
+
+    def query(self, ID: int, start: int = None, end: int = None, run: int = None):
+        """
+        Get the records of an ID within a tick range.
+
+        Args:
+            ID (int): Frame identifier.
+            start (int, optional): First tick (inclusive).
+            end (int, optional): Last tick (inclusive).
+            run (int, optional): Only the records of this run (default: every run).
+
+        Returns:
+            np.ndarray: Structured array with the matching records, sorted by tick
+                        (the records of different runs with the same tick in run order).
+        """
+
+        np = self.__np
+        position = np.searchsorted(self.__ids, ID)
+        if position == len(self.__ids) or self.__ids[position] != ID:
+            return self.__records[:0]
+
+        first = self.__starts[position]
+        last = self.__starts[position + 1] if position + 1 < len(self.__starts) else len(self.__order)
+        ticks = self.__ticks[first:last]
+        low = first + (np.searchsorted(ticks, start, "left") if start is not None else 0)
+        high = first + (np.searchsorted(ticks, end, "right") if end is not None else len(ticks))
+        rows = self.__order[low:high]
+        if run is not None:
+            rows = rows[self.__runs[rows] == run]
+        return self.__records[rows]
+
+    def toRecords(self, rows) -> list:
+        """
+        Convert rows of a query into TraceRecord tuples.
+
+        Args:
+            rows (np.ndarray): Records returned by query() or getRecords().
+
+        Returns:
+            list: List of TraceRecord, data trimmed to the DLC.
+        """
+
+        return [TraceRecord(int(row["tick"]), int(row["ID"]), int(row["DLC"]), int(row["flags"]),
+                            int(row["node"]), bytes(row["data"][:row["DLC"]]), int(row["bits"]))
+                for row in rows]
+
+    def close(self):
+        """Release the memory map and close the file."""
+        self.__records = None
+        self.__map.close()
+        self.__file.close()
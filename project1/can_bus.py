@@ -1,6 +1,7 @@
+import heapq
 import threading
-import time
 from global_clock import GlobalClock
+from arbitration import resolveContention
 
 class CanBus:
     """
@@ -10,23 +11,38 @@ class CanBus:
         IDLE: Bus is idle and ready for new transmissions.
         WAIT: Bus is waiting for the next bit.
         ACTIVE: A transmission is currently active on the bus.
+        BUSY: A background frame (an ECU that is not simulated) is on the bus.
     """
     
     IDLE = "IDLE"
     WAIT = "WAIT"
     ACTIVE = "ACTIVE"
+    BUSY = "BUSY"
     
-    def __init__(self, clock : 'GlobalClock'):
+    def __init__(self, clock : 'GlobalClock', idleGap: int = 2, backgroundBits: int = 30, backgroundBitTicks: int = 4):
         """
         Initializes the CAN bus.
 
+        When the bus stays idle for idleGap cycles, a background frame of
+        backgroundBits bits (an ECU that is not simulated) is counted. Its
+        duration, backgroundBits * backgroundBitTicks clock ticks, is skipped
+        with a single clock.waitTicks() call.
+
         Args:
             clock (GlobalClock): Global clock for timing synchronization.
+            idleGap (int): Idle bus cycles before a background frame, None to disable background frames.
+            backgroundBits (int): Length of a background frame in bus cycles.
+            backgroundBitTicks (int): Clock ticks per bit of a background frame.
         """
         
         self.__clock = clock
+        self.__idleGap = idleGap
+        self.__backgroundBits = backgroundBits
+        self.__backgroundTicks = backgroundBits * backgroundBitTicks
+        self.__backgroundFrames = 0 # Number of background frames counted
         self.__lock = threading.Lock() # Ensure thread-safe operations
         self.__count = 0
+        self.__tick = 0 # Number of bus cycles processed (bit times)
         self.__conseutiveIdle = 0 # Track consecutive idle states
         
         # Events for synchronization
@@ -38,42 +54,69 @@ class CanBus:
         self.__retransmitEvent = threading.Event() 
         self.__requiredRetransmit = 0
         
+        # Threads waiting for a frame count: heap of (frame count, order, event)
+        self.__frameCountWaiters = []
+        self.__waiterOrder = 0
+        
         self.__lastSendedFrame = [] # Store the last frame sent
+        self.__listeners = [] # Objects notified of every bit, e.g. FrameDecoder
+        self.__currentSender = None # First ECU that transmitted the current bit
+        self.__lastSender = None # ECU that transmitted the last processed bit
+        self.__lastFrameSenders = set() # ECUs that transmitted bits of the last frame
         self.clearBus()
         
-    def transmitBit(self, bit: int):
+    def transmitBit(self, bit: int, sender: str = None):
         """
-        Transmit a single bit on the bus.
+        Transmit a single bit on the bus, after the end of the background frame if one is on the bus.
 
         Args:
             bit (int): The bit to transmit (0 or 1).
+            sender (str, optional): Name of the transmitting ECU, used for tracing.
         """
         
-        with self.__lock:
-            self.__status = self.ACTIVE
-            self.__current_bit &= bit
+        while True:
+            with self.__lock:
+                if self.__status != self.BUSY:
+                    self.__status = self.ACTIVE
+                    self.__current_bit &= bit
+                    if self.__currentSender is None:
+                        self.__currentSender = sender
+                    if sender is not None:
+                        self.__frameSenders.add(sender)
 
-            # Clear events
-            self.__idleEvent.clear()
-            self.__waitEvent.clear()
-            self.__frameCountEvent.clear()
+                    # Clear events
+                    self.__idleEvent.clear()
+                    self.__waitEvent.clear()
+                    self.__frameCountEvent.clear()
+                    return
+            self.__idleEvent.wait()  # set when the background frame ends
 
     def process(self):        
+        background = False
         with self.__lock:
             """
             Store the current bit in the frame and update the bus status.
             """
+            self.__tick += 1
 
             # CanBus from WAIT to IDLE status
             if self.__status == self.WAIT:  # Two cycles without new bits
                 self.__lastSendedFrame = self.__frame
+                self.__lastFrameSenders = self.__frameSenders
                 self.clearBus()
                 self.__count+=1
                 self.__frameCountEvent.set()
+                self.__notifyFrameCount()
+                for listener in self.__listeners:
+                    listener.endFrame()
             
             # CanBus from ACTIVE to WAIT status
             elif self.__status == self.ACTIVE:
                 self.__frame.append(self.__current_bit)
+                self.__lastSender = self.__currentSender
+                self.__currentSender = None
+                for listener in self.__listeners:
+                    listener.feedBit(self.__current_bit)
                 
                 # Add current bit to frame
                 self.__lastSendedBit = self.__current_bit
@@ -83,23 +126,133 @@ class CanBus:
                 self.__waitEvent.set()
                 
             elif self.__status == self.IDLE:
-                # if two consecutive idle states, increment frame count,
+                # if idleGap consecutive idle states, increment frame count,
                 # frame count is used for periodic sending of frames by the ECUs 
                 self.__conseutiveIdle += 1
-                if self.__conseutiveIdle == 2:
-                    for i in range(4 * 30): # symulate an ECU that send a frame of 30 bits
-                        self.__clock.wait()
-                    self.__count+=1
-                    self.__frameCountEvent.set()
-                    self.__conseutiveIdle = 0
+                if self.__conseutiveIdle == self.__idleGap:
+                    background = True
                 else:
                     self.__frameCountEvent.clear()
                 self.__lastSendedFrame = None # reset last frame
 
+        if background:
+            self.__backgroundFrame()
+
+    def __backgroundFrame(self):
+        """
+        Simulate an ECU that sends a frame while the bus is idle: skip its
+        duration in one step, without holding the lock, then count it.
+        The bus is BUSY meanwhile, so the ECUs wait for the end of the frame
+        (waitIdleStatus, transmitBit) instead of sending bits nobody processes.
+        """
+        
+        with self.__lock:
+            self.__status = self.BUSY
+            self.__idleEvent.clear()
+        self.__clock.waitTicks(self.__backgroundTicks)
+        with self.__lock:
+            # Status, tick and count are updated together, waiters see a consistent state
+            self.__status = self.IDLE
+            self.__idleEvent.set()
+            self.__tick += self.__backgroundBits
+            self.__count+=1
+            self.__backgroundFrames += 1
+            self.__conseutiveIdle = 0
+            self.__frameCountEvent.set()
+            self.__notifyFrameCount()
+
+    def arbitrate(self, transmissions: list) -> list:
+        """
+        Frame-level mode: transmit at once the frames that start in the current bus cycle.
+
+        The contention is resolved from the bit sequences (see arbitration.py),
+        then every bit seen on the bus is processed as transmitBit() and process()
+        would do, one bus cycle each. Afterwards the bus is in WAIT status, as
+        after the last bit of a frame.
+
+        Args:
+            transmissions (list): (sender, bits, errorFlag) per ECU, see ECU.getFrameBits and ECU.getErrorFlag.
+
+        Returns:
+            list: (status, lastIndex) per ECU, lastIndex is the number of bus cycles
+                  after the current one at which the ECU sent its last bit.
+        """
+
+        busBits, outcomes = resolveContention([(bits, errorFlag) for _, bits, errorFlag in transmissions])
+        lastIndex = len(busBits) - 1
+
+        with self.__lock:
+            for bit in busBits:
+                self.__frame.append(bit)
+                for listener in self.__listeners:
+                    listener.feedBit(bit)
+            self.__tick += len(busBits)
+
+            self.__frameSenders.update(sender for sender, _, _ in transmissions)
+
+            # The sender of the last bit is the first ECU still transmitting
+            for (sender, _, _), (_, last) in zip(transmissions, outcomes):
+                if last == lastIndex:
+                    self.__lastSender = sender
+                    break
+            self.__currentSender = None
+
+            self.__lastSendedBit = busBits[-1]
+            self.__current_bit = 0b1
+            self.__status = self.WAIT
+            self.__idleEvent.clear()
+            self.__frameCountEvent.clear()
+            self.__waitEvent.set()
+        return outcomes
+
+    def addListener(self, listener):
+        """
+        Register a listener that receives the bus traffic bit by bit.
+
+        The listener's feedBit(bit) is called for every bit processed by the bus
+        and endFrame() when the frame ends, both from the bus thread while the
+        bus is locked, so they must not call back into locking CanBus methods.
+
+        Args:
+            listener: Object with feedBit(bit) and endFrame() methods (e.g. FrameDecoder).
+        """
+        with self.__lock:
+            self.__listeners.append(listener)
+
+    def removeListener(self, listener):
+        """
+        Unregister a listener.
+
+        Args:
+            listener: A listener previously registered with addListener().
+        """
+        with self.__lock:
+            self.__listeners.remove(listener)
+
     def getSendedFrame(self) -> list:
         """Returns the last transmitted frame."""
         return self.__lastSendedFrame
+
+    def getFrameSenders(self) -> set:
+        """Returns the names of the ECUs that transmitted bits of the last frame (data or error flag)."""
+        return self.__lastFrameSenders
     
+    def getSender(self) -> str:
+        """Returns the name of the ECU that transmitted the last bit (None if unknown)."""
+        return self.__lastSender
+
+    def getTick(self) -> int:
+        """Returns the number of bus cycles (bit times) processed so far."""
+        return self.__tick
+
+    def getBackgroundBits(self) -> int:
+        """Returns the length of a background frame in bus cycles."""
+        return self.__backgroundBits
+
+    def getBackgroundFrames(self) -> int:
+        """Returns the number of background frames counted while the bus was idle."""
+        return self.__backgroundFrames
+
     def getSendedBit(self) -> int:
         """Returns the last transmitted bit."""
         return self.__lastSendedBit
@@ -115,6 +268,7 @@ class CanBus:
         self.__lastSendedBit = 0b1
 
         self.__frame = []
+        self.__frameSenders = set()
 
         self.__status = self.IDLE
         self.__idleEvent.set() 
@@ -146,6 +300,36 @@ class CanBus:
         """Waits for the frame count to increase."""
         self.__frameCountEvent.wait()
         
+    def __notifyFrameCount(self):
+        """
+        Wake the threads waiting for a frame count that has been reached (called with the lock held).
+        """
+        waiters = self.__frameCountWaiters
+        while waiters and waiters[0][0] <= self.__count:
+            heapq.heappop(waiters)[2].set()
+
+    def __waitCount(self, frameNumber: int = None, period: int = None) -> int:
+        """
+        Block until the frame count reaches a number (or a multiple of a period), without polling.
+
+        Args:
+            frameNumber (int, optional): The target frame count.
+            period (int, optional): Wait for the first multiple of period not yet passed instead.
+
+        Returns:
+            int: The frame count that satisfied the wait.
+        """
+        with self.__lock:
+            if period is not None:
+                frameNumber = -(-self.__count // period) * period
+            if self.__count >= frameNumber:
+                return self.__count
+            event = threading.Event()
+            heapq.heappush(self.__frameCountWaiters, (frameNumber, self.__waiterOrder, event))
+            self.__waiterOrder += 1
+        event.wait() # set by process() when the count reaches frameNumber
+        return frameNumber
+
     # I tried to avoid to use this method, since is not correct that the CanBus inform the ECU when to send a frame 
     def waitFrameCountMultiple(self, period):
         """
@@ -157,9 +341,7 @@ class CanBus:
         Returns:
             int: The current frame count.
         """
-        while self.__count % period != 0: # wait until the frame count is a multiple of period
-            time.sleep(0.001)
-        return self.__count
+        return self.__waitCount(period=period)
             
     # I tried to avoid to use this method, since is not correct that the CanBus inform the ECU when to send a frame 
     def waitFrameCount(self, frameNumber):
@@ -169,5 +351,4 @@ class CanBus:
         Args:
             frameNumber (int): The target frame count.
         """
-        while self.__count < frameNumber: # wait until the frame count is equal to frameNumber
-            time.sleep(0.001)
+        self.__waitCount(frameNumber)
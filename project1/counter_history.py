@@ -0,0 +1,139 @@
+"""
+counter_history.py - Compact history of an error counter (TEC or REC).
+
+Values are stored as int16 and tick stamps as int64 in two `array` buffers,
+8 + 2 bytes per change instead of a small list per change. The history is
+either unbounded (the buffers double when full) or a ring buffer keeping
+the last maxlen changes. getValues() and getTicks() return memoryviews of
+the buffers and toNumpy() wraps them without copying.
+"""
+
+from array import array
+
+
+class CounterHistory:
+    """
+    History of the values of a counter, stamped with the clock tick of each change.
+    """
+
+    def __init__(self, maxlen: int = None, capacity: int = 64):
+        """
+        Initialize an empty history.
+
+        Args:
+            maxlen (int, optional): Keep only the last maxlen changes (ring buffer), None for no bound.
+            capacity (int): Initial capacity of an unbounded history.
+        """
+
+        self.maxlen = maxlen
+        self.__capacity = maxlen if maxlen is not None else capacity
+        self.__values = array("h", bytes(2 * self.__capacity))
+        self.__ticks = array("q", bytes(8 * self.__capacity))
+        self.__start = 0  # position of the oldest change (ring buffer)
+        self.__size = 0
+        self.__dropped = 0  # changes overwritten by the ring buffer
+
+    def append(self, value: int, tick: int):
+        """
+        Record a change of the counter.
+
+        Args:
+            value (int): New value of the counter.
+            tick (int): Clock tick of the change.
+        """
+
+        if self.__size < self.__capacity:
+            position = self.__start + self.__size
+            if position >= self.__capacity:
+                position -= self.__capacity
+            self.__size += 1
+        elif self.maxlen is not None:  # full ring, overwrite the oldest change
+            position = self.__start
+            self.__start = position + 1 if position + 1 < self.__capacity else 0
+            self.__dropped += 1
+        else:
+            self.__grow()
+            position = self.__size
+            self.__size += 1
+        self.__values[position] = value
+        self.__ticks[position] = tick
+
+    def __grow(self):
+        """
+        Double the capacity. New buffers are allocated, so the views already returned stay valid.
+        """
+
+        values = array("h", bytes(4 * self.__capacity))
+        ticks = array("q", bytes(16 * self.__capacity))
+        values[:self.__size] = self.__values[:self.__size]
+        ticks[:self.__size] = self.__ticks[:self.__size]
+        self.__values, self.__ticks = values, ticks
+        self.__capacity *= 2
+
+    def __len__(self) -> int:
+        return self.__size
+
+    def __ordered(self):
+        """
+        Rotate a wrapped ring buffer in place, so the changes are contiguous from the oldest.
+        """
+
+        if self.__start:
+            start = self.__start
+            self.__values[:] = self.__values[start:] + self.__values[:start]
+            self.__ticks[:] = self.__ticks[start:] + self.__ticks[:start]
+            self.__start = 0
+
+    def getValues(self) -> memoryview:
+        """
+        Get the values, from the oldest change (zero-copy).
+
+        Returns:
+            memoryview: int16 view of the buffer, valid until the next append.
+        """
+
+        self.__ordered()
+        return memoryview(self.__values)[:self.__size]
+
+    def getTicks(self) -> memoryview:
+        """
+        Get the tick stamps, from the oldest change (zero-copy).
+
+        Returns:
+            memoryview: int64 view of the buffer, valid until the next append.
+        """
+
+        self.__ordered()
+        return memoryview(self.__ticks)[:self.__size]
+
+    def getLast(self) -> tuple:
+        """Returns the last (value, tick), None if the history is empty."""
+        if not self.__size:
+            return None
+        position = (self.__start + self.__size - 1) % self.__capacity
+        return self.__values[position], self.__ticks[position]
+
+    def getDropped(self) -> int:
+        """Returns the number of changes overwritten by the ring buffer."""
+        return self.__dropped
+
+    def toNumpy(self) -> tuple:
+        """
+        Wrap the history into NumPy arrays without copying (for plotting or export).
+
+        Returns:
+            tuple: (values, ticks) as int16 and int64 arrays, valid until the next append.
+        """
+
+        import numpy as np  # optional dependency, only needed to analyse the history
+        return np.frombuffer(self.getValues(), dtype=np.int16), np.frombuffer(self.getTicks(), dtype=np.int64)
+
+    def toList(self) -> list:
+        """
+        Get the history as a list of [value, tick] pairs.
+
+        Returns:
+            list: One pair per change, from the oldest.
+        """
+
+        return [[value, tick] for value, tick in zip(self.getValues(), self.getTicks())]
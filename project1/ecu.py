@@ -1,7 +1,9 @@
 from frame import Frame
+from bit_codec import packBits
+from frame_cache import FrameCache, FRAME_CACHE
+from counter_history import CounterHistory
 from can_bus import CanBus
 from global_clock import GlobalClock
-import time
 
 class ECU:
     """
@@ -11,30 +13,47 @@ class ECU:
         ERROR_ACTIVE: The ECU is in the active error state.
         ERROR_PASSIVE: The ECU is in the passive error state.
         BUS_OFF: The ECU is in the bus-off state and cannot send messages.
+        PASSIVE_LIMIT: The ECU is error passive above this TEC or REC.
+        BUS_OFF_LIMIT: The ECU is bus-off above this TEC.
 
-        COMPLITED: Frame transmission completed successfully.
+        COMPLITED: Frame transmission (or reception) completed successfully.
         BIT_ERROR: A bit error was detected during transmission.
-        STUFF_ERROR: A stuffing error was detected during transmission.
+        STUFF_ERROR: A stuffing error was detected during transmission (or reception).
         LOWER_FRAME_ID: Another ECU has a lower frame ID (priority conflict).
+        CRC_ERROR: The CRC of a received frame does not match.
+        FORM_ERROR: A received frame has an invalid fixed-form field.
     """
 
     # ECU status
     ERROR_ACTIVE = "ERROR_ACTIVE"
     ERROR_PASSIVE = "ERROR_PASSIVE"
     BUS_OFF = "BUS_OFF"
+    PASSIVE_LIMIT = 127
+    BUS_OFF_LIMIT = 255
 
     # Transmission status
     COMPLITED = "COMPLITED"
     BIT_ERROR = "BIT_ERROR"
     STUFF_ERROR = "STUFF_ERROR"
     LOWER_FRAME_ID = "LOWER_FRAME_ID"
+    CRC_ERROR = Frame.CRC_ERROR
+    FORM_ERROR = Frame.FORM_ERROR
 
     # Error flags
     __ERROR_ACTIVE_FLAG = [0b0] * 6  # Error flag for active state
     __ERROR_PASSIVE_FLAG = [0b1] * 6  # Error flag for passive state
 
+    # Checks of a bit, see startFrame()
+    __CHECK_ID = 1  # arbitration field, a dominant bus bit over a recessive one loses the arbitration
+    __CHECK_BIT = 2  # the bus bit must be the bit sent
+    __STUFFED = 4  # stuffed region, 6 equal bits are a stuff error
 
-    def __init__(self, name: str, canBus: 'CanBus', clock : 'GlobalClock'):
+    __REC_LIMIT = 128  # the REC stops counting once the ECU is error passive (ISO 11898-1)
+    __schedules = {}  # frame length -> checks of each bit
+
+
+    def __init__(self, name: str, canBus: 'CanBus', clock : 'GlobalClock', bitCache: 'FrameCache' = FRAME_CACHE,
+                 historySize: int = None):
         """
         Initialize an ECU instance.
 
@@ -43,16 +62,27 @@ class ECU:
             canBus (CanBus): CAN bus instance the ECU is connected to.
 
             clock (GlobalClock): Clock for synchronization.
+            bitCache (FrameCache): Cache of encoded frames (default: cache shared by every ECU).
+            historySize (int, optional): Keep only the last historySize TEC and REC changes, None for no bound.
         """
         
         self.name = name
         self.__canBus = canBus
         self.__clock = clock
+        self.__bitCache = bitCache
 
         self.__TEC = 0  # Transmit Error Counter
-        self.__REC = 0  # Receive Error Counter (not fully used)
+        self.__REC = 0  # Receive Error Counter, see receiveFrame()
         self.__status = self.ERROR_ACTIVE # ECU start status
-        self.__TECvalues = [[0, time.time()]]  # Store TEC changes over time
+        self.__TECvalues = CounterHistory(historySize)  # Store TEC changes over time (clock ticks)
+        self.__RECvalues = CounterHistory(historySize)  # Store REC changes over time (clock ticks)
+        self.__TECvalues.append(0, self.__clock.getTick())
+        self.__RECvalues.append(0, self.__clock.getTick())
+        self.__lastReceivedFrame = None
+        self.__errorFlag = None # error flag being transmitted, see startFrame()
+        self.__frame = None # frame being transmitted
+        self.__metrics = None # BusMetrics, see setMetrics()
+        self.__dueTick = None # bus tick at which the frame being sent was due
 
 
     def sendFrame(self, frame : 'Frame') -> str:
@@ -69,74 +99,277 @@ class ECU:
         if self.__status == self.BUS_OFF: # if bus off, do not send
             return
         
-        i = 0 # bit index
-        frameBits = frame.getBits() # get frame bits
-        recivedBit = [] # store bits recived from canbus
+        self.startFrame(frame)
+        canBus = self.__canBus
+        name = self.name
+        status = None
+        while status is None:
+            canBus.transmitBit(self.getNextBit(), name) # Send a bit
+            canBus.waitWaitStatus() # Wait the canbus to process the bit
+            status = self.checkBit(canBus.getSendedBit()) # Compare with the bit transmitted on the bus
+
+            if status is None and self.__errorFlag is None:
+                self.__clock.wait() # Sync, the error flag follows the error without waiting
+
+        return status
+
+    def startFrame(self, frame : 'Frame', bits : tuple = None):
+        """
+        Prepare the bit by bit transmission of a frame.
+
+        sendFrame() drives the transmission with threads, a simulation engine can
+        drive it directly: for every bus cycle transmit getNextBit(), then pass
+        the bit read from the bus to checkBit() until it returns a status.
+
+        Args:
+            frame (Frame): Frame to be transmitted.
+            bits (tuple, optional): Stuffed bits to send instead of the encoded frame
+                                    (e.g. frames longer than classic CAN frames).
+        """
+
+        self.__frame = frame
+        self.__frameBits = bits if bits is not None else self.__bitCache.getBits(frame) # encoded once per frame
+        self.__frameLength = len(self.__frameBits)
+        self.__schedule = self.__bitSchedule(self.__frameLength) # checks of each bit, shared by the frames of the same length
+        self.__bitIndex = 0 # bit index
+        self.__runBit = None # last bit read from the bus
+        self.__runLength = 0 # consecutive equal bits read from the bus, for the stuffing rule
+        self.__errorFlag = None # error flag being transmitted after an error
+        self.__errorFlagIndex = 0
+        self.__errorType = None # transmission status reported after the error flag
+        if self.__metrics is not None:
+            self.__startTick = self.__canBus.getTick()
+
+    @classmethod
+    def __bitSchedule(cls, length : int) -> tuple:
+        """
+        Get the checks applied to each bit of a frame, they only depend on the frame length.
+
+        Args:
+            length (int): Number of stuffed bits of the frame.
+
+        Returns:
+            tuple: Per bit, a combination of the CHECK_ID, CHECK_BIT and STUFFED flags.
+        """
+
+        schedule = cls.__schedules.get(length)
+        if schedule is None:
+            stuffedEnd = length - Frame.TAIL_LENGTH # the tail after the CRC is not stuffed
+            ackSlot = length - Frame.ACK_OFFSET # receivers overwrite the recessive ACK slot
+            schedule = []
+            for i in range(length):
+                check = cls.__CHECK_ID if 1 <= i <= 11 else cls.__CHECK_BIT if i > 11 and i != ackSlot else 0
+                schedule.append(check | (cls.__STUFFED if i < stuffedEnd else 0))
+            schedule = cls.__schedules.setdefault(length, tuple(schedule))
+        return schedule
+
+    def getFrameBits(self, frame : 'Frame') -> tuple:
+        """
+        Get the bits transmitted for a frame, from the ECU's frame cache.
+
+        Args:
+            frame (Frame): Frame to be transmitted.
+
+        Returns:
+            tuple: The stuffed bit representation of the frame.
+        """
+        return self.__bitCache.getBits(frame)
+
+    def getErrorFlag(self) -> list:
+        """Get the error flag the ECU sends after an error (depends on its error state)."""
+        return self.__ERROR_ACTIVE_FLAG if self.__status == self.ERROR_ACTIVE else self.__ERROR_PASSIVE_FLAG
+
+    def endTransmission(self, status : str) -> str:
+        """
+        Update the Transmit Error Counter for a transmission resolved at frame level (see CanBus.arbitrate),
+        the frame must have been passed to startFrame().
+
+        Args:
+            status (str): Transmission status (COMPLITED, LOWER_FRAME_ID, BIT_ERROR, or STUFF_ERROR).
+
+        Returns:
+            str: The same status.
+        """
+
+        if status == self.COMPLITED:
+            self.__TECdecrease()
+        elif status in (self.BIT_ERROR, self.STUFF_ERROR):
+            self.__activeFlag = self.__status == self.ERROR_ACTIVE # flag sent before the TEC increase
+            self.__TECincrease()
+        return self.__endFrame(status)
+
+    def setMetrics(self, metrics : 'BusMetrics'):
+        """
+        Report the transmissions of the ECU to a BusMetrics (None to stop reporting).
+
+        Args:
+            metrics (BusMetrics): The metrics.
+        """
+        self.__metrics = metrics
+        self.__dueTick = None
+
+    def frameDue(self):
+        """
+        Notify that the slot of the next frame has been reached: the time until the
+        transmission that is not lost in arbitration starts is reported as latency.
+        """
+        if self.__metrics is not None and self.__dueTick is None:
+            self.__dueTick = self.__canBus.getTick()
+
+    def __endFrame(self, status : str) -> str:
+        """
+        Report the end of a transmission to the metrics.
 
-        while True:
-            self.__canBus.transmitBit(frameBits[i]) # Send a bit
-            self.__canBus.waitWaitStatus() # Wait the canbus to process the bit
-            lastSendedBit = self.__canBus.getSendedBit() # Get the bit transmitted on the bus
-            recivedBit.append(lastSendedBit)
+        Args:
+            status (str): Transmission status.
+
+        Returns:
+            str: The same status.
+        """
+
+        if self.__metrics is None:
+            return status
+
+        errorFlag = self.__activeFlag if status in (self.BIT_ERROR, self.STUFF_ERROR) else None
+        self.__metrics.transmission(self.name, self.__frame.getID(), status, errorFlag)
+        if status != self.LOWER_FRAME_ID and self.__dueTick is not None:
+            self.__metrics.latency(self.name, self.__startTick - self.__dueTick)
+            self.__dueTick = None
+        return status
+
+    def getNextBit(self) -> int:
+        """
+        Get the bit to transmit in the current bus cycle.
+
+        Returns:
+            int: The next frame bit, or the next bit of the error flag after an error.
+        """
+
+        if self.__errorFlag is not None:
+            return self.__errorFlag[self.__errorFlagIndex]
+        return self.__frameBits[self.__bitIndex]
 
+    def checkBit(self, lastSendedBit : int) -> str:
+        """
+        Check the bit transmitted on the bus against the bit sent by the ECU.
+
+        Args:
+            lastSendedBit (int): Bit read from the bus after the current cycle.
+
+        Returns:
+            str: Transmission status (COMPLITED, LOWER_FRAME_ID, BIT_ERROR, or STUFF_ERROR),
+                 None while the transmission continues.
+        """
+
+        # Error flag, its bits are not checked
+        if self.__errorFlag is not None:
+            self.__errorFlagIndex += 1
+            if self.__errorFlagIndex < len(self.__errorFlag):
+                return None
+            self.__errorFlag = None
+            self.__TECincrease()
+            return self.__endFrame(self.__errorType)
+
+        i = self.__bitIndex
+        expectedBit = self.__frameBits[i]
+        check = self.__schedule[i]
+
+        # Length of the run of equal bits on the bus, for the stuffing rule
+        if lastSendedBit == self.__runBit:
+            self.__runLength += 1
+        else:
+            self.__runBit = lastSendedBit
+            self.__runLength = 1
+
+        if expectedBit != lastSendedBit:
             # Check the ID field (first 11 bits)
-            if 1 <= i <= 11:
-                if frameBits[i] > lastSendedBit:
-                    return self.LOWER_FRAME_ID # Another ECU has a lower ID, stop transmission
+            if check & self.__CHECK_ID:
+                if expectedBit > lastSendedBit:
+                    return self.__endFrame(self.LOWER_FRAME_ID) # Another ECU has a lower ID, stop transmission
 
             # Check for bit errors
-            elif i > 11:
-                if frameBits[i] != lastSendedBit: # detect bit error
-                    self.__sendError()
-                    self.__TECincrease()
-                    return self.BIT_ERROR
-            
-            # Check for stuffing rule violations
-            if self.__checkStuffRule(recivedBit):
-                self.__sendError()
-                self.__TECincrease()
-                return self.STUFF_ERROR
-                
-            i += 1
-            if i == len(frameBits): # Transmission completed
-                self.__TECdecrease()
-                return self.COMPLITED
-            
-            self.__clock.wait() # Sync
+            elif check & self.__CHECK_BIT:
+                self.__sendError(self.BIT_ERROR)
+                return None
+
+        # Check for stuffing rule violations (6 equal bits)
+        if self.__runLength >= 6 and check & self.__STUFFED:
+            self.__sendError(self.STUFF_ERROR)
+            return None
+
+        i += 1
+        self.__bitIndex = i
+        if i == self.__frameLength: # Transmission completed
+            self.__TECdecrease()
+            return self.__endFrame(self.COMPLITED)
+        return None
     
     def __TECincrease(self):
         """Increase the Transmit Error Counter (TEC) and update the ECU's state."""
         self.__TEC += 8
-        self.__TECvalues.append([self.__TEC, time.time()])
+        self.__TECvalues.append(self.__TEC, self.__clock.getTick())
         self.__errorStatus()
 
     def __TECdecrease(self):
         """Decrease the Transmit Error Counter (TEC) and update the ECU's state."""
         if self.__TEC > 0:
             self.__TEC -= 1
-        self.__TECvalues.append([self.__TEC, time.time()])
+        self.__TECvalues.append(self.__TEC, self.__clock.getTick())
         self.__errorStatus()
 
-    # def __RECincrease(self):
-    #     if not self.checkBound(self.__REC):
-    #         return
-    #     self.__REC += 8
-    #     self.__RECvalues.append([self.__REC, time.time()])
-    #     self.errorStatus()
+    def __RECincrease(self):
+        """Increase the Receive Error Counter (REC), up to __REC_LIMIT, and update the ECU's state."""
+        if self.__REC < self.__REC_LIMIT:
+            self.__REC += 1
+            self.__RECvalues.append(self.__REC, self.__clock.getTick())  # every ECU receives every frame, changes only
+            self.__errorStatus()
 
-    # def __RECdecrease(self):
-    #     if self.__REC > 0:
-    #         self.__REC -= 1
-    #     self.__RECvalues.append([self.__REC, time.time()])
-    #     self.errorStatus()
+    def __RECdecrease(self):
+        """Decrease the Receive Error Counter (REC) and update the ECU's state."""
+        if self.__REC == 0:
+            return
+        if self.__REC > self.PASSIVE_LIMIT:  # an error passive receiver goes back to 127 (ISO 11898-1: 119 to 127)
+            self.__REC = self.PASSIVE_LIMIT
+        else:
+            self.__REC -= 1
+        self.__RECvalues.append(self.__REC, self.__clock.getTick())
+        self.__errorStatus()
+
+    def receiveFrame(self, bits: list, decoded: tuple = None) -> str:
+        """
+        Check a frame received from the CAN bus, updating the Receive Error Counter.
+
+        The error flag of the receiver is not transmitted, since the frame has
+        already ended when the bits are read from the bus.
+
+        Args:
+            bits (list): Bits of the frame, as returned by CanBus.getSendedFrame.
+            decoded (tuple, optional): (frame, error) of Frame.decodePackedBits for these bits,
+                                       when the frame is already decoded for other receivers.
+
+        Returns:
+            str: Reception status (COMPLITED, STUFF_ERROR, CRC_ERROR or FORM_ERROR).
+        """
+
+        if self.__status == self.BUS_OFF: # if bus off, do not receive
+            return
+        
+        frame, error = decoded if decoded is not None else Frame.decodePackedBits(*packBits(bits))
+        if error is not None:
+            self.__RECincrease()
+            return error
+
+        self.__lastReceivedFrame = frame
+        self.__RECdecrease()
+        return self.COMPLITED
 
     def __errorStatus(self):
         """Update the ECU's error state based on TEC and REC values."""
-        if self.__TEC > 127 or self.__REC > 127:
+        if self.__TEC > self.PASSIVE_LIMIT or self.__REC > self.PASSIVE_LIMIT:
             self.__status = self.ERROR_PASSIVE
-        if self.__TEC <= 127 and self.__REC <= 127:
+        if self.__TEC <= self.PASSIVE_LIMIT and self.__REC <= self.PASSIVE_LIMIT:
             self.__status = self.ERROR_ACTIVE
-        if self.__TEC > 255:
+        if self.__TEC > self.BUS_OFF_LIMIT:
             self.__status = self.BUS_OFF
 
     def getStatus(self) -> str:
@@ -147,36 +380,31 @@ class ECU:
         """Get the current Transmit Error Counter (TEC)."""
         return self.__TEC
     
-    def getTECs(self) -> list:
-        """Get the history of TEC values."""
+    def getTECs(self) -> 'CounterHistory':
+        """Get the history of TEC values, stamped with clock ticks."""
         return self.__TECvalues
     
-    # def getRECs(self):
-    #     return self.__RECvalues
-    
-    def __checkStuffRule(self, recivedBit : list) -> bool:
-        """
-        Check if the stuffing rule is violated.
+    def getREC(self) -> int:
+        """Get the current Receive Error Counter (REC)."""
+        return self.__REC
 
-        Args:
-            recivedBit (list): Received bits to check.
+    def getRECs(self) -> 'CounterHistory':
+        """Get the history of REC changes, stamped with clock ticks."""
+        return self.__RECvalues
 
-        Returns:
-            bool: True if stuffing rule is violated, False otherwise.
-        """
-        
-        if len(recivedBit) < 6:
-            return False
-
-        last_six_bits = recivedBit[-6:]
-        return all(bit == 0 for bit in last_six_bits) or all(bit == 1 for bit in last_six_bits)
+    def getReceivedFrame(self) -> 'Frame':
+        """Get the last frame received without errors."""
+        return self.__lastReceivedFrame
     
-    def __sendError(self):
+    def __sendError(self, errorType : str):
         """
-        Send an error flag on the CAN bus based on the ECU's error state.
+        Start sending an error flag on the CAN bus based on the ECU's error state.
+
+        Args:
+            errorType (str): Transmission status reported once the flag is sent (BIT_ERROR or STUFF_ERROR).
         """
         
-        error_flag = self.__ERROR_ACTIVE_FLAG if self.__status == self.ERROR_ACTIVE else self.__ERROR_PASSIVE_FLAG
-        for bit in error_flag:
-            self.__canBus.transmitBit(bit)
-            self.__canBus.waitWaitStatus()
\ No newline at end of file
+        self.__errorFlag = self.getErrorFlag()
+        self.__activeFlag = self.__errorFlag is self.__ERROR_ACTIVE_FLAG
+        self.__errorFlagIndex = 0
+        self.__errorType = errorType
@@ -0,0 +1,165 @@
+"""
+engine.py - Discrete-event engine running the simulation in virtual time.
+
+The threaded simulation advances on GlobalClock, which sleeps for a clock
+period at every tick. Here time is an integer tick counter that jumps
+straight to the next scheduled event, so a simulation runs as fast as the
+CPU allows and its result does not depend on the machine load.
+"""
+
+import heapq
+import time
+
+
+class VirtualClock:
+    """
+    Virtual-time clock, with the same interface as GlobalClock.
+
+    wait() advances the tick counter by one instead of blocking, so CanBus
+    and ECU can be driven by a single thread. An optional pacing factor
+    slows the clock down to a multiple of real time (1.0 = one tick every
+    period seconds, 2.0 = twice as fast, 0 = as fast as possible).
+    """
+
+    def __init__(self, period: float, pacing: float = 0.0):
+        """
+        Initialize the clock.
+
+        Args:
+            period (float): Duration of a tick in (virtual) seconds.
+            pacing (float): Speed relative to real time, 0 to disable pacing.
+        """
+
+        self.period = period
+        self.pacing = pacing
+        self.__tick = 0
+        self.__wallStart = time.perf_counter()
+
+    def wait(self):
+        """
+        Let one tick pass.
+        """
+        self.advance(self.__tick + 1)
+
+    def waitTicks(self, ticks: int):
+        """
+        Let a number of ticks pass, in a single step.
+
+        Args:
+            ticks (int): Number of ticks.
+        """
+        self.advance(self.__tick + ticks)
+
+    def advance(self, tick: int):
+        """
+        Move the clock forward to a tick, sleeping only if pacing is enabled.
+
+        Args:
+            tick (int): Target tick, ignored if it is not in the future.
+        """
+
+        if tick <= self.__tick:
+            return
+        self.__tick = tick
+
+        if self.pacing > 0:
+            # Deadlines are absolute, so sleep inaccuracies do not accumulate
+            delay = self.__wallStart + tick * self.period / self.pacing - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def getTick(self) -> int:
+        """Returns the current tick."""
+        return self.__tick
+
+    def time(self) -> float:
+        """
+        Get the current virtual time, used to timestamp the simulation events.
+
+        Returns:
+            float: Seconds since the start of the simulation.
+        """
+        return self.__tick * self.period
+
+
+class Engine:
+    """
+    Event queue ordered by tick and phase.
+
+    Events scheduled for the same tick run in phase order, and in scheduling
+    order within a phase. The phases model a bus cycle: the ECUs drive their
+    bits (TRANSMIT), the bus samples them (PROCESS), then the ECUs read the
+    bus (OBSERVE).
+
+    Attributes:
+        TRANSMIT: Phase of the events that write on the bus.
+        PROCESS: Phase of the bus processing.
+        OBSERVE: Phase of the events that read the bus.
+    """
+
+    TRANSMIT = 0
+    PROCESS = 1
+    OBSERVE = 2
+
+    def __init__(self, clock: 'VirtualClock'):
+        """
+        Initialize the engine.
+
+        Args:
+            clock (VirtualClock): Clock advanced to the tick of each event.
+        """
+
+        self.clock = clock
+        self.__queue = []
+        self.__sequence = 0  # tie-breaker, keeps the scheduling order
+        self.__events = 0
+        self.__stopped = False
+
+    def schedule(self, tick: int, callback, phase: int = TRANSMIT):
+        """
+        Schedule a callback.
+
+        Args:
+            tick (int): Tick of the event, an event in the past runs as soon as possible.
+            callback (callable): Function called without arguments.
+            phase (int): TRANSMIT, PROCESS or OBSERVE.
+        """
+
+        heapq.heappush(self.__queue, (tick, phase, self.__sequence, callback))
+        self.__sequence += 1
+
+    def stop(self):
+        """Stop the engine after the current event."""
+        self.__stopped = True
+
+    def run(self, maxTick: int = None) -> int:
+        """
+        Run the events until the queue is empty, stop() is called or maxTick is reached.
+
+        Args:
+            maxTick (int, optional): Last tick to simulate.
+
+        Returns:
+            int: Tick of the clock when the engine stopped.
+        """
+
+        self.__stopped = False
+        queue = self.__queue
+        clock = self.clock
+        while queue and not self.__stopped:
+            tick = queue[0][0]
+            if maxTick is not None and tick > maxTick:
+                break
+            _, _, _, callback = heapq.heappop(queue)
+            clock.advance(tick)
+            callback()
+            self.__events += 1
+        return clock.getTick()
+
+    def getEvents(self) -> int:
+        """Returns the number of events processed so far."""
+        return self.__events
+
+    def getPending(self) -> int:
+        """Returns the number of events in the queue."""
+        return len(self.__queue)
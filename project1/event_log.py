@@ -0,0 +1,71 @@
+"""
+event_log.py - Buffered log of the simulation events.
+
+The ECUs report every transmission, which is too much output to print when
+thousands of scenarios run back to back. EventLog keeps the events in a
+buffer and writes them to a stream in blocks (bufferEvents=1 prints them as
+they happen), or only counts them when there is no stream.
+"""
+
+import threading
+
+
+class EventLog:
+    """
+    Buffer of (time, message) events, optionally written to a text stream.
+    """
+
+    def __init__(self, stream=None, bufferEvents: int = 4096, timestamps: bool = False):
+        """
+        Initialize the log.
+
+        Args:
+            stream (file, optional): Text stream receiving the events (e.g. sys.stdout or an open file),
+                                     None to only count them.
+            bufferEvents (int): Events buffered before writing them to the stream.
+            timestamps (bool): Prefix each line with the time of the event.
+        """
+
+        self.__stream = stream
+        self.__bufferEvents = bufferEvents
+        self.__timestamps = timestamps
+        self.__buffer = []
+        self.__count = 0
+        self.__lock = threading.Lock()  # the ECU threads log concurrently
+
+    def log(self, message: str, time: float = None):
+        """
+        Record an event.
+
+        Args:
+            message (str): Description of the event.
+            time (float, optional): Time of the event in seconds.
+        """
+
+        with self.__lock:
+            self.__count += 1
+            if self.__stream is None:
+                return
+            self.__buffer.append((time, message))
+            if len(self.__buffer) >= self.__bufferEvents:
+                self.__write()
+
+    def flush(self):
+        """Write the buffered events to the stream."""
+        with self.__lock:
+            self.__write()
+
+    def __write(self):
+        """Write the buffered events to the stream (called with the lock held)."""
+        if not self.__buffer:
+            return
+        if self.__timestamps:
+            lines = [f"{'' if time is None else f'{time:.6f}'}\t{message}\n" for time, message in self.__buffer]
+        else:
+            lines = [f"{message}\n" for _, message in self.__buffer]
+        self.__stream.write("".join(lines))
+        self.__buffer.clear()
+
+    def getCount(self) -> int:
+        """Returns the number of events recorded."""
+        return self.__count
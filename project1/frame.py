@@ -1,13 +1,24 @@
+import weakref
+from bit_codec import packBits, unpackBits, stuff, destuff, crc15
+
 class Frame:
     """
     A class representing a CAN bus frame in base format.
 
+    Frames are immutable and hashable, so they can be used as dict keys or
+    set members. Identical frames can share a single object through the
+    intern table (see Frame.intern).
+
     Attributes:
         SOF (int): Start of frame, fixed to 0.
         ID (int): 11 bits identifier for the frame.
         DLC (int): Data Length Code (number of data bytes, 0-8).
-        Data (list): List of up to 8 data bytes (default: [0] * 8).
+        Data (bytes): Up to 8 data bytes.
+        CRC (int): 15-bit CRC of SOF, ID, DLC and Data.
+        ACK (int): ACK slot, sent recessive (1) and overwritten with 0 by the receivers.
         EOF (int): End of frame, fixed to 0b1111111.
+
+        STUFF_ERROR, CRC_ERROR, FORM_ERROR: Errors reported by Frame.decodePackedBits.
     """
 
     # https://en.wikipedia.org/wiki/CAN_bus#Base_frame_format
@@ -16,12 +27,23 @@ class Frame:
     __SOF = 0b0  # Start of Frame, fixed
     __EOF = 0b1111111  # End of Frame, fixed
 
-    # Frame fields
-    __ID = 0b00000000000  # 11-bit identifier for CAN base
-    __DLC = 0  # Number of bytes of data 
-    __Data = [0] * 8  # Default: 8 bytes set to 0
-    # __CRC = None  # removed for semplicity
-    # __ACK = 0     # removed for semplicity
+    # Fixed-form tail after the CRC, not stuffed:
+    # CRC delimiter (1) + ACK slot (1) + ACK delimiter (1) + EOF (7)
+    __TAIL = 0b1111111111
+    TAIL_LENGTH = 10
+    ACK_OFFSET = 9  # Position of the ACK slot, counted from the end of the frame
+
+    # Decoding errors
+    STUFF_ERROR = "STUFF_ERROR"
+    CRC_ERROR = "CRC_ERROR"
+    FORM_ERROR = "FORM_ERROR"
+
+    # Frame fields: 11-bit identifier, number of bytes of data, data bytes
+    # The CRC is computed from the fields, the ACK slot is part of the tail
+    __slots__ = ("__ID", "__DLC", "__Data", "__hash", "__weakref__")
+
+    # Intern table, identical frames share one object while it is in use
+    __internTable = weakref.WeakValueDictionary()
 
     def __init__(self, ID: int, dlc: int, data: list):
         """
@@ -32,18 +54,81 @@ class Frame:
             dlc (int): Data Length Code (number of data bytes, 0-8).
             data (list): List of data bytes (length must match dlc).
         """
-        self.__ID = ID
-        self.__DLC = dlc  
-        self.__Data = data
+        data = bytes(data)
+        # Fields are read-only, set them bypassing __setattr__ (slot names are mangled)
+        object.__setattr__(self, "_Frame__ID", ID)
+        object.__setattr__(self, "_Frame__DLC", dlc)
+        object.__setattr__(self, "_Frame__Data", data)
+        object.__setattr__(self, "_Frame__hash", hash((ID, dlc, data)))
+
+    def __setattr__(self, name: str, value: object):
+        """Frames are immutable."""
+        raise AttributeError("Frame objects are immutable")
+
+    def __delattr__(self, name: str):
+        """Frames are immutable."""
+        raise AttributeError("Frame objects are immutable")
+
+    def __reduce__(self) -> tuple:
+        """Support pickling, used when frames are sent to other processes."""
+        return (self.__class__, (self.__ID, self.__DLC, self.__Data))
 
     def __str__(self) -> str:
         """Return a string representation of the frame."""
-        return f"Frame(SOF={self.__SOF}, ID={self.__ID}, DLC={self.__DLC}, Data={self.__Data}, EOF={self.__EOF})"
+        return f"Frame(SOF={self.__SOF}, ID={self.__ID}, DLC={self.__DLC}, Data={list(self.__Data)}, EOF={self.__EOF})"
 
     def getID(self) -> int:
         """Get the frame's identifier."""
         return self.__ID    
-    
+
+    def getDLC(self) -> int:
+        """Get the frame's Data Length Code."""
+        return self.__DLC
+
+    def getData(self) -> bytes:
+        """Get the frame's data bytes."""
+        return self.__Data
+
+    @classmethod
+    def intern(cls, frame: 'Frame') -> 'Frame':
+        """
+        Return the shared instance of a frame from the intern table.
+
+        Args:
+            frame (Frame): Frame to intern.
+
+        Returns:
+            Frame: The interned frame equal to the given one.
+        """
+
+        if frame is None:
+            return None
+        return cls.__internTable.setdefault((frame.__ID, frame.__DLC, frame.__Data), frame)
+
+    def getPackedBits(self) -> tuple:
+        """
+        Convert the frame into a packed integer, with bit stuffing applied.
+
+        Bit stuffing covers SOF to CRC, the tail (delimiters, ACK slot and EOF)
+        is appended as is.
+
+        Returns:
+            tuple: (value, length) of the stuffed frame, bits stored MSB first.
+        """
+
+        # Pack the fields with shifts: SOF | ID | DLC | Data | CRC
+        value = self.__SOF
+        value = (value << 11) | self.__ID
+        value = (value << 4) | self.__DLC
+        # SOF, ID and DLC are exactly 2 bytes, so the CRC input is byte aligned
+        crcInput = value.to_bytes(2, "big") + self.__Data
+        value = (value << (8 * len(self.__Data))) | int.from_bytes(self.__Data, "big")
+        value = (value << 15) | crc15(crcInput)
+        length = 1 + 11 + 4 + 8 * len(self.__Data) + 15
+
+        value, length = stuff(value, length)
+        return (value << self.TAIL_LENGTH) | self.__TAIL, length + self.TAIL_LENGTH
+
     def getBits(self) -> list:
         """
         Convert the frame into a list of bits, with bit stuffing applied.
@@ -51,129 +136,168 @@ class Frame:
         Returns:
             list: The stuffed bit representation of the frame.
         """
-        
-        # Convert fields to binary and concatenate them
-        sof_bits = [self.__SOF]
-        id_bits = [int(b) for b in f"{self.__ID:011b}"]
-        dlc_bits = [int(b) for b in f"{self.__DLC:04b}"]
-        data_bits = [int(bit) for byte in self.__Data for bit in f"{byte:08b}"]
-        eof_bits = [int(b) for b in f"{self.__EOF:07b}"]
-
-        # Combine all bit segments and apply stuffing
-        bitFrame = sof_bits + id_bits + dlc_bits + data_bits + eof_bits
-        return self.__addStuffing(bitFrame)
-    
+
+        return unpackBits(*self.getPackedBits())
+
     @classmethod
-    def fromBits(cls, bits: list) -> 'Frame':
+    def fromBits(cls, bits: list, intern: bool = False) -> 'Frame':
         """
         Create a Frame instance from a list of bits.
 
         Args:
             bits (list): List of bits representing a CAN frame.
+            intern (bool): Return the shared instance from the intern table.
 
         Returns:
             Frame: Decoded Frame object, or None if decoding fails.
         """
-        
-        try:
-            # Remove bit stuffing
-            bits = cls.__removeStuffing(bits)
-
-            # Minimum frame length: SOF (1) + ID (11) + DLC (4) + EOF (7)
-            min_length = 1 + 11 + 4 + 7
-            if len(bits) < min_length:
-                return None
-
-            # Decode fields from bits
-            ID = int("".join(map(str, bits[1:12])), 2)
-            DLC = int("".join(map(str, bits[12:16])), 2)
-
-            # Validate DLC
-            if not (0 <= DLC <= 8):
-                return None
-
-            # Decode Data Field
-            data_bits = bits[16:16 + (DLC * 8)]
-            data = [
-                int("".join(map(str, data_bits[i:i + 8])), 2)
-                for i in range(0, len(data_bits), 8)
-            ]
-
-            # Decode EOF
-            eof_start = 16 + (DLC * 8)
-            EOF = int("".join(map(str, bits[eof_start:eof_start + 7])), 2)
-
-            # Validate EOF
-            if EOF != 0b1111111:
-                return None
-
-            # Create and return the Frame instance
-            return cls(ID=ID, dlc=DLC, data=data)
-
-        except Exception:
+
+        if not bits:
             return None
-    
-    def __addStuffing(self, bitFrame: list) -> list:
+        return cls.fromPackedBits(*packBits(bits), intern=intern)
+
+    @classmethod
+    def fromPackedBits(cls, value: int, length: int, intern: bool = False) -> 'Frame':
         """
-        Apply bit stuffing to the frame.
+        Create a Frame instance from a packed stuffed bit sequence.
 
         Args:
-            bitFrame (list): Original frame bits.
+            value (int): Stuffed frame bits, MSB first.
+            length (int): Number of bits in value.
+            intern (bool): Return the shared instance from the intern table.
 
         Returns:
-            list: Frame bits with bit stuffing applied.
+            Frame: Decoded Frame object, or None if decoding fails.
         """
-        
-        stuffedFrame = []
-        count = 0
-        lastBit = None
-
-        for bit in bitFrame:
-            stuffedFrame.append(bit)
-            if bit == lastBit:
-                count += 1
-                if count == 5: # 5 consecutive bits of the same value add a bit of the opposite value
-                    stuffedFrame.append(1 - bit) # Add opposite bit
-                    bit = 1 - bit # Update last bit
-                    count = 1 # Reset count, 1 since we added a new bit
-            else:
-                count = 1
-            lastBit = bit
-
-        return stuffedFrame
-    
-    @staticmethod
-    def __removeStuffing(bitFrame: list) -> list:
+
+        return cls.decodePackedBits(value, length, intern)[0]
+
+    @classmethod
+    def decodePackedBits(cls, value: int, length: int, intern: bool = False) -> tuple:
         """
-        Remove bit stuffing from the frame.
+        Decode a packed stuffed bit sequence, reporting why decoding failed.
 
         Args:
-            bitFrame (list): Frame bits with stuffing.
+            value (int): Stuffed frame bits, MSB first.
+            length (int): Number of bits in value.
+            intern (bool): Return the shared instance from the intern table.
 
         Returns:
-            list: Frame bits with stuffing removed.
+            tuple: (frame, error), frame is None and error is STUFF_ERROR, CRC_ERROR
+                   or FORM_ERROR if decoding fails, error is None otherwise.
         """
-        
-        unstuffedFrame = []
-        count = 0
-        lastBit = None
-
-        for i in range(len(bitFrame)):
-            if count == 5: # 5 consecutive bits of the same, remove the next bit
-                count = 0
-                lastBit = None
-                continue
-            
-            bit = bitFrame[i]
-            if bit == lastBit:
-                count += 1
-            else:
-                count = 1
-            lastBit = bit
-            unstuffedFrame.append(bit)
-
-        return unstuffedFrame
-    
+
+        # Remove bit stuffing from SOF, ID and DLC (2 bytes)
+        header = destuff(value, length, 16)
+        if header is None:
+            return None, cls.STUFF_ERROR
+        if header[1] < 16:
+            return None, cls.FORM_ERROR
+
+        # Decode fields with shifts and masks
+        ID = (header[0] >> 4) & 0x7FF
+        DLC = header[0] & 0xF
+
+        # Validate DLC
+        if not (0 <= DLC <= 8):
+            return None, cls.FORM_ERROR
+
+        # Remove bit stuffing up to the end of the CRC
+        regionLength = 16 + (DLC * 8) + 15
+        region = destuff(value, length, regionLength)
+        if region is None:
+            return None, cls.STUFF_ERROR
+        regionValue, regionBits, consumed = region
+        if regionBits < regionLength or length - consumed < cls.TAIL_LENGTH:
+            return None, cls.FORM_ERROR
+
+        # Validate the tail: delimiters and EOF must be recessive, the ACK slot can be either value
+        tail = (value >> (length - consumed - cls.TAIL_LENGTH)) & cls.__TAIL
+        if tail | (1 << (cls.ACK_OFFSET - 1)) != cls.__TAIL:
+            return None, cls.FORM_ERROR
+
+        # Validate CRC
+        crcInput = (regionValue >> 15).to_bytes(2 + DLC, "big")
+        if crc15(crcInput) != regionValue & 0x7FFF:
+            return None, cls.CRC_ERROR
+
+        # Reuse the interned instance if requested, otherwise create a new Frame
+        data = crcInput[2:]
+        if intern:
+            frame = cls.__internTable.get((ID, DLC, data))
+            if frame is not None:
+                return frame, None
+            return cls.intern(cls(ID=ID, dlc=DLC, data=data)), None
+        return cls(ID=ID, dlc=DLC, data=data), None
+
+    @classmethod
+    def encodeMany(cls, frames: list) -> tuple:
+        """
+        Encode many frames at once, with bit stuffing applied.
+
+        Args:
+            frames (list): List of Frame objects.
+
+        Returns:
+            tuple: (bits, lengths), a NumPy uint8 matrix with one stuffed frame
+                   per row (padded with zeros) and the stuffed length of each row.
+        """
+
+        import numpy as np  # optional dependency, only needed for batch processing
+        import batch_codec
+
+        ids = np.fromiter((frame.__ID for frame in frames), dtype=np.int64, count=len(frames))
+        dlcs = np.fromiter((frame.__DLC for frame in frames), dtype=np.int64, count=len(frames))
+        dataLengths = np.fromiter((len(frame.__Data) for frame in frames), dtype=np.int64, count=len(frames))
+        padded = b"".join(frame.__Data.ljust(8, b"\0") for frame in frames)
+        data = np.frombuffer(padded, dtype=np.uint8).reshape(len(frames), 8)
+
+        bits, lengths = batch_codec.encodeFields(ids, dlcs, data, dataLengths)
+        return batch_codec.appendTail(*batch_codec.stuffMatrix(bits, lengths))
+
+    @classmethod
+    def decodeMany(cls, bits, lengths=None) -> tuple:
+        """
+        Decode many stuffed frames at once.
+
+        Args:
+            bits (np.ndarray): Matrix with one stuffed frame per row, padded with zeros.
+            lengths (np.ndarray, optional): Stuffed length of each row (default: full rows).
+
+        Returns:
+            tuple: (ids, dlcs, data, valid) arrays, where data has shape (N, 8) and
+                   valid marks the rows that Frame.fromBits would decode.
+        """
+
+        import numpy as np  # optional dependency, only needed for batch processing
+        import batch_codec
+
+        bits = np.asarray(bits, dtype=np.uint8)
+        if lengths is None:
+            lengths = np.full(bits.shape[0], bits.shape[1], dtype=np.int64)
+
+        return batch_codec.decodeFields(*batch_codec.destuffMatrix(bits, np.asarray(lengths)))
+
+    @classmethod
+    def verifyMany(cls, frames: list):
+        """
+        Validate many frames recorded from the bus at once (stuffing, CRC and form).
+
+        Args:
+            frames (list): List of bit lists, e.g. collected from CanBus.getSendedFrame.
+
+        Returns:
+            np.ndarray: True for the frames that Frame.fromBits would decode.
+        """
+
+        import numpy as np  # optional dependency, only needed for batch processing
+
+        lengths = np.fromiter((len(bits) if bits else 0 for bits in frames), dtype=np.int64, count=len(frames))
+        matrix = np.zeros((len(frames), max(int(lengths.max(initial=0)), 1)), dtype=np.uint8)
+        matrix[np.arange(matrix.shape[1]) < lengths[:, None]] = np.fromiter(
+            (bit for bits in frames if bits for bit in bits), dtype=np.uint8, count=int(lengths.sum()))
+        return cls.decodeMany(matrix, lengths)[3]
+
     def __eq__(self, other: object) -> bool:
         """
         Compare two Frame objects for equality.
@@ -185,6 +309,12 @@ class Frame:
             bool: True if the frames are equal, False otherwise.
         """
         
-        if not isinstance(other, Frame):
+        if self is other:  # interned frames
+            return True
+        if not isinstance(other, Frame) or self.__hash != other.__hash:
             return False
-        return self.__ID == other.__ID and self.__DLC == other.__DLC and self.__Data == other.__Data
\ No newline at end of file
+        return self.__ID == other.__ID and self.__DLC == other.__DLC and self.__Data == other.__Data
+
+    def __hash__(self) -> int:
+        """Return the hash of the frame, computed once from ID, DLC and data."""
+        return self.__hash
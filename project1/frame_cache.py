@@ -0,0 +1,99 @@
+"""
+frame_cache.py - Shared cache of the stuffed bits of the frames.
+
+Encoding a frame (CRC, bit stuffing) costs far more than sending it, and
+the ECUs send the same frames again and again. FRAME_CACHE keeps the bits
+of the most recently used frames for every ECU, with hit/miss statistics.
+"""
+
+import threading
+from collections import OrderedDict
+from frame import Frame
+
+class FrameCache:
+    """
+    Bounded LRU cache of the stuffed bit sequences of frames.
+
+    Frames are immutable and hashable on (ID, DLC, data), so the frame itself
+    is used as key. The cache is thread-safe and can be shared by every ECU,
+    periodic retransmissions of the same frame then cost no re-encoding.
+
+    Attributes:
+        maxsize (int): Maximum number of cached frames.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize (int): Maximum number of cached frames, the least recently used is evicted.
+        """
+
+        self.maxsize = maxsize
+        self.__lock = threading.Lock()
+        self.__entries = OrderedDict()
+
+        # Statistics
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    def getBits(self, frame: 'Frame') -> tuple:
+        """
+        Get the stuffed bits of a frame, encoding it only on a cache miss.
+
+        Args:
+            frame (Frame): Frame to encode.
+
+        Returns:
+            tuple: The stuffed bit representation of the frame (read-only, shared).
+        """
+
+        with self.__lock:
+            bits = self.__entries.get(frame)
+            if bits is not None:
+                self.__entries.move_to_end(frame)
+                self.__hits += 1
+                return bits
+            self.__misses += 1
+
+        bits = tuple(frame.getBits())  # encode outside the lock
+
+        with self.__lock:
+            self.__entries[frame] = bits
+            self.__entries.move_to_end(frame)
+            while len(self.__entries) > self.maxsize:
+                self.__entries.popitem(last=False)
+                self.__evictions += 1
+        return bits
+
+    def getStats(self) -> dict:
+        """
+        Get the cache counters.
+
+        Returns:
+            dict: Number of hits, misses, evictions, cached entries and hit ratio.
+        """
+
+        with self.__lock:
+            lookups = self.__hits + self.__misses
+            return {
+                "hits": self.__hits,
+                "misses": self.__misses,
+                "evictions": self.__evictions,
+                "size": len(self.__entries),
+                "hitRatio": self.__hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        """Remove every cached frame and reset the counters."""
+        with self.__lock:
+            self.__entries.clear()
+            self.__hits = 0
+            self.__misses = 0
+            self.__evictions = 0
+
+
+# Cache shared by every ECU
+FRAME_CACHE = FrameCache()
@@ -0,0 +1,204 @@
+"""
+frame_decoder.py - Streaming decoder of the frames seen on the bus.
+
+FrameDecoder is a CanBus listener: it rebuilds the frame from the bus bits
+as they are processed and reports its fields and errors through callbacks,
+without storing the whole bit sequence.
+"""
+
+from frame import Frame
+from bit_codec import STUFF_LIMIT, CRC15_POLYNOMIAL
+
+class FrameDecoder:
+    """
+    Incremental decoder that receives a frame one bit at a time.
+
+    The decoder can be registered as a CanBus listener: the bus calls
+    feedBit() for every processed bit and endFrame() when the bus goes idle.
+    Bit stuffing is removed on the fly and the CRC register is updated per
+    bit, so each bit costs O(1). ID, DLC and the decoded Frame are reported
+    as soon as their field completes, errors as soon as they are detected.
+
+    Attributes:
+        IDLE: Waiting for the start of a frame.
+        HEADER: Receiving SOF, ID and DLC.
+        DATA: Receiving data and CRC.
+        TAIL: Receiving delimiters, ACK slot and EOF.
+        DONE: A frame was decoded, the following bits are ignored.
+        ERROR: The frame is invalid, the following bits are ignored.
+    """
+
+    IDLE = "IDLE"
+    HEADER = "HEADER"
+    DATA = "DATA"
+    TAIL = "TAIL"
+    DONE = "DONE"
+    ERROR = "ERROR"
+
+    def __init__(self, onID=None, onDLC=None, onFrame=None, onError=None, intern: bool = False):
+        """
+        Initialize the decoder.
+
+        Args:
+            onID (callable, optional): Called with the ID once the arbitration field is received.
+            onDLC (callable, optional): Called with the DLC once the control field is received.
+            onFrame (callable, optional): Called with the Frame once the EOF is received.
+            onError (callable, optional): Called with STUFF_ERROR, CRC_ERROR or FORM_ERROR (see Frame).
+            intern (bool): Report the shared instance of each frame from the Frame intern table.
+        """
+
+        self.__onID = onID
+        self.__onDLC = onDLC
+        self.__onFrame = onFrame
+        self.__onError = onError
+        self.__intern = intern
+        self.reset()
+
+    def reset(self):
+        """Discard the current frame and wait for the next one."""
+        self.__state = self.IDLE
+        self.__lastBit = None
+        self.__run = 0
+        self.__stuffing = True  # bit stuffing is used from SOF to CRC
+        self.__value = 0  # de-stuffed bits from SOF to CRC
+        self.__count = 0  # number of de-stuffed bits
+        self.__regionLength = None  # known once the DLC is received
+        self.__crc = 0
+        self.__tailBits = 0
+        self.__ID = None
+        self.__DLC = None
+        self.__frame = None
+        self.__error = None
+
+    def feedBit(self, bit: int):
+        """
+        Decode the next bit seen on the bus.
+
+        Args:
+            bit (int): The bit (0 or 1).
+        """
+
+        if self.__state in (self.DONE, self.ERROR):
+            return
+
+        # Stuff bit after 5 equal bits: must have the opposite value and is dropped
+        if self.__stuffing and self.__run == STUFF_LIMIT:
+            if bit == self.__lastBit:
+                self.__fail(Frame.STUFF_ERROR)
+                return
+            self.__lastBit = bit
+            self.__run = 1
+            if self.__state == self.TAIL:  # stuff bit after the CRC
+                self.__stuffing = False
+            return
+
+        if bit == self.__lastBit:
+            self.__run += 1
+        else:
+            self.__lastBit = bit
+            self.__run = 1
+
+        if self.__state == self.TAIL:
+            self.__tailBit(bit)
+            return
+
+        if self.__state == self.IDLE:
+            if bit != 0:  # SOF must be dominant
+                self.__fail(Frame.FORM_ERROR)
+                return
+            self.__state = self.HEADER
+
+        # Shift the bit into the value and the CRC register
+        self.__value = (self.__value << 1) | bit
+        self.__count += 1
+        crcNext = bit ^ (self.__crc >> 14)
+        self.__crc = (self.__crc << 1) & 0x7FFF
+        if crcNext:
+            self.__crc ^= CRC15_POLYNOMIAL
+
+        if self.__count == 12:  # ID completed
+            self.__ID = self.__value & 0x7FF
+            if self.__onID:
+                self.__onID(self.__ID)
+
+        elif self.__count == 16:  # DLC completed
+            self.__DLC = self.__value & 0xF
+            if self.__DLC > 8:
+                self.__fail(Frame.FORM_ERROR)
+                return
+            self.__regionLength = 16 + 8 * self.__DLC + 15
+            self.__state = self.DATA
+            if self.__onDLC:
+                self.__onDLC(self.__DLC)
+
+        if self.__count == self.__regionLength:  # CRC completed
+            # Shifting the CRC into the register leaves 0 if it matches
+            if self.__crc != 0:
+                self.__fail(Frame.CRC_ERROR)
+                return
+            self.__state = self.TAIL
+            self.__stuffing = self.__run == STUFF_LIMIT  # only a stuff bit can follow
+
+    def __tailBit(self, bit: int):
+        """
+        Decode a bit of the tail: CRC delimiter, ACK slot, ACK delimiter and EOF.
+
+        Args:
+            bit (int): The bit (0 or 1).
+        """
+
+        position = self.__tailBits
+        self.__tailBits += 1
+        if bit == 0 and position != Frame.TAIL_LENGTH - Frame.ACK_OFFSET:  # only the ACK slot can be dominant
+            self.__fail(Frame.FORM_ERROR)
+            return
+
+        if self.__tailBits == Frame.TAIL_LENGTH:  # EOF completed
+            data = ((self.__value >> 15) & ((1 << (8 * self.__DLC)) - 1)).to_bytes(self.__DLC, "big")
+            frame = Frame(self.__ID, self.__DLC, data)
+            self.__frame = Frame.intern(frame) if self.__intern else frame
+            self.__state = self.DONE
+            if self.__onFrame:
+                self.__onFrame(self.__frame)
+
+    def __fail(self, error: str):
+        """
+        Mark the current frame as invalid.
+
+        Args:
+            error (str): STUFF_ERROR, CRC_ERROR or FORM_ERROR.
+        """
+
+        self.__state = self.ERROR
+        self.__error = error
+        if self.__onError:
+            self.__onError(error)
+
+    def endFrame(self):
+        """
+        Notify the end of the frame on the bus (the bus went idle), then reset the decoder.
+        """
+
+        if self.__state not in (self.IDLE, self.DONE, self.ERROR):
+            self.__fail(Frame.FORM_ERROR)  # frame ended before the EOF
+        self.reset()
+
+    def getStatus(self) -> str:
+        """Returns the decoder state."""
+        return self.__state
+
+    def getID(self) -> int:
+        """Returns the ID of the current frame, None until it is received."""
+        return self.__ID
+
+    def getDLC(self) -> int:
+        """Returns the DLC of the current frame, None until it is received."""
+        return self.__DLC
+
+    def getFrame(self) -> 'Frame':
+        """Returns the decoded frame, None until the EOF is received."""
+        return self.__frame
+
+    def getError(self) -> str:
+        """Returns the error of the current frame, None if no error was detected."""
+        return self.__error
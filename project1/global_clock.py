@@ -1,9 +1,17 @@
 import time
+import heapq
 import threading
 
 class GlobalClock:
     """
     A class to synchronize processes with periodic signals.
+
+    Signals are scheduled on absolute deadlines (start + n * period) of the
+    monotonic clock, so sleep inaccuracies do not accumulate. Every signal
+    increments a tick counter. Waiters register the tick they wait for in a
+    heap and each signal wakes only the waiters whose tick is reached, so a
+    thread sleeping for many ticks is woken once, and a signal emitted
+    while the waiter is not yet blocked is never lost.
     """
     def __init__(self, period: float, stop_signal: threading.Event):
         """
@@ -13,21 +21,125 @@ class GlobalClock:
             period (float): Time in seconds between signals.
             stop_signal (threading.Event): Event to stop the clock thread.
         """
-        self.event = threading.Event()  # Synchronization event
         self.period = period  # Clock cycle duration
         self.stop_signal = stop_signal  # Stop signal
+        self.__lock = threading.Lock()
+        self.__tick = 0  # Number of signals emitted
+        self.__tickWaiters = []  # heap of (tick, order, event) of the blocked threads
+        self.__waiterOrder = 0
+        self.__events = threading.local()  # one reusable event per waiting thread
+
+        # Timing statistics
+        self.__start = None  # Monotonic time of the first deadline
+        self.__lastSignal = None  # Monotonic time of the last signal
+        self.__lastDeadline = None  # Scheduled deadline of the last signal
+        self.__lateness = 0.0  # Sum of the delays of the signals after their deadline
+        self.__maxLateness = 0.0
+        self.__overruns = 0  # Deadlines skipped because the clock thread was late
 
     def start(self):
         """
         Run the clock, emitting signals periodically.
         """
+        self.__start = time.monotonic()
+        deadline = self.__start
         while not self.stop_signal.is_set():
-            time.sleep(self.period)  # Wait for the cycle duration
-            self.event.set()
-            self.event.clear()
+            deadline += self.period
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)  # Wait for the deadline of the cycle
+
+            with self.__lock:  # the statistics are read under the lock by getStats
+                # A signal later than a whole period skips the missed deadlines instead of bursting
+                lateness = time.monotonic() - deadline
+                if lateness >= self.period:
+                    skipped = int(lateness // self.period)
+                    self.__overruns += skipped
+                    deadline += skipped * self.period
+                    lateness -= skipped * self.period
+                self.__lateness += lateness
+                self.__maxLateness = max(self.__maxLateness, lateness)
+
+                self.__lastSignal = time.monotonic()
+                self.__lastDeadline = deadline
+                self.__tick += 1
+                waiters = self.__tickWaiters
+                while waiters and waiters[0][0] <= self.__tick:
+                    heapq.heappop(waiters)[2].set()
 
     def wait(self):
         """
         Block until the clock emits a signal.
         """
-        self.event.wait()  # Wait for signal
\ No newline at end of file
+        self.waitTicks(1)
+
+    def waitTicks(self, ticks: int) -> int:
+        """
+        Block for a number of clock signals, with a single wake-up.
+
+        Args:
+            ticks (int): Number of signals to wait for.
+
+        Returns:
+            int: The tick reached.
+        """
+        with self.__lock:
+            tick = self.__tick + ticks
+        return self.waitUntil(tick)
+
+    def waitUntil(self, tick: int) -> int:
+        """
+        Block until the tick counter reaches a tick, with a single wake-up.
+
+        Args:
+            tick (int): Target tick, a tick already reached returns immediately.
+
+        Returns:
+            int: The tick reached (the target, or the current tick if it was already passed).
+        """
+        with self.__lock:
+            if self.__tick >= tick:
+                return self.__tick
+            event = getattr(self.__events, "event", None)
+            if event is None:
+                event = self.__events.event = threading.Event()
+            event.clear()
+            heapq.heappush(self.__tickWaiters, (tick, self.__waiterOrder, event))
+            self.__waiterOrder += 1
+        event.wait()  # set by start() when the tick is reached
+        return tick
+
+    def getTick(self) -> int:
+        """Returns the number of signals emitted so far."""
+        return self.__tick
+
+    def getStats(self) -> dict:
+        """
+        Get the timing statistics of the clock.
+
+        Returns:
+            dict: Signals emitted, mean and max lateness after the deadline (s), skipped
+                  deadlines (overruns) and drift: delay of the last signal after its scheduled
+                  deadline (s). The deadlines stay on start + n * period; a skipped deadline does
+                  not emit a signal, so the tick number lags n by the overruns (the time they
+                  cover is overruns * period), and the drift only shows the sleep error.
+        """
+
+        with self.__lock:  # a consistent snapshot, the clock thread updates them under the lock
+            ticks = self.__tick
+            return {
+                "ticks": ticks,
+                "meanLateness": self.__lateness / ticks if ticks else 0.0,
+                "maxLateness": self.__maxLateness,
+                "overruns": self.__overruns,
+                "drift": self.__lastSignal - self.__lastDeadline if ticks else 0.0,
+            }
+
+    def time(self) -> float:
+        """
+        Get the current time, used to timestamp the simulation events.
+
+        Returns:
+            float: Wall-clock time in seconds.
+        """
+        return time.time()
@@ -0,0 +1,300 @@
+"""
+ids.py - Streaming intrusion detection of the bus-off attack.
+
+IDS is a passive CanBus listener: it decodes the bus traffic bit by bit and
+keeps a few counters per ID, updated in O(1) at the end of every frame:
+
+    ERROR_STREAK    error frames with the same ID in consecutive slots: the
+                    Victim and the attacker retransmit after every collision
+                    while the Victim is error active
+    ERROR_RATE      moving average of the error frames of an ID
+    ID_COLLISION    two different frames with the same ID closer than the
+                    shortest interval seen for that ID: when the Victim is
+                    error passive the attacker's frame wins the collision
+                    and the Victim retransmits its own in the next slot
+
+The first alert of each (ID, rule) is kept with the slot and the bus cycle
+at which it was raised, and its latency: the bus cycles since the first
+error detected on that ID. The later alerts are only counted. On the attack
+of main.py ERROR_STREAK fires streakThreshold - 1 slots after the first
+collision. With timing, the IDS also measures the time spent in its own
+feedBit/endFrame, and getStats() reports it per bit next to the latency of
+the first alert. Run this module for both.
+"""
+
+import time
+from collections import namedtuple
+
+from frame_decoder import FrameDecoder
+
+# tick: bus cycle (CanBus.getTick), latency: bus cycles since the first error on the ID (None without error)
+Alert = namedtuple("Alert", ["slot", "tick", "ID", "rule", "latency"])
+
+# Detection rules
+ERROR_STREAK = "ERROR_STREAK"
+ERROR_RATE = "ERROR_RATE"
+ID_COLLISION = "ID_COLLISION"
+
+
+class _IDState:
+    """
+    Counters of an ID.
+    """
+
+    __slots__ = ("frames", "errors", "errorRate", "errorStreak", "lastErrorSlot", "firstErrorTick", "lastSlot",
+                 "lastFrame", "minGap")
+
+    def __init__(self):
+        self.frames = 0  # frames seen, including the error frames
+        self.errors = 0  # error frames
+        self.errorRate = 0.0  # moving average of the error frames
+        self.errorStreak = 0  # error frames in consecutive slots
+        self.lastErrorSlot = None
+        self.firstErrorTick = None  # bus cycle at which the first error of the ID was detected
+        self.lastSlot = None  # slot of the last valid frame
+        self.lastFrame = None  # last valid frame
+        self.minGap = None  # shortest interval between two valid frames (learned period)
+
+
+class IDS:
+    """
+    Passive intrusion detection system listening to a CanBus.
+
+    Create it for a bus (it registers itself as listener). The rules are
+    evaluated at the end of every frame and raise alerts, optionally
+    reported to a callback as soon as they are raised.
+    """
+
+    def __init__(self, canBus: 'CanBus', streakThreshold: int = 3, rateThreshold: float = 0.5,
+                 rateWeight: float = 0.125, minFrames: int = 4, onAlert=None, timing: bool = True):
+        """
+        Initialize the IDS and start listening to the bus.
+
+        Args:
+            canBus (CanBus): The bus to observe.
+            streakThreshold (int): Error frames in consecutive slots raising an ERROR_STREAK alert.
+            rateThreshold (float): Error frame rate of an ID raising an ERROR_RATE alert.
+            rateWeight (float): Weight of the last frame in the moving average of the error rate.
+            minFrames (int): Frames of an ID before its error rate is evaluated.
+            onAlert (callable, optional): Called with each new Alert.
+            timing (bool): Measure the time spent in feedBit/endFrame (costs about 0.2 us per bit).
+        """
+
+        self.__canBus = canBus
+        self.__streakThreshold = streakThreshold
+        self.__rateThreshold = rateThreshold
+        self.__rateWeight = rateWeight
+        self.__minFrames = minFrames
+        self.__onAlert = onAlert
+        self.__timing = timing
+        self.__decoder = FrameDecoder(onError=self.__onError)
+        self.__errorTick = None  # bus cycle of the error detected in the current frame
+        self.__ids = {}  # ID -> _IDState
+        self.__alerts = {}  # (ID, rule) -> first Alert
+        self.__alertCount = 0
+        self.__bits = 0
+        self.__frames = 0
+        self.__time = 0  # nanoseconds spent in feedBit/endFrame
+        canBus.addListener(self)
+
+    def feedBit(self, bit: int):
+        """
+        Receive a bit from the bus (CanBus listener).
+
+        Args:
+            bit (int): The bit (0 or 1).
+        """
+
+        if self.__timing:
+            start = time.perf_counter_ns()
+            self.__bits += 1
+            self.__decoder.feedBit(bit)
+            self.__time += time.perf_counter_ns() - start
+        else:
+            self.__bits += 1
+            self.__decoder.feedBit(bit)
+
+    def __onError(self, error: str):
+        """
+        Record when the decoder detects an error in the current frame.
+
+        Args:
+            error (str): STUFF_ERROR, CRC_ERROR or FORM_ERROR (see Frame).
+        """
+        self.__errorTick = self.__canBus.getTick()
+
+    def endFrame(self):
+        """
+        Evaluate the rules for the frame that just ended on the bus (CanBus listener).
+        """
+
+        if self.__timing:
+            start = time.perf_counter_ns()
+            self.__endFrame()
+            self.__time += time.perf_counter_ns() - start
+        else:
+            self.__endFrame()
+
+    def __endFrame(self):
+        """
+        Update the counters of the ID of the frame and raise the alerts.
+        """
+
+        decoder = self.__decoder
+        ID = decoder.getID()
+        frame = decoder.getFrame()
+        decoder.endFrame()
+        errorTick = self.__errorTick
+        self.__errorTick = None
+        self.__frames += 1
+        if ID is None:  # the frame ended before the arbitration field
+            return
+
+        state = self.__ids.get(ID)
+        if state is None:
+            state = self.__ids[ID] = _IDState()
+        slot = self.__canBus.getCount() - 1  # the count is incremented when the bus goes idle
+        state.frames += 1
+        error = frame is None
+
+        # Error frames in consecutive slots
+        if error:
+            state.errors += 1
+            if state.firstErrorTick is None:
+                state.firstErrorTick = errorTick
+            state.errorStreak = state.errorStreak + 1 if state.lastErrorSlot == slot - 1 else 1
+            state.lastErrorSlot = slot
+            if state.errorStreak >= self.__streakThreshold:
+                self.__alert(slot, ID, ERROR_STREAK, state)
+        else:
+            state.errorStreak = 0
+
+        # Moving average of the error frames
+        state.errorRate += self.__rateWeight * (error - state.errorRate)
+        if state.frames >= self.__minFrames and state.errorRate > self.__rateThreshold:
+            self.__alert(slot, ID, ERROR_RATE, state)
+
+        # Two different frames with the same ID, closer than its period
+        if not error:
+            if state.lastSlot is not None:
+                gap = slot - state.lastSlot
+                if state.minGap is not None and gap < state.minGap and frame != state.lastFrame:
+                    self.__alert(slot, ID, ID_COLLISION, state)
+                elif state.minGap is None or gap < state.minGap:
+                    state.minGap = gap  # retransmissions of the same frame shorten the learned period
+            state.lastSlot = slot
+            state.lastFrame = frame
+
+    def __alert(self, slot: int, ID: int, rule: str, state: '_IDState'):
+        """
+        Raise an alert, only the first one of each ID and rule is stored.
+
+        Args:
+            slot (int): Slot of the frame that raised the alert.
+            ID (int): ID of the frame.
+            rule (str): ERROR_STREAK, ERROR_RATE or ID_COLLISION.
+            state (_IDState): Counters of the ID.
+        """
+
+        self.__alertCount += 1
+        if (ID, rule) in self.__alerts:
+            return
+        tick = self.__canBus.getTick()
+        latency = tick - state.firstErrorTick if state.firstErrorTick is not None else None
+        alert = Alert(slot, tick, ID, rule, latency)
+        self.__alerts[(ID, rule)] = alert
+        if self.__onAlert is not None:
+            self.__onAlert(alert)
+
+    def getAlerts(self) -> list:
+        """Get the first alert of each ID and rule, sorted by slot."""
+        return sorted(self.__alerts.values())
+
+    def getFirstAlert(self) -> 'Alert':
+        """Get the first alert raised, None if there is none."""
+        alerts = self.getAlerts()
+        return alerts[0] if alerts else None
+
+    def getStats(self) -> dict:
+        """
+        Get the counters of the IDS.
+
+        Returns:
+            dict: Bits and frames processed, IDs seen, alerts raised (including repeated ones), latency
+                  of the first alert in bus cycles since the first error on its ID, and time spent
+                  in feedBit/endFrame in total and per bit (s, None without timing).
+        """
+
+        first = self.getFirstAlert()
+        timed = self.__timing
+        return {
+            "bits": self.__bits,
+            "frames": self.__frames,
+            "ids": len(self.__ids),
+            "alerts": self.__alertCount,
+            "latency": first.latency if first is not None else None,
+            "cpuTime": self.__time / 1e9 if timed else None,
+            "cpuPerBit": self.__time / 1e9 / self.__bits if timed and self.__bits else None,
+        }
+
+
+class _Recorder:
+    """
+    CanBus listener recording the bits of every frame, to replay them.
+    """
+
+    def __init__(self):
+        self.frames = [[]]
+
+    def feedBit(self, bit: int):
+        self.frames[-1].append(bit)
+
+    def endFrame(self):
+        self.frames.append([])
+
+
+if __name__ == "__main__":
+    from simulation import Simulation
+    from can_bus import CanBus
+    from engine import VirtualClock
+
+    # Detection latency on the attack of main.py
+    for period in (5, 7, 10, 20):
+        simulation = Simulation(0.003, verbose=False)
+        ids = IDS(simulation.canBus)
+        recorder = _Recorder()
+        simulation.canBus.addListener(recorder)
+        simulation.addAttackScenario(period)
+        simulation.run()
+
+        start = simulation.getAttackStart()
+        first = ids.getFirstAlert()
+        print(f"Period {period:>2}: attack from slot {start}, first alert {first.rule} at slot {first.slot} "
+              f"({first.slot - start} frames later), bus-off at slot {simulation.canBus.getCount()}")
+        for alert in ids.getAlerts():
+            print(f"    {alert.rule:<12} ID {alert.ID} at slot {alert.slot} (tick {alert.tick}, "
+                  f"{alert.latency} bus cycles after the first error)")
+
+    # CPU cost per bit, replaying the recorded traffic
+    frames = [frame for frame in recorder.frames if frame] * 20
+    bits = sum(len(frame) for frame in frames)
+    best = None
+    for _ in range(5):
+        ids = IDS(CanBus(VirtualClock(0.003)), timing=False)
+        feedBit, endFrame = ids.feedBit, ids.endFrame
+        start = time.process_time()
+        for frame in frames:
+            for bit in frame:
+                feedBit(bit)
+            endFrame()
+        elapsed = time.process_time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"CPU cost: {best / bits * 1e9:.0f} ns per bit ({bits} bits, {len(frames)} frames)")
+
+    # Same replay, measured by the IDS itself
+    ids = IDS(CanBus(VirtualClock(0.003)))
+    for frame in frames:
+        for bit in frame:
+            ids.feedBit(bit)
+        ids.endFrame()
+    print(f"CPU cost measured by the IDS: {ids.getStats()['cpuPerBit'] * 1e9:.0f} ns per bit")
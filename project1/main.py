@@ -1,20 +1,52 @@
-import random
+import sys
+import csv
+import contextlib
+import json
 import time
+import random
+import argparse
 import threading
-import matplotlib.pyplot as plt
 
 from ecu import ECU
 from can_bus import CanBus
 from frame import Frame
+from frame_decoder import FrameDecoder
+from frame_cache import FRAME_CACHE
+from bus_trace import TraceWriter
+from metrics import BusMetrics
+from ids import IDS
+from receivers import Receivers
 from global_clock import GlobalClock
+from simulation import Simulation, VICTIM_FRAME
+from event_log import EventLog
+from period_detector import PeriodDetector
 
 # Configurable Parameters
 CLOCK = 0.003  # Time step in seconds
 ECU_NUMBER = 0  # Number of additional ECUs (excluding Victim and Adversary)
                 # Not proprerty used in this implementation, but can be used to add more ECUs, 
-                # but this can create some issues with the synchronization
+                # but this can create some issues with the synchronization of the threads
+                # (the virtual time simulation has no such issue, it runs hundreds of ECUs)
 PERIOD = 7  # Transmission period for Victim and Adversary ECU
             # must be at least 5 to ensure proper synchronization.
+IDLE_GAP = 2  # Idle bus cycles before a background frame is counted (None: no background traffic,
+              # the periodic ECUs then only progress with the frames of the other ECUs)
+BACKGROUND_BITS = 30  # Length in bits of the background frame sent by the ECUs that are not simulated
+TRACE_FILE = None  # Path of the binary bus trace (e.g. "bus.trace"), None to disable recording
+METRICS_FILE = None  # Path of the JSON metrics (utilization, arbitration losses, errors, latencies), None to disable them
+VIRTUAL_TIME = True  # Run on the discrete-event engine in virtual time (False: threads and GlobalClock)
+PACING = 0.0  # Virtual time speed relative to real time (1.0 = real time), 0 to run as fast as possible
+FRAME_LEVEL = False  # Virtual time only: resolve the bus contention frame by frame instead of bit by bit
+PRIORITY_SCHEDULING = False  # Virtual time only: the bus pulls the pending frames by priority (for hundreds of ECUs),
+                             # same bus traffic and TECs but the lost arbitrations are not printed
+INTRUSION_DETECTION = False  # Listen to the bus with the IDS and print its alerts at the end
+VERIFY_FRAMES = False  # Record the bits of every bus frame and validate them at the end with Frame.verifyMany
+RECEPTION = False  # The ECUs receive the frames they do not send and update their REC (decodes every frame)
+HISTORY_SIZE = None  # Keep only the last HISTORY_SIZE TEC changes of each ECU (ring buffer), None to keep them all
+PLOT_FILE = None  # Save the TEC plot to this file (e.g. "tec.png" or "tec.svg") without a display, None to show it
+TARGET_MIN_GAPS = 1  # Inter-arrival gaps of an ID before the attacker may choose it as the Victim
+TARGET_CONFIDENCE = 0.9  # Lowest confidence of the period of the ID chosen by the attacker (see PeriodDetector)
+SEED = None  # Seed of the random generator, runs in virtual time with the same seed are identical
 
 # Fixed Parameters (these should not be modified)
 ECUname = ["Victim", "Adversary"]
@@ -33,7 +65,10 @@ sync_barrier = threading.Barrier(2)  # Barrier for synchronizing the transmissio
 
 TECarr = [[], []] # List to store TEC data for each ECU
 
-START = time.time()  # Starting time for the simulation (used for time calculations)
+metrics = None  # BusMetrics of the threaded simulation, if METRICS_FILE is set
+receivers = None  # Receivers of the threaded simulation, if RECEPTION is set
+attackStart = None  # Frame count when the adversary found the Victim's period
+eventLog = EventLog(sys.stdout, bufferEvents=1)  # Transmissions of the ECUs, printed as they happen (see batchMode)
 
 def attacker(canBus: 'CanBus'):
     """
@@ -42,9 +77,10 @@ def attacker(canBus: 'CanBus'):
     Once the period is detected, the attacker ECU begins its own transmission to do a Bus-off attack.
     
     Attacker steps:
-    (1). The attacker listens on the CAN bus for frames.
-    (2). It identifies the Victim's frame by detecting transmissions with the same ID.
-    (3). The period between consecutive transmissions of the Victim's frame is calculated.
+    (1). The attacker listens on the CAN bus for frames, decoding them bit by bit.
+    (2). It follows the period of every ID on the bus with a PeriodDetector.
+    (3). The Victim is the first ID with TARGET_MIN_GAPS gaps and a period of confidence at least
+       TARGET_CONFIDENCE, the best ranked by PeriodDetector.getBestPeriod if several qualify together.
     (4. After determining the period, the attacker creates its own frame with the same ID and starts
        transmitting at the same periodic intervals, aiming to induce errors and disrupt the Victim's
        operation.
@@ -53,32 +89,39 @@ def attacker(canBus: 'CanBus'):
         canBus (CanBus): The CAN bus object used for communication between ECUs.
     """
     
-    frame = None
-    victimFrameNumber = None
-    victimFrame = None
-    period = None
+    target = None  # Period estimate of the Victim's ID
+    targetFound = threading.Event()
+    detector = PeriodDetector(minGaps=TARGET_MIN_GAPS)  # inter-arrival statistics of every ID on the bus
+
+    def onFrame(frame: 'Frame'):
+        """Called by the bus thread as soon as a frame is decoded (shared instance)."""
+        nonlocal target
+
+        # (1) and (2)
+        detector.observe(frame.getID(), canBus.getCount())
+
+        # (3)
+        if target is None:
+            target = detector.getBestPeriod(minConfidence=TARGET_CONFIDENCE)
+            if target is not None:
+                targetFound.set()
+
+    # Decode the bus traffic bit by bit, instead of re-parsing every frame once the bus is idle
+    decoder = FrameDecoder(onFrame=onFrame, intern=True)
+    canBus.addListener(decoder)
 
     # Wait for a frame to match the Victim's periodic transmission
-    while True:
-        clock.wait()   # Synchronize with the global clock
-        canBus.waitIdleStatus()  # Ensure the CAN bus is idle
-        frame = Frame.fromBits(bits=canBus.getSendedFrame()) # Get the frame from the bus
-        
-        # (1)
-        if victimFrame == None and frame != None:
-            victimFrameNumber = canBus.getCount()
-            victimFrame = frame
-            frame = None
-        
-        # (2) and (3)
-        if victimFrameNumber != None and victimFrameNumber < canBus.getCount() and victimFrame == frame:
-            period = canBus.getCount() - victimFrameNumber # (3); Calculate the transmission period
-            break
+    targetFound.wait()
+    canBus.removeListener(decoder)
+    canBus.waitFrameCount(target.lastSlot + 1) # Wait for the end of the Victim's frame
+    period = target.period
                         
     # (4) Create an attacker frame using the same ID as the Victim's frame
-    attackerFrame = Frame(victimFrame.getID(), 0, [])
+    attackerFrame = Frame(target.ID, 0, [])
                         
-    print(f"Adversary found Victim's period: {period}")
+    eventLog.log(f"Adversary found Victim's period: {period}")
+    global attackStart
+    attackStart = canBus.getCount()
     global adversaryStart 
     adversaryStart = True
     ecuThread(ECUname[1], 1, period, canBus, attackerFrame)  # Start the adversary ECU thread
@@ -98,8 +141,12 @@ def ecuThread(name, index: int, period: int, canBus: 'CanBus', frame: 'Frame'):
     """
     
     clock.wait()  # Synchronize with the global clock
-    ecu = ECU(name, canBus, clock)  # Create the ECU instance
-    print(f"Start {name:<9} -> Period: {period:<2}; {frame}")
+    ecu = ECU(name, canBus, clock, historySize=HISTORY_SIZE)  # Create the ECU instance
+    if metrics:
+        ecu.setMetrics(metrics)
+    if receivers:
+        receivers.addECU(ecu)
+    eventLog.log(f"Start {name:<9} -> Period: {period:<2}; {frame}")
     
     retransmission = False
     lastFrameNumber = 0
@@ -143,6 +190,7 @@ def ecuThread(name, index: int, period: int, canBus: 'CanBus', frame: 'Frame'):
                 adversaryTransmission = franmen
             
         retransmission = False  # Reset retransmission flag
+        ecu.frameDue()  # the slot is reached, the wait until the transmission starts is measured
         
         # Sync
         clock.wait()
@@ -155,13 +203,13 @@ def ecuThread(name, index: int, period: int, canBus: 'CanBus', frame: 'Frame'):
             sync_barrier.wait()
             
         transmitedStatus = ecu.sendFrame(frame) # Send the frame on the bus and get the transmission status
-        print(f"   {name:<9} | ECU: TEC: {ecu.getTEC():<3}, Status: {ecu.getStatus():<13} | Transmitted frame status: {transmitedStatus:<9} | CanBus slot: {lastFrameNumber}")
+        eventLog.log(f"   {name:<9} | ECU: TEC: {ecu.getTEC():<3}, Status: {ecu.getStatus():<13} | Transmitted frame status: {transmitedStatus:<9} | CanBus slot: {lastFrameNumber}")
 
         
         # Check if the ECU has entered BUS_OFF state
         if ecu.getStatus() == ECU.BUS_OFF:
             ECUstopSignal.set()  # Stop all threads if BUS_OFF state is reached
-            print(f"{name} entered BUS_OFF. Stopping all threads.")
+            eventLog.log(f"{name} entered BUS_OFF. Stopping all threads.")
 
         # Retransmission if a bit error occurs
         if transmitedStatus != ECU.COMPLITED:
@@ -170,8 +218,7 @@ def ecuThread(name, index: int, period: int, canBus: 'CanBus', frame: 'Frame'):
         
         # Sync
         canBus.waitIdleStatus()
-        clock.wait() 
-        clock.wait()
+        clock.waitTicks(2)
             
     TECarr[index] = ecu.getTECs()  # Store TEC data for later plotting
 
@@ -188,39 +235,170 @@ def canBusThread(canBus: 'CanBus'):
     """
     
     while not CanBusStopSignal.is_set():
-        clock.wait()
-        clock.wait()
-        clock.wait()
+        clock.waitTicks(3)  # A bus cycle lasts 3 clock ticks, one wake-up
         canBus.process() # Save the current bit in the frame and wait for the next bit or the end of the frame
 
-def plot_graph(tec_data):
+def plot_graph(tec_data, period=CLOCK, names=None, path=None):
     """
-    Plots the TEC (Transmitter Error Counter) values over time for each ECU.
+    Plots the TEC (Transmitter Error Counter) values over time for each ECU,
+    downsampled and with the ERROR_PASSIVE and BUS_OFF transitions marked (see tec_plot).
     
     Args:
-        tec_data (list of lists): A list where each sublist contains the TEC values 
-                                  for a specific ECU, recorded at different time steps.
-                                  Each sublist corresponds to a separate ECU.
+        tec_data (list of CounterHistory): TEC history of each ECU (see ECU.getTECs),
+                                           an empty list for an ECU that did not start.
+        period (float, optional): Duration of a clock tick in seconds (default: CLOCK).
+        names (list, optional): Name of each ECU (default: ECUname).
+        path (str, optional): Save the plot to this file (PNG, SVG, ...) instead of showing it (default: PLOT_FILE).
     """
     
-    plt.figure(figsize=(10, 6))
+    from tec_plot import plotTECs  # imports matplotlib, batch runs do not pay for it
+
+    if names is None:
+        names = ECUname
+    if path is None:
+        path = PLOT_FILE
+    plotTECs(tec_data, names, period, path)
+        
+def virtualTimeSimulation(victimFrame: 'Frame'):
+    """
+    Runs the same simulation on the discrete-event engine, in virtual time:
+    no threads and no sleeps (unless PACING is set), then plots the TEC data.
 
-    # Plot the TEC values for each ECU
-    for i, data in enumerate(tec_data):
-        tec = [item[0] for item in data]
-        time = [(item[1] - START) * 1000 for item in data]
+    Args:
+        victimFrame (Frame): The CAN frame transmitted by the Victim ECU.
+    """
 
-        plt.plot(time, tec, label=ECUname[i]+"'s TEC", linestyle='-')
+    simulation = Simulation(CLOCK, PACING, frameLevel=FRAME_LEVEL, priorityScheduling=PRIORITY_SCHEDULING,
+                            idleGap=IDLE_GAP, backgroundBits=BACKGROUND_BITS, metrics=METRICS_FILE is not None,
+                            historySize=HISTORY_SIZE, eventLog=eventLog, reception=RECEPTION)
 
-    plt.xlabel('Time [ms]')
-    plt.ylabel('TEC Value')
-    plt.title('TEC Values over time')
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
+    # Record the bus traffic
+    traceWriter = None
+    if TRACE_FILE:
+        traceWriter = TraceWriter(simulation.canBus, TRACE_FILE)
+        simulation.canBus.addListener(traceWriter)
+
+    ids = IDS(simulation.canBus) if INTRUSION_DETECTION else None
+    recorder = Receivers(simulation.canBus, keepFrames=True) if VERIFY_FRAMES else None  # records only, no ECU
+
+    simulation.addECU(ECUname[VICTIM], PERIOD, victimFrame)
+    simulation.addAttacker(ECUname[ADVERSARY], TARGET_MIN_GAPS, TARGET_CONFIDENCE)
+
+    # Create additional ECUs
+    for i in range(ECU_NUMBER):
+        ECUname.append(f"ECU{i+1}")
+        simulation.addECU(ECUname[-1], random.randint(PERIOD, PERIOD * 3), randomFrame())
+
+    simulation.run()
+    if traceWriter:
+        traceWriter.close()
+    if simulation.metrics:
+        simulation.metrics.toJSON(METRICS_FILE)
+
+    print("Simulation stopped.")
+    if ids:
+        printAlerts(ids, simulation.getAttackStart())
+    if recorder:
+        printVerification(recorder)
+    print(f"Frame cache: {FRAME_CACHE.getStats()}")
+
+    # The Adversary ECU is created once the period is found, after the other ECUs
+    tecs = dict(zip(simulation.getNames(), simulation.getTECs()))
+    plot_graph([tecs.get(name, []) for name in ECUname])
+
+def batchMode(arguments: 'argparse.Namespace'):
+    """
+    Runs scenarios back to back in virtual time, without plotting, and writes their results.
+
+    Each run is the attack scenario of sweep.py (Simulation.addAttackScenario): run k
+    uses the seed arguments.seed + k for its additional ECUs, so it can be reproduced on
+    its own and gives the same ECUs as the sweep scenario with that seed. The
+    transmissions go to a buffered event log (a file, or nowhere), the results are
+    written as JSON or CSV (from the extension of arguments.output, JSON on stdout if
+    there is no output file), with the column names of sweep.COLUMNS and null for the
+    values of a run without bus-off.
+
+    Args:
+        arguments (argparse.Namespace): Parsed command line (see the __main__ block), at least one run.
+    """
+
+    results = []
+    with (open(arguments.log, "w") if arguments.log else contextlib.nullcontext()) as logFile:
+        runLog = EventLog(logFile, timestamps=True)
+        for run in range(arguments.runs):
+            seed = arguments.seed + run
+            runLog.log(f"Run {run}, seed {seed}")
+            start = time.perf_counter()
+            events = runLog.getCount()
+
+            simulation = Simulation(arguments.clock, frameLevel=FRAME_LEVEL, priorityScheduling=PRIORITY_SCHEDULING,
+                                    idleGap=IDLE_GAP, backgroundBits=BACKGROUND_BITS, historySize=HISTORY_SIZE,
+                                    eventLog=runLog, reception=RECEPTION)
+            simulation.addAttackScenario(arguments.period, arguments.ecus, seed,
+                                         minGaps=TARGET_MIN_GAPS, minConfidence=TARGET_CONFIDENCE)
+            busOffECU = simulation.run()
+
+            ecus = {ecu.name: ecu for ecu in simulation.getECUs()}
+            adversary = ecus.get(ECUname[ADVERSARY])
+            results.append({
+                "run": run,
+                "seed": seed,
+                "period": arguments.period,
+                "clock": arguments.clock,
+                "ecuNumber": arguments.ecus,
+                "busOff": busOffECU is not None,
+                "victimBusOff": busOffECU is not None and busOffECU.name == ECUname[VICTIM],
+                "busOffTime": simulation.getBusOffTime() if busOffECU is not None else None,
+                "busOffSlot": simulation.canBus.getCount() if busOffECU is not None else None,
+                "attackStart": simulation.getAttackStart(),
+                "victimTEC": ecus[ECUname[VICTIM]].getTEC(),
+                "adversaryTEC": adversary.getTEC() if adversary is not None else None,
+                "events": runLog.getCount() - events,
+                "wallTime": time.perf_counter() - start,
+            })
+        runLog.flush()
+
+    if arguments.output and arguments.output.endswith(".csv"):
+        with open(arguments.output, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+    elif arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    # Plot the last run only if requested
+    if arguments.plot:
+        plot_graph(simulation.getTECs(), arguments.clock, simulation.getNames(), arguments.plot)
+
+def printAlerts(ids: 'IDS', attackStart: int):
+    """
+    Prints the alerts raised by the IDS and their latency from the start of the attack.
+
+    Args:
+        ids (IDS): The intrusion detection system.
+        attackStart (int): Frame count when the adversary found the Victim's period, None if it did not.
+    """
+
+    for alert in ids.getAlerts():
+        latency = f" ({alert.slot - attackStart} frames after the attack start)" if attackStart is not None else ""
+        print(f"IDS alert: {alert.rule} on ID {alert.ID} at slot {alert.slot}{latency}")
+    print(f"IDS: {ids.getStats()}")
+
+def printVerification(recorder: 'Receivers'):
+    """
+    Validates every frame recorded on the bus at once and prints the result.
+
+    Args:
+        recorder (Receivers): Receivers created with keepFrames.
+    """
+
+    valid = recorder.verify()
+    print(f"Bus frames: {len(valid)} recorded, {int(valid.sum())} valid, {len(valid) - int(valid.sum())} with errors")
 
-    plt.show()
-        
 def randomFrame() -> 'Frame':
     """
     Generates a random frame with a random ID, DLC, and data.
@@ -256,7 +434,37 @@ if __name__ == "__main__":
         4. Plots the TEC data for analysis.
     """
     
-    random.seed()  # Initialize random seed
+    parser = argparse.ArgumentParser(description="Bus-off attack simulation on a simulated CAN bus.")
+    parser.add_argument("--batch", action="store_true",
+                        help="headless batch mode: run in virtual time without plotting and write the results")
+    parser.add_argument("--seed", type=int, default=SEED, help="seed of the random generator (batch: of the first run)")
+    parser.add_argument("--runs", type=int, default=1, help="batch: number of runs, run k uses seed + k")
+    parser.add_argument("--period", type=int, default=PERIOD, help="batch: Victim period in frame slots")
+    parser.add_argument("--clock", type=float, default=CLOCK, help="batch: clock tick in seconds")
+    parser.add_argument("--ecus", type=int, default=ECU_NUMBER, help="batch: number of additional ECUs")
+    parser.add_argument("--output", help="batch: results file, .json or .csv (default: JSON on stdout)")
+    parser.add_argument("--log", help="batch: file of the event log (default: the events are only counted)")
+    parser.add_argument("--plot", help="save the TEC plot (of the last run in batch mode) to this file (PNG, SVG, ...)")
+    arguments = parser.parse_args()
+
+    if arguments.batch:
+        if arguments.runs < 1:
+            parser.error("--runs must be at least 1")
+        if arguments.seed is None:
+            arguments.seed = 0  # batch runs are always reproducible
+        batchMode(arguments)
+        sys.exit()
+
+    random.seed(arguments.seed)  # Initialize random seed
+    if arguments.plot:
+        PLOT_FILE = arguments.plot
+
+    # victimFrame = randomFrame()  # It's possible to generate a random frame for the Victim ECU
+    victimFrame = VICTIM_FRAME  # Fixed frame for the Victim ECU
+
+    if VIRTUAL_TIME:
+        virtualTimeSimulation(victimFrame)
+        sys.exit()
 
     # Create a global clock and start its thread
     clock = GlobalClock(CLOCK, GlobalClockStopSignal)
@@ -264,10 +472,24 @@ if __name__ == "__main__":
     clock_thread.start()
 
     # Initialize the CAN bus
-    canBus = CanBus(clock)
-    
-    # victimFrame = randomFrame()  # It's possible to generate a random frame for the Victim ECU
-    victimFrame = Frame(671, 3, [217, 16, 133])  # Fixed frame for the Victim ECU
+    canBus = CanBus(clock, IDLE_GAP, BACKGROUND_BITS)
+
+    # Record the bus traffic
+    traceWriter = None
+    if TRACE_FILE:
+        traceWriter = TraceWriter(canBus, TRACE_FILE)
+        canBus.addListener(traceWriter)
+
+    # Collect the bus metrics
+    if METRICS_FILE:
+        metrics = BusMetrics(canBus)
+
+    # Detect the attack
+    ids = IDS(canBus) if INTRUSION_DETECTION else None
+
+    # The ECUs receive the frames they do not send
+    receivers = Receivers(canBus) if RECEPTION else None
+    recorder = Receivers(canBus, keepFrames=True) if VERIFY_FRAMES else None  # records only, no ECU
 
     # Generate the threads for the canBus, victim, and attacker
     canBus_thread = threading.Thread(target=canBusThread, args=(canBus,))
@@ -298,7 +520,20 @@ if __name__ == "__main__":
     # Stop the GlobalClock thread
     GlobalClockStopSignal.set()
 
+    if traceWriter or metrics or ids or recorder:
+        canBus_thread.join()
+    if traceWriter:
+        traceWriter.close()
+    if metrics:
+        metrics.toJSON(METRICS_FILE)
+
     print("All threads stopped.")
+    if ids:
+        printAlerts(ids, attackStart)
+    if recorder:
+        printVerification(recorder)
+    print(f"Clock: {clock.getStats()}")
+    print(f"Frame cache: {FRAME_CACHE.getStats()}")
     
     # Plot the TEC graph for all ECUs   
     plot_graph(TECarr)
\ No newline at end of file
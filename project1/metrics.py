@@ -0,0 +1,236 @@
+"""
+metrics.py - Instrumentation of the CAN bus simulation.
+
+BusMetrics collects bus utilization, per-ID and per-ECU transmission
+outcomes (frames sent, arbitrations lost, error flags) and the latency
+between the slot at which each frame is due and the start of the
+transmission that wins the arbitration. It is a CanBus listener, and ECUs
+report to it through ECU.setMetrics(): when it is not registered nothing
+is recorded and the simulation pays nothing.
+
+Latencies are kept in LatencyHistogram, a HDR-style histogram with a
+bounded relative error, and everything can be exported as JSON.
+"""
+
+import json
+
+
+class LatencyHistogram:
+    """
+    Histogram with logarithmic buckets of linear sub-buckets (as HDR histograms).
+
+    Values below 2^subBucketBits are stored exactly, larger values are rounded
+    down to subBucketBits significant bits, so the relative error is below
+    2^-(subBucketBits - 1) and the memory grows with log(max value).
+    """
+
+    def __init__(self, subBucketBits: int = 7):
+        """
+        Initialize an empty histogram.
+
+        Args:
+            subBucketBits (int): Significant bits kept for each value (7: error below 1.6%).
+        """
+
+        self.__subBucketBits = subBucketBits
+        self.__counts = {}  # bucket lower bound -> count
+        self.__count = 0
+        self.__total = 0
+        self.__min = None
+        self.__max = None
+
+    def record(self, value: int):
+        """
+        Record a value.
+
+        Args:
+            value (int): Non-negative value (e.g. bus cycles).
+        """
+
+        shift = value.bit_length() - self.__subBucketBits
+        bucket = (value >> shift) << shift if shift > 0 else value
+        self.__counts[bucket] = self.__counts.get(bucket, 0) + 1
+        self.__count += 1
+        self.__total += value
+        if self.__min is None or value < self.__min:
+            self.__min = value
+        if self.__max is None or value > self.__max:
+            self.__max = value
+
+    def getCount(self) -> int:
+        """Returns the number of recorded values."""
+        return self.__count
+
+    def getMean(self) -> float:
+        """Returns the mean of the recorded values (exact), None if empty."""
+        return self.__total / self.__count if self.__count else None
+
+    def getPercentile(self, percentile: float) -> int:
+        """
+        Get a percentile of the recorded values.
+
+        Args:
+            percentile (float): Percentile between 0 and 100.
+
+        Returns:
+            int: Lower bound of the bucket holding the percentile (exact min/max at 0/100), None if empty.
+        """
+
+        if not self.__count:
+            return None
+        if percentile >= 100:
+            return self.__max
+
+        rank = max(1, -(-self.__count * percentile // 100))
+        seen = 0
+        for bucket in sorted(self.__counts):
+            seen += self.__counts[bucket]
+            if seen >= rank:
+                return max(bucket, self.__min)
+        return self.__max
+
+    def toDict(self) -> dict:
+        """
+        Summarize the histogram.
+
+        Returns:
+            dict: Count, min, mean, max, p50, p90, p99, p99.9 and the bucket counts.
+        """
+
+        return {
+            "count": self.__count,
+            "min": self.__min,
+            "mean": self.getMean(),
+            "max": self.__max,
+            "p50": self.getPercentile(50),
+            "p90": self.getPercentile(90),
+            "p99": self.getPercentile(99),
+            "p99.9": self.getPercentile(99.9),
+            "buckets": {str(bucket): self.__counts[bucket] for bucket in sorted(self.__counts)},
+        }
+
+
+class BusMetrics:
+    """
+    Counters of a CAN bus and of the ECUs connected to it.
+
+    Create it for a bus (it registers itself as listener) and pass it to
+    ECU.setMetrics() for every ECU to observe. Bus cycles are counted from
+    the creation of the metrics.
+    """
+
+    def __init__(self, canBus: 'CanBus'):
+        """
+        Initialize the metrics and start listening to the bus.
+
+        Args:
+            canBus (CanBus): The bus to observe.
+        """
+
+        self.__canBus = canBus
+        self.__startTick = canBus.getTick()
+        self.__startBackground = canBus.getBackgroundFrames()
+        self.__busyCycles = 0  # bus cycles with a bit of a simulated ECU
+        self.__frames = 0  # frames seen on the bus, including the ones ended by an error
+        self.__ids = {}  # ID -> counters
+        self.__ecus = {}  # ECU name -> counters
+        self.__latencies = {}  # ECU name -> LatencyHistogram
+        canBus.addListener(self)
+
+    def feedBit(self, bit: int):
+        """
+        Count a busy bus cycle (CanBus listener).
+
+        Args:
+            bit (int): The bit (0 or 1).
+        """
+        self.__busyCycles += 1
+
+    def endFrame(self):
+        """Count a frame (CanBus listener)."""
+        self.__frames += 1
+
+    def transmission(self, name: str, ID: int, status: str, activeFlag: bool = None):
+        """
+        Record the end of a transmission attempt (called by the ECU).
+
+        Args:
+            name (str): Name of the ECU.
+            ID (int): ID of the frame.
+            status (str): Transmission status (COMPLITED, LOWER_FRAME_ID, BIT_ERROR, or STUFF_ERROR).
+            activeFlag (bool, optional): After an error, True if the error flag was active (dominant).
+        """
+
+        for key, table in ((ID, self.__ids), (name, self.__ecus)):
+            counters = table.get(key)
+            if counters is None:
+                counters = table[key] = {"attempts": 0, "COMPLITED": 0, "LOWER_FRAME_ID": 0, "BIT_ERROR": 0,
+                                         "STUFF_ERROR": 0, "activeErrorFlags": 0, "passiveErrorFlags": 0}
+            counters["attempts"] += 1
+            counters[status] = counters.get(status, 0) + 1
+            if activeFlag is not None:
+                counters["activeErrorFlags" if activeFlag else "passiveErrorFlags"] += 1
+
+    def latency(self, name: str, cycles: int):
+        """
+        Record the bus cycles an ECU waited between a due slot and the start of its transmission.
+
+        Args:
+            name (str): Name of the ECU.
+            cycles (int): Waiting time in bus cycles.
+        """
+
+        histogram = self.__latencies.get(name)
+        if histogram is None:
+            histogram = self.__latencies[name] = LatencyHistogram()
+        histogram.record(cycles)
+
+    def toDict(self) -> dict:
+        """
+        Get every metric.
+
+        Returns:
+            dict: Bus counters and utilization, per-ID counters, per-ECU counters and latency histograms.
+        """
+
+        busCycles = self.__canBus.getTick() - self.__startTick
+        backgroundFrames = self.__canBus.getBackgroundFrames() - self.__startBackground
+        backgroundCycles = backgroundFrames * self.__canBus.getBackgroundBits()
+        errorFlags = sum(c["activeErrorFlags"] + c["passiveErrorFlags"] for c in self.__ecus.values())
+
+        ecus = {}
+        for name, counters in self.__ecus.items():
+            ecus[name] = dict(counters)
+        for name, histogram in self.__latencies.items():
+            ecus.setdefault(name, {})["latency"] = histogram.toDict()
+
+        return {
+            "bus": {
+                "cycles": busCycles,
+                "busyCycles": self.__busyCycles,
+                "backgroundCycles": backgroundCycles,
+                "utilization": (self.__busyCycles + backgroundCycles) / busCycles if busCycles else 0.0,
+                "frames": self.__frames,
+                "backgroundFrames": backgroundFrames,
+                "errorFlags": errorFlags,
+            },
+            "ids": {str(ID): dict(counters) for ID, counters in sorted(self.__ids.items())},
+            "ecus": ecus,
+        }
+
+    def toJSON(self, path: str = None) -> str:
+        """
+        Export the metrics as JSON.
+
+        Args:
+            path (str, optional): File to write, nothing is written if None.
+
+        Returns:
+            str: The JSON document.
+        """
+
+        document = json.dumps(self.toDict(), indent=2)
+        if path is not None:
+            with open(path, "w") as file:
+                file.write(document)
+        return document
@@ -0,0 +1,234 @@
+"""
+period_detector.py - Streaming estimation of the transmission period of every ID on the bus.
+
+PeriodDetector keeps a table indexed by ID with the slot of its last frame
+and the statistics of its inter-arrival gaps (in frame slots): count, mean
+and variance (Welford) and a histogram of the gaps, whose mode is the
+period estimate. Each frame costs a dict lookup and a few additions, so
+every ID of a busy bus is followed at O(1) per frame.
+
+The confidence of a period is the fraction of the gaps equal to it: 1.0
+for an ECU that is never delayed, lower when frames are delayed by the
+arbitration or lost. The attacker uses it to learn the Victim's period; a
+defender (or an attacker choosing a target) can rank hundreds of periodic
+IDs with getPeriods(), or get the best ranked one with getBestPeriod().
+The ranking is kept sorted and only the IDs whose estimate changed since
+the last query are moved, so choosing a target after every frame costs
+O(log N) comparisons instead of a sort of every ID. Run this module for
+the accuracy and the cost per frame on a bus of 200 ECUs.
+"""
+
+import math
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+
+from frame_decoder import FrameDecoder
+
+# Period estimate of an ID: nextSlot = lastSlot + period is the slot of its next frame
+Period = namedtuple("Period", ["ID", "period", "confidence", "gaps", "mean", "jitter", "lastSlot", "nextSlot"])
+
+
+class _Arrivals:
+    """
+    Arrival statistics of an ID.
+    """
+
+    __slots__ = ("lastSlot", "frames", "gaps", "mean", "m2", "histogram", "period", "periodGaps")
+
+    def __init__(self):
+        self.lastSlot = None  # slot of the last frame
+        self.frames = 0
+        self.gaps = 0  # inter-arrival gaps measured
+        self.mean = 0.0  # mean gap
+        self.m2 = 0.0  # sum of the squared deviations of the gaps (Welford)
+        self.histogram = {}  # gap -> occurrences
+        self.period = None  # most frequent gap
+        self.periodGaps = 0  # occurrences of the period
+
+
+class PeriodDetector:
+    """
+    Per-ID period estimator of the frames seen on a CanBus.
+
+    Feed it with observe(ID, slot) for every decoded frame, or give it a bus
+    to listen to (it then decodes the traffic itself, as IDS does).
+    """
+
+    def __init__(self, canBus: 'CanBus' = None, minGaps: int = 1, onPeriod=None):
+        """
+        Initialize the detector.
+
+        Args:
+            canBus (CanBus, optional): Bus to listen to, None to be fed with observe().
+            minGaps (int): Gaps of an ID before its period is reported.
+            onPeriod (callable, optional): Called with the Period of an ID when it is reported for the
+                                           first time (after minGaps gaps).
+        """
+
+        self.__canBus = canBus
+        self.__minGaps = minGaps
+        self.__onPeriod = onPeriod
+        self.__table = {}  # ID -> _Arrivals
+        self.__ranking = []  # sorted (-confidence, -gaps, ID) of the IDs with a period
+        self.__ranks = {}  # ID -> its key in the ranking
+        self.__changed = set()  # IDs whose estimate changed since the ranking was updated
+        self.__frames = 0
+        if canBus is not None:
+            canBus.addListener(FrameDecoder(onFrame=self.__onFrame, intern=True))
+
+    def __onFrame(self, frame: 'Frame'):
+        """Called by the decoder with each valid frame, during the last bit of the frame."""
+        self.observe(frame.getID(), self.__canBus.getCount())
+
+    def observe(self, ID: int, slot: int):
+        """
+        Record a frame.
+
+        Args:
+            ID (int): ID of the frame.
+            slot (int): Frame count of the bus when the frame was sent (CanBus.getCount).
+        """
+
+        self.__frames += 1
+        arrivals = self.__table.get(ID)
+        if arrivals is None:
+            arrivals = self.__table[ID] = _Arrivals()
+        arrivals.frames += 1
+
+        lastSlot = arrivals.lastSlot
+        arrivals.lastSlot = slot
+        if lastSlot is None or slot <= lastSlot:
+            return
+
+        # Welford update of the mean and the variance of the gaps
+        gap = slot - lastSlot
+        arrivals.gaps += 1
+        delta = gap - arrivals.mean
+        arrivals.mean += delta / arrivals.gaps
+        arrivals.m2 += delta * (gap - arrivals.mean)
+
+        # Mode of the gaps, the shortest one on a tie
+        count = arrivals.histogram.get(gap, 0) + 1
+        arrivals.histogram[gap] = count
+        if count > arrivals.periodGaps or (count == arrivals.periodGaps and gap < arrivals.period):
+            arrivals.period = gap
+            arrivals.periodGaps = count
+
+        if arrivals.gaps >= self.__minGaps:
+            self.__changed.add(ID)
+            if arrivals.gaps == self.__minGaps and self.__onPeriod is not None:
+                self.__onPeriod(self.__estimate(ID, arrivals))
+
+    def __estimate(self, ID: int, arrivals: '_Arrivals') -> 'Period':
+        """Build the Period of an ID from its statistics."""
+        jitter = (arrivals.m2 / (arrivals.gaps - 1)) ** 0.5 if arrivals.gaps > 1 else 0.0
+        return Period(ID, arrivals.period, arrivals.periodGaps / arrivals.gaps, arrivals.gaps, arrivals.mean,
+                      jitter, arrivals.lastSlot, arrivals.lastSlot + arrivals.period)
+
+    def getPeriod(self, ID: int) -> 'Period':
+        """
+        Get the period estimate of an ID.
+
+        Args:
+            ID (int): ID of the frames.
+
+        Returns:
+            Period: The estimate, None if the ID has fewer than minGaps gaps.
+        """
+
+        arrivals = self.__table.get(ID)
+        if arrivals is None or arrivals.gaps < max(self.__minGaps, 1):
+            return None
+        return self.__estimate(ID, arrivals)
+
+    def __updateRanking(self):
+        """Move the IDs whose estimate changed to their place in the ranking."""
+        ranking = self.__ranking
+        for ID in self.__changed:
+            key = self.__ranks.get(ID)
+            if key is not None:
+                del ranking[bisect_left(ranking, key)]
+            arrivals = self.__table[ID]
+            key = self.__ranks[ID] = (-(arrivals.periodGaps / arrivals.gaps), -arrivals.gaps, ID)
+            insort(ranking, key)
+        self.__changed.clear()
+
+    def getPeriods(self, minConfidence: float = 0.0) -> list:
+        """
+        Get the period estimates of every ID, e.g. to choose a target.
+
+        Args:
+            minConfidence (float): Lowest confidence reported.
+
+        Returns:
+            list: Period of each ID with at least minGaps gaps, by decreasing confidence then gaps.
+        """
+
+        self.__updateRanking()
+        ranked = self.__ranking[:bisect_right(self.__ranking, (-minConfidence, math.inf))]
+        return [self.__estimate(ID, self.__table[ID]) for _, _, ID in ranked]
+
+    def getBestPeriod(self, minConfidence: float = 0.0) -> 'Period':
+        """
+        Get the best ranked period estimate, the first of getPeriods() without building the list.
+
+        Args:
+            minConfidence (float): Lowest confidence reported.
+
+        Returns:
+            Period: The estimate with the highest confidence then gaps, None if no ID qualifies.
+        """
+
+        self.__updateRanking()
+        if not self.__ranking or -self.__ranking[0][0] < minConfidence:
+            return None
+        ID = self.__ranking[0][2]
+        return self.__estimate(ID, self.__table[ID])
+
+    def getStats(self) -> dict:
+        """
+        Get the counters of the detector.
+
+        Returns:
+            dict: Frames observed and IDs seen.
+        """
+
+        return {"frames": self.__frames, "ids": len(self.__table)}
+
+
+if __name__ == "__main__":
+    import random
+    from simulation import Simulation
+    from frame import Frame
+
+    # 200 periodic ECUs with priority scheduling: accuracy of the estimates
+    random.seed(0)
+    simulation = Simulation(0.003, verbose=False, priorityScheduling=True)
+    detector = PeriodDetector(simulation.canBus, minGaps=3)
+    periods = {}
+    for i, ID in enumerate(random.sample(range(0b11111111111 + 1), 200)):
+        periods[ID] = random.randint(200, 600)  # about half of the slots
+        dlc = random.randint(1, 4)
+        simulation.addECU(f"ECU{i+1}", periods[ID], Frame(ID, dlc, [random.randint(0, 255) for _ in range(dlc)]))
+    simulation.run(150 * 6000)  # about 6000 slots of ~50 bus cycles
+
+    estimates = detector.getPeriods()
+    correct = sum(estimate.period == periods[estimate.ID] for estimate in estimates)
+    confident = [estimate for estimate in estimates if estimate.confidence >= 0.9]
+    print(f"{detector.getStats()['frames']} frames, {len(estimates)}/{len(periods)} IDs with a period, {correct} correct")
+    print(f"{len(confident)} IDs with confidence >= 0.9, "
+          f"{sum(estimate.period == periods[estimate.ID] for estimate in confident)} correct")
+    for estimate in estimates[:3] + estimates[-3:]:
+        print(f"    ID {estimate.ID:>4}: period {estimate.period:>4} (true {periods[estimate.ID]:>4}), "
+              f"confidence {estimate.confidence:.2f}, jitter {estimate.jitter:.1f} over {estimate.gaps} gaps")
+
+    # CPU cost per frame, replaying the observed traffic
+    observations = [(random.choice(list(periods)), slot) for slot in range(200000)]
+    detector = PeriodDetector()
+    observe = detector.observe
+    start = time.process_time()
+    for ID, slot in observations:
+        observe(ID, slot)
+    elapsed = time.process_time() - start
+    print(f"CPU cost: {elapsed / len(observations) * 1e9:.0f} ns per frame ({len(observations)} frames, 200 IDs)")
@@ -0,0 +1,93 @@
+"""
+receivers.py - Reception of the bus frames by the ECUs that did not send them.
+
+On a CAN bus every node receives every frame. Receivers is a CanBus
+listener that, at the end of each frame, decodes the bits seen on the bus
+once (Frame.decodePackedBits, which checks the stuffing, the CRC and the
+form) and hands the result to ECU.receiveFrame of every ECU that did not
+transmit bits of that frame (CanBus.getFrameSenders): a valid frame
+decreases their REC, an error frame increases it.
+
+With keepFrames the bits of every frame are also kept, and verify()
+validates the whole recording at once with Frame.verifyMany.
+"""
+
+from frame import Frame
+from bit_codec import packBits
+
+
+class Receivers:
+    """
+    CanBus listener delivering every frame to the ECUs that did not transmit it.
+    """
+
+    def __init__(self, canBus: 'CanBus', keepFrames: bool = False):
+        """
+        Initialize the receivers and start listening to the bus.
+
+        Args:
+            canBus (CanBus): The bus to receive from.
+            keepFrames (bool): Keep the bits of every frame, for verify().
+        """
+
+        self.__canBus = canBus
+        self.__ecus = []
+        self.__frames = [] if keepFrames else None
+        self.__received = 0
+        self.__errors = 0
+        canBus.addListener(self)
+
+    def addECU(self, ecu: 'ECU'):
+        """
+        Receive the frames with an ECU.
+
+        Args:
+            ecu (ECU): The receiving ECU.
+        """
+
+        self.__ecus.append(ecu)
+
+    def feedBit(self, bit: int):
+        """Receive a bit from the bus (CanBus listener), the frame is decoded at its end."""
+
+    def endFrame(self):
+        """
+        Deliver the frame that just ended on the bus (CanBus listener, called with the bus locked).
+        """
+
+        bits = self.__canBus.getSendedFrame()
+        if self.__frames is not None:
+            self.__frames.append(list(bits))
+
+        decoded = Frame.decodePackedBits(*packBits(bits))
+        self.__received += 1
+        if decoded[1] is not None:
+            self.__errors += 1
+        senders = self.__canBus.getFrameSenders()
+        for ecu in self.__ecus:
+            if ecu.name not in senders:
+                ecu.receiveFrame(bits, decoded)
+
+    def getFrames(self) -> list:
+        """Get the bits of every frame, None unless keepFrames is set."""
+        return self.__frames
+
+    def verify(self):
+        """
+        Validate every kept frame at once (stuffing, CRC and form).
+
+        Returns:
+            np.ndarray: True for the frames received without errors.
+        """
+
+        return Frame.verifyMany(self.__frames)
+
+    def getStats(self) -> dict:
+        """
+        Get the counters of the receivers.
+
+        Returns:
+            dict: Frames received and frames with an error.
+        """
+
+        return {"frames": self.__received, "errors": self.__errors}
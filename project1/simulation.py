@@ -0,0 +1,527 @@
+"""
+simulation.py - Bus-off attack simulation on the discrete-event engine.
+
+Same scenario as the threads of main.py (periodic ECUs, an attacker that
+learns the Victim's period and collides with it), run by a single thread in
+virtual time. Each ECU is a generator coroutine that yields a request to
+the scheduler and is resumed when the request is satisfied:
+
+    (WAIT_SLOT, count)  resumed with the frame count once the bus is idle and
+                        the frame count has reached count
+    (TRANSMIT, bit)     resumed with the bit read from the bus after the bus cycle
+    (RECEIVE,)          resumed with (frame, count) when a frame is decoded on the bus
+    (SEND_FRAME, ecu, frame)
+                        frame-level mode: resumed with the transmission status once the
+                        ECU has sent its last bit (see CanBus.arbitrate)
+    (QUEUE_FRAME, count, ecu, frame)
+                        priority scheduling: the frame is queued from frame count
+                        count, resumed with (slot, status) once it has been sent
+
+Every bus cycle the transmitting coroutines write their bit, the bus
+processes it and the coroutines are resumed, in creation order. No barrier
+or polling is needed and two runs with the same inputs are identical.
+Coroutines waiting for a slot are kept in a heap keyed by the frame count.
+
+With priority scheduling, frames become pending when their frame count is
+reached and move to a second heap keyed by priority (arbitrationKey, the
+ID field as sent on the bus). Every time the bus is idle it pulls the
+pending frames with the highest priority only: the other frames would lose
+the arbitration without affecting the bus, so they simply stay pending
+instead of being sent and retransmitted. The cost of a bus cycle no longer
+depends on the number of ECUs, the bus traffic and the TECs are the same,
+only the LOWER_FRAME_ID outcomes are not reported.
+"""
+
+import heapq
+import random
+
+from ecu import ECU
+from can_bus import CanBus
+from frame import Frame
+from frame_decoder import FrameDecoder
+from engine import Engine, VirtualClock
+from arbitration import arbitrationKey
+from metrics import BusMetrics
+from receivers import Receivers
+from period_detector import PeriodDetector
+
+BUS_TICKS = 3  # Clock ticks per bus cycle, as in main.canBusThread
+VICTIM_FRAME = Frame(671, 3, [217, 16, 133])  # Frame of the Victim ECU in the attack scenario of main.py
+
+# Requests yielded by the coroutines
+WAIT_SLOT = "WAIT_SLOT"
+TRANSMIT = "TRANSMIT"
+RECEIVE = "RECEIVE"
+SEND_FRAME = "SEND_FRAME"
+QUEUE_FRAME = "QUEUE_FRAME"
+
+
+class Task:
+    """
+    A coroutine run by the Simulation scheduler.
+
+    Attributes:
+        name (str): Name of the task, used as sender of the transmitted bits.
+        coroutine (generator): Generator yielding WAIT_SLOT, TRANSMIT or RECEIVE requests.
+        bit (int): Bit requested by the last TRANSMIT.
+        request (tuple): (ecu, frame) of the last SEND_FRAME or QUEUE_FRAME request.
+        slot (int): Frame count at which the last queued frame was sent.
+    """
+
+    __slots__ = ("name", "coroutine", "bit", "request", "slot")
+
+    def __init__(self, name: str, coroutine):
+        """
+        Initialize the task.
+
+        Args:
+            name (str): Name of the task.
+            coroutine (generator): The coroutine, not started yet.
+        """
+
+        self.name = name
+        self.coroutine = coroutine
+        self.bit = None
+        self.request = None
+        self.slot = None
+
+
+class Simulation:
+    """
+    Cooperative scheduler running ECUs, the CAN bus and the attacker on the discrete-event engine.
+    """
+
+    def __init__(self, clockPeriod: float, pacing: float = 0.0, verbose: bool = True, frameLevel: bool = False,
+                 priorityScheduling: bool = False, idleGap: int = 2, backgroundBits: int = 30, metrics: bool = False,
+                 retransmission: bool = True, historySize: int = None, eventLog: 'EventLog' = None,
+                 reception: bool = False):
+        """
+        Initialize the simulation.
+
+        Args:
+            clockPeriod (float): Duration of a clock tick in seconds (main.CLOCK).
+            pacing (float): Speed relative to real time, 0 to run as fast as possible.
+            verbose (bool): Print the transmissions as the threaded simulation does.
+            frameLevel (bool): Resolve each contention at once with CanBus.arbitrate
+                               instead of bit by bit (same outcomes and TEC timestamps).
+            priorityScheduling (bool): Queue the frames by ID and let the bus pull the
+                                       highest priority ones (implies frameLevel).
+            idleGap (int): Idle bus cycles before a background frame, None to disable them (see CanBus).
+            backgroundBits (int): Length of a background frame in bus cycles.
+            metrics (bool): Collect bus and ECU metrics in self.metrics (see BusMetrics).
+            retransmission (bool): Retransmit in the next slot after an error (automatic
+                                   retransmission), False to wait for the next period.
+            historySize (int, optional): Keep only the last historySize TEC and REC changes of each ECU.
+            eventLog (EventLog, optional): Log receiving the transmissions (with their virtual time)
+                                           instead of printing them.
+            reception (bool): The ECUs receive the frames they do not send, updating their REC (see Receivers),
+                              off by default: the bus-off attack only depends on the TECs.
+        """
+
+        self.clock = VirtualClock(clockPeriod, pacing)
+        self.engine = Engine(self.clock)
+        self.canBus = CanBus(self.clock, idleGap, backgroundBits)
+        self.metrics = BusMetrics(self.canBus) if metrics else None
+        self.receivers = Receivers(self.canBus) if reception else None
+        self.verbose = verbose
+        self.frameLevel = frameLevel or priorityScheduling
+        self.priorityScheduling = priorityScheduling
+        self.retransmission = retransmission
+        self.historySize = historySize
+        self.eventLog = eventLog
+
+        self.__ecus = []  # every ECU, in creation order
+        self.__transmitting = []  # tasks transmitting in the current bus cycle
+        self.__contenders = []  # tasks starting a frame in the current bus cycle (frame-level mode)
+        self.__pending = 0  # frame-level transmissions not completed yet
+        self.__resolvedTick = None  # tick of the last bus cycle resolved at frame level
+        self.__waiting = []  # heap of (frame count, order, task)
+        self.__pendingFrames = []  # priority scheduling: heap of (priority, order, task) of the frames ready to be sent
+        self.__receivers = []  # tasks waiting for the next decoded frame
+        self.__order = 0
+        self.__decoder = FrameDecoder(onFrame=self.__onFrame, intern=True)
+        self.__listening = False  # decoder registered on the bus
+        self.__decodedFrame = None
+        self.__stopping = False  # set when an ECU enters BUS_OFF
+        self.__busOffECU = None
+        self.__busOffTime = None
+        self.__attackStart = None  # frame count when the attacker found the period
+
+    def spawn(self, name: str, coroutine):
+        """
+        Start a coroutine, it runs until its first request.
+
+        Args:
+            name (str): Name of the task.
+            coroutine (generator): Generator yielding WAIT_SLOT, TRANSMIT or RECEIVE requests.
+        """
+
+        self.__resume(Task(name, coroutine), None)
+
+    def addECU(self, name: str, period: int, frame: 'Frame', startCount: int = 0):
+        """
+        Add an ECU transmitting a frame periodically.
+
+        Args:
+            name (str): Name of the ECU.
+            period (int): Number of frame slots between consecutive transmissions.
+            frame (Frame): Frame to transmit.
+            startCount (int): Frame count before which the ECU does not transmit.
+        """
+
+        self.spawn(name, self.ecuTask(name, period, frame, startCount))
+
+    def addAttacker(self, name: str, minGaps: int = 1, minConfidence: float = 0.9):
+        """
+        Add the attacker (see main.attacker and attackerTask).
+
+        Args:
+            name (str): Name of the attacker ECU.
+            minGaps (int): Inter-arrival gaps of an ID before it can be chosen as the Victim.
+            minConfidence (float): Lowest confidence of the period of the ID chosen.
+        """
+
+        self.spawn(name, self.attackerTask(name, minGaps, minConfidence))
+
+    def addAttackScenario(self, period: int, ecuNumber: int = 0, seed: int = 0, victimFrame: 'Frame' = VICTIM_FRAME,
+                          minGaps: int = 1, minConfidence: float = 0.9):
+        """
+        Add the ECUs of the bus-off attack: the Victim, the Adversary and ecuNumber
+        ECUs sending random frames. The same arguments always give the same ECUs
+        (main.batchMode and sweep.runScenario share this scenario).
+
+        Args:
+            period (int): Period of the Victim in frame slots.
+            ecuNumber (int): Additional ECUs, with periods between period and 3 * period.
+            seed (int): Seed of the random frames and periods of the additional ECUs.
+            victimFrame (Frame): Frame of the Victim.
+            minGaps (int): Inter-arrival gaps of an ID before the attacker can choose it (see addAttacker).
+            minConfidence (float): Lowest confidence of the period of the ID chosen by the attacker.
+        """
+
+        self.addECU("Victim", period, victimFrame)
+        self.addAttacker("Adversary", minGaps, minConfidence)
+
+        rng = random.Random(seed)
+        for i in range(ecuNumber):
+            dlc = rng.randint(1, 4)
+            frame = Frame(rng.randint(0, 0b11111111111), dlc, [rng.randint(0, 255) for _ in range(dlc)])
+            self.addECU(f"ECU{i+1}", rng.randint(period, period * 3), frame)
+
+    def ecuTask(self, name: str, period: int, frame: 'Frame', startCount: int = 0):
+        """
+        Coroutine of an ECU transmitting a frame periodically, retransmitting it
+        in the next slot after an error unless retransmission is disabled (see main.ecuThread).
+
+        Args:
+            name (str): Name of the ECU.
+            period (int): Number of frame slots between consecutive transmissions.
+            frame (Frame): Frame to transmit.
+            startCount (int): Frame count before which the ECU does not transmit.
+        """
+
+        ecu = ECU(name, self.canBus, self.clock, historySize=self.historySize)
+        if self.metrics is not None:
+            ecu.setMetrics(self.metrics)
+        if self.receivers is not None:
+            self.receivers.addECU(ecu)
+        self.__ecus.append(ecu)
+        self.__log(f"Start {name:<9} -> Period: {period:<2}; {frame}")
+
+        retransmission = False
+        nextCount = max(startCount, self.canBus.getCount())
+        lastFrameNumber = 0
+
+        while True:
+            if retransmission:  # retransmit in case of an error without waiting for the period
+                slot = lastFrameNumber + 1
+            else:  # Wait the next period to transmit a frame
+                slot = -(-nextCount // period) * period
+
+            if self.priorityScheduling:
+                lastFrameNumber, transmitedStatus = yield (QUEUE_FRAME, slot, ecu, frame)
+            else:
+                lastFrameNumber = yield (WAIT_SLOT, slot)
+                ecu.frameDue()
+                transmitedStatus = yield from self.sendFrame(ecu, frame)
+            self.__log(f"   {name:<9} | ECU: TEC: {ecu.getTEC():<3}, Status: {ecu.getStatus():<13} | Transmitted frame status: {transmitedStatus:<9} | CanBus slot: {lastFrameNumber}")
+
+            # Check if the ECU has entered BUS_OFF state
+            if ecu.getStatus() == ECU.BUS_OFF:
+                self.__busOff(ecu)
+                return
+
+            retransmission = self.retransmission and transmitedStatus != ECU.COMPLITED
+            nextCount = lastFrameNumber + 1  # the frame ends in the next slot
+
+    def sendFrame(self, ecu: 'ECU', frame: 'Frame'):
+        """
+        Coroutine transmitting a frame bit by bit (see ECU.sendFrame).
+
+        Args:
+            ecu (ECU): The transmitting ECU.
+            frame (Frame): Frame to transmit.
+
+        Returns:
+            str: Transmission status (COMPLITED, LOWER_FRAME_ID, BIT_ERROR, or STUFF_ERROR).
+        """
+
+        if self.frameLevel:
+            return (yield (SEND_FRAME, ecu, frame))
+
+        ecu.startFrame(frame)
+        status = None
+        while status is None:
+            lastSendedBit = yield (TRANSMIT, ecu.getNextBit())
+            status = ecu.checkBit(lastSendedBit)
+        return status
+
+    def attackerTask(self, name: str, minGaps: int = 1, minConfidence: float = 0.9):
+        """
+        Coroutine of the attacker: it decodes the bus traffic until an ID has minGaps
+        inter-arrival gaps and a period of confidence at least minConfidence (the best
+        ranked by PeriodDetector.getBestPeriod if several qualify together), then transmits
+        a frame with the same ID and no data with the estimated period.
+
+        Args:
+            name (str): Name of the attacker ECU.
+            minGaps (int): Inter-arrival gaps of an ID before it can be chosen as the Victim.
+            minConfidence (float): Lowest confidence of the period of the ID chosen.
+        """
+
+        detector = PeriodDetector(minGaps=minGaps)  # inter-arrival statistics of every ID on the bus
+        estimate = None
+        while estimate is None:
+            frame, count = yield (RECEIVE,)
+            detector.observe(frame.getID(), count)
+            estimate = detector.getBestPeriod(minConfidence=minConfidence)
+
+        period = estimate.period
+        self.__attackStart = self.canBus.getCount()
+        self.__log(f"Adversary found Victim's period: {period}")
+        attackerFrame = Frame(estimate.ID, 0, [])
+        yield from self.ecuTask(name, period, attackerFrame, estimate.lastSlot + 1)
+
+    def __resume(self, task: 'Task', value):
+        """
+        Resume a task and queue its next request.
+
+        Args:
+            task (Task): The task.
+            value: Value returned to the task by its last request.
+        """
+
+        try:
+            request = task.coroutine.send(value)
+        except StopIteration:
+            return
+
+        if request[0] == TRANSMIT:
+            task.bit = request[1]
+            self.__transmitting.append(task)
+        elif request[0] == WAIT_SLOT:
+            heapq.heappush(self.__waiting, (request[1], self.__order, task))
+            self.__order += 1
+        elif request[0] == SEND_FRAME:
+            task.request = request[1:]
+            self.__contenders.append(task)
+        elif request[0] == QUEUE_FRAME:
+            task.request = request[2:]
+            heapq.heappush(self.__waiting, (request[1], self.__order, task))
+            self.__order += 1
+        elif request[0] == RECEIVE:
+            self.__receivers.append(task)
+            if not self.__listening:
+                self.canBus.addListener(self.__decoder)
+                self.__listening = True
+        else:
+            raise ValueError(f"Unknown request {request!r} from {task.name}")
+
+    def __onFrame(self, frame: 'Frame'):
+        """Called by the bus while it processes the last bit of a frame, the receivers are resumed in OBSERVE."""
+        self.__decodedFrame = (frame, self.canBus.getCount())
+
+    def __busOff(self, ecu: 'ECU'):
+        """Stop the simulation once the current transmissions end."""
+        if not self.__stopping:
+            self.__busOffECU = ecu
+            self.__busOffTime = self.clock.time()
+        self.__stopping = True
+        self.__log(f"{ecu.name} entered BUS_OFF. Stopping all threads.")
+
+    def __wake(self):
+        """Resume the tasks whose slot has come, once the bus is idle."""
+        if self.__stopping or self.canBus.getStatus() != CanBus.IDLE:
+            return
+        count = self.canBus.getCount()
+        while self.__waiting and self.__waiting[0][0] <= count:
+            _, order, task = heapq.heappop(self.__waiting)
+            if task.request is not None:  # queued frame, now pending
+                ecu, frame = task.request
+                ecu.frameDue()
+                heapq.heappush(self.__pendingFrames, (arbitrationKey(ecu.getFrameBits(frame)), order, task))
+            else:
+                self.__resume(task, count)
+
+        # The bus pulls the pending frames with the highest priority
+        pending = self.__pendingFrames
+        if pending and not self.__transmitting and not self.__contenders:
+            priority = pending[0][0]
+            while pending and pending[0][0] == priority:
+                task = heapq.heappop(pending)[2]
+                task.slot = count
+                self.__contenders.append(task)
+
+    def __transmit(self):
+        """TRANSMIT phase: the transmitting tasks write their bit on the bus."""
+        for task in self.__transmitting:
+            self.canBus.transmitBit(task.bit, task.name)
+
+        if self.__contenders:
+            self.__arbitrate()
+
+    def __arbitrate(self):
+        """
+        Frame-level mode: send the frames of the contending tasks at once, each task is
+        resumed in the bus cycle of its last bit, as in the bit by bit mode.
+        """
+
+        contenders = self.__contenders
+        self.__contenders = []
+        tick = self.clock.getTick()
+        for task in contenders:
+            task.request[0].startFrame(task.request[1])
+        outcomes = self.canBus.arbitrate([(task.name, ecu.getFrameBits(frame), ecu.getErrorFlag())
+                                          for task, (ecu, frame) in ((task, task.request) for task in contenders)])
+
+        for task, (status, lastIndex) in zip(contenders, outcomes):
+            self.__pending += 1
+            self.engine.schedule(tick + lastIndex * BUS_TICKS, self.__completion(task, status), Engine.OBSERVE)
+
+        # The bus cycles of the frame are already processed
+        self.__resolvedTick = tick
+        busCycles = max(lastIndex for _, lastIndex in outcomes) + 1
+        self.engine.schedule(tick + (busCycles - 1) * BUS_TICKS, self.__deliver, Engine.OBSERVE)
+        self.__schedule(tick + busCycles * BUS_TICKS)
+
+    def __completion(self, task: 'Task', status: str):
+        """
+        Create the event ending a frame-level transmission.
+
+        Args:
+            task (Task): The transmitting task.
+            status (str): Transmission status.
+
+        Returns:
+            callable: The event.
+        """
+
+        def complete():
+            self.__pending -= 1
+            ecu = task.request[0]
+            task.request = None
+            ecu.endTransmission(status)
+            if task.slot is not None:  # queued frame
+                slot = task.slot
+                task.slot = None
+                self.__resume(task, (slot, status))
+            else:
+                self.__resume(task, status)
+            if self.__stopping and not self.__pending:
+                self.engine.stop()  # the last transmissions are completed
+        return complete
+
+    def __process(self):
+        """PROCESS phase: the bus processes the current bit."""
+        if self.__resolvedTick != self.clock.getTick():
+            self.canBus.process()
+
+    def __observe(self):
+        """OBSERVE phase: resume the tasks, then schedule the next bus cycle."""
+        if self.__resolvedTick == self.clock.getTick():
+            return  # frame-level mode, the next bus cycle is already scheduled
+
+        transmitting = self.__transmitting
+        self.__transmitting = []
+        lastSendedBit = self.canBus.getSendedBit()
+        for task in transmitting:
+            self.__resume(task, lastSendedBit)
+
+        self.__deliver()
+
+        if self.__stopping and not self.__transmitting:
+            self.engine.stop()  # the last transmissions are completed
+            return
+
+        self.__wake()
+        self.__schedule(self.clock.getTick() + BUS_TICKS)
+
+    def __deliver(self):
+        """Resume the receiving tasks if a frame has been decoded."""
+        if self.__decodedFrame is not None:
+            received = self.__decodedFrame
+            self.__decodedFrame = None
+            receivers = self.__receivers
+            self.__receivers = []
+            for task in receivers:
+                self.__resume(task, received)
+
+        # Decode the bus traffic only while someone is listening
+        if self.__listening and not self.__receivers:
+            self.canBus.removeListener(self.__decoder)
+            self.__listening = False
+
+    def __schedule(self, tick: int):
+        """
+        Schedule the phases of a bus cycle.
+
+        Args:
+            tick (int): Tick of the bus cycle.
+        """
+
+        self.engine.schedule(tick, self.__transmit, Engine.TRANSMIT)
+        self.engine.schedule(tick, self.__process, Engine.PROCESS)
+        self.engine.schedule(tick, self.__observe, Engine.OBSERVE)
+
+    def run(self, maxTick: int = None) -> 'ECU':
+        """
+        Run the simulation until an ECU enters BUS_OFF.
+
+        Args:
+            maxTick (int, optional): Last clock tick to simulate.
+
+        Returns:
+            ECU: The ECU that entered BUS_OFF, None if maxTick was reached first.
+        """
+
+        self.__wake()
+        self.__schedule(self.clock.getTick() + BUS_TICKS)
+        self.engine.run(maxTick)
+        return self.__busOffECU
+
+    def getECUs(self) -> list:
+        """Get every ECU, in creation order."""
+        return list(self.__ecus)
+
+    def getTECs(self) -> list:
+        """Get the TEC history (CounterHistory) of every ECU, in creation order (time in clock ticks)."""
+        return [ecu.getTECs() for ecu in self.__ecus]
+
+    def getNames(self) -> list:
+        """Get the name of every ECU, in creation order."""
+        return [ecu.name for ecu in self.__ecus]
+
+    def getAttackStart(self) -> int:
+        """Get the frame count at which the attacker found the Victim's period, None if it did not."""
+        return self.__attackStart
+
+    def getBusOffTime(self) -> float:
+        """Get the virtual time at which the first ECU entered BUS_OFF, None if none did."""
+        return self.__busOffTime
+
+    def __log(self, message: str):
+        """Record a message in the event log, or print it if the simulation is verbose."""
+        if self.eventLog is not None:
+            self.eventLog.log(message, self.clock.time())
+        elif self.verbose:
+            print(message)
@@ -0,0 +1,235 @@
+"""
+sweep.py - Parameter sweeps of the bus-off attack on all the cores.
+
+Every scenario of a grid (period, clock, additional ECUs, seed, ...) runs
+headless in a ProcessPoolExecutor worker, on the virtual-time Simulation,
+and the results stream into a single columnar NumPy file (.npz) as the
+workers complete: one array per scalar column, one row per scenario, and
+the TEC histories of the Victim and the Adversary as ragged columns
+(values, ticks and offsets arrays, scenario i spans offsets[i]:offsets[i + 1]).
+The file is rewritten every flushEvery results, so a partial sweep can
+already be analysed, and sorted by scenario index at the end.
+
+Load it with np.load(path) and e.g. results["busOffTime"][results["period"] == 10].
+Running the module writes the sweep of the report to --output (by default
+sweep_results.npz in the temporary directory).
+"""
+
+import os
+import time
+import argparse
+import tempfile
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Default values of the scenario parameters
+DEFAULTS = {
+    "period": 7,  # Victim period (main.PERIOD)
+    "clock": 0.003,  # Clock period in seconds (main.CLOCK)
+    "ecuNumber": 0,  # Additional ECUs with random frames (main.ECU_NUMBER)
+    "seed": 0,  # Seed of the additional ECUs
+    "retransmission": True,  # Automatic retransmission after an error
+    "idleGap": 2,  # Idle bus cycles before a background frame (main.IDLE_GAP)
+    "backgroundBits": 30,  # Length of a background frame (main.BACKGROUND_BITS)
+    "maxTick": 10 ** 7,  # Last clock tick simulated if no ECU enters BUS_OFF
+}
+
+# Scalar result columns and their dtype
+COLUMNS = {
+    "scenario": np.int64, "period": np.int64, "clock": np.float64, "ecuNumber": np.int64, "seed": np.int64,
+    "retransmission": np.bool_, "idleGap": np.int64, "backgroundBits": np.int64,
+    "busOff": np.bool_, "victimBusOff": np.bool_, "busOffTime": np.float64, "busOffSlot": np.int64,
+    "attackStart": np.int64, "victimTEC": np.int64, "adversaryTEC": np.int64,
+    "victimRetransmissions": np.int64, "adversaryRetransmissions": np.int64, "retransmissions": np.int64,
+    "utilization": np.float64, "wallTime": np.float64,
+}
+
+# Ragged TEC history columns
+HISTORIES = ("victimTECs", "adversaryTECs")
+
+
+def parameterGrid(**parameters) -> list:
+    """
+    Build the scenarios of a grid, the missing parameters take the DEFAULTS.
+
+    Args:
+        **parameters: Parameter name -> list of values (e.g. period=[5, 10, 20]).
+
+    Returns:
+        list: One dict per combination, in itertools.product order.
+    """
+
+    names = list(parameters)
+    scenarios = []
+    for values in itertools.product(*(parameters[name] for name in names)):
+        scenario = dict(DEFAULTS)
+        scenario.update(zip(names, values))
+        scenarios.append(scenario)
+    return scenarios
+
+
+def runScenario(scenario: dict) -> dict:
+    """
+    Run one scenario headless (in a worker process).
+
+    Args:
+        scenario (dict): Scenario parameters (see DEFAULTS).
+
+    Returns:
+        dict: The scenario parameters, the COLUMNS results and the HISTORIES as (values, ticks) arrays.
+    """
+
+    from simulation import Simulation  # imported by the workers only
+
+    start = time.perf_counter()
+    simulation = Simulation(scenario["clock"], verbose=False, priorityScheduling=True,
+                            idleGap=scenario["idleGap"], backgroundBits=scenario["backgroundBits"], metrics=True,
+                            retransmission=scenario["retransmission"])
+    simulation.addAttackScenario(scenario["period"], scenario["ecuNumber"], scenario["seed"])
+
+    busOffECU = simulation.run(scenario["maxTick"])
+    ecus = {ecu.name: ecu for ecu in simulation.getECUs()}
+    counters = simulation.metrics.toDict()
+
+    def retransmissions(name: str) -> int:
+        """Errors followed by a retransmission (the one that ends in BUS_OFF is not)."""
+        ecu = counters["ecus"].get(name, {})
+        errors = ecu.get("BIT_ERROR", 0) + ecu.get("STUFF_ERROR", 0)
+        if busOffECU is not None and busOffECU.name == name:
+            errors -= 1
+        return errors if scenario["retransmission"] else 0
+
+    def history(name: str) -> tuple:
+        """TEC values and ticks of an ECU, empty if it did not start."""
+        if name not in ecus:
+            return np.zeros(0, dtype=np.int16), np.zeros(0, dtype=np.int64)
+        values, ticks = ecus[name].getTECs().toNumpy()
+        return values.copy(), ticks.copy()  # the views cannot be pickled
+
+    result = dict(scenario)
+    result.update({
+        "busOff": busOffECU is not None,
+        "victimBusOff": busOffECU is not None and busOffECU.name == "Victim",
+        "busOffTime": simulation.getBusOffTime() if busOffECU is not None else float("nan"),
+        "busOffSlot": simulation.canBus.getCount() if busOffECU is not None else -1,
+        "attackStart": simulation.getAttackStart() if simulation.getAttackStart() is not None else -1,
+        "victimTEC": ecus["Victim"].getTEC(),
+        "adversaryTEC": ecus["Adversary"].getTEC() if "Adversary" in ecus else 0,
+        "victimRetransmissions": retransmissions("Victim"),
+        "adversaryRetransmissions": retransmissions("Adversary"),
+        "retransmissions": sum(retransmissions(name) for name in ecus),
+        "utilization": counters["bus"]["utilization"],
+        "victimTECs": history("Victim"),
+        "adversaryTECs": history("Adversary"),
+        "wallTime": time.perf_counter() - start,
+    })
+    return result
+
+
+class ResultsWriter:
+    """
+    Collects the scenario results into columns and writes them to a .npz file.
+    """
+
+    def __init__(self, path: str, flushEvery: int = 100):
+        """
+        Initialize the writer.
+
+        Args:
+            path (str): Path of the results file.
+            flushEvery (int): Results between two rewrites of the file.
+        """
+
+        self.path = path
+        self.__flushEvery = flushEvery
+        self.__columns = {name: [] for name in COLUMNS}
+        self.__histories = {name: ([], []) for name in HISTORIES}  # name -> (values, ticks) per scenario
+        self.__pending = 0
+
+    def add(self, result: dict):
+        """
+        Add the result of a scenario, rewriting the file every flushEvery results.
+
+        Args:
+            result (dict): Result returned by runScenario, with its "scenario" index.
+        """
+
+        for name, column in self.__columns.items():
+            column.append(result[name])
+        for name, (values, ticks) in self.__histories.items():
+            values.append(result[name][0])
+            ticks.append(result[name][1])
+        self.__pending += 1
+        if self.__pending >= self.__flushEvery:
+            self.flush()
+
+    def flush(self, ordered: bool = False):
+        """
+        Write every result collected so far (atomically: a reader never sees a partial file).
+
+        Args:
+            ordered (bool): Sort the rows by scenario index (they are in completion order otherwise).
+        """
+
+        order = np.argsort(self.__columns["scenario"], kind="stable") if ordered else np.arange(len(self.__columns["scenario"]))
+        arrays = {name: np.asarray(column, dtype=COLUMNS[name])[order] for name, column in self.__columns.items()}
+        for name, (values, ticks) in self.__histories.items():
+            lengths = np.array([len(values[k]) for k in order], dtype=np.int64)
+            arrays[name + "_offsets"] = np.concatenate(([0], np.cumsum(lengths)))
+            arrays[name + "_values"] = np.concatenate([values[k] for k in order] or [np.zeros(0, dtype=np.int16)])
+            arrays[name + "_ticks"] = np.concatenate([ticks[k] for k in order] or [np.zeros(0, dtype=np.int64)])
+
+        temporary = self.path + ".tmp.npz"
+        np.savez(temporary, **arrays)
+        os.replace(temporary, self.path)
+        self.__pending = 0
+
+    def close(self):
+        """Write the final file, sorted by scenario index."""
+        self.flush(ordered=True)
+
+
+def runSweep(scenarios: list, path: str, workers: int = None, flushEvery: int = 100, verbose: bool = True) -> str:
+    """
+    Run scenarios in parallel and stream their results into a columnar file.
+
+    Args:
+        scenarios (list): Scenario dicts (see parameterGrid).
+        path (str): Path of the results file (.npz).
+        workers (int, optional): Worker processes (default: all the cores).
+        flushEvery (int): Results between two rewrites of the file.
+        verbose (bool): Print a line per completed scenario.
+
+    Returns:
+        str: The path of the results file.
+    """
+
+    writer = ResultsWriter(path, flushEvery)
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = {}
+        for index, scenario in enumerate(scenarios):
+            futures[executor.submit(runScenario, scenario)] = index
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            result["scenario"] = futures[future]
+            writer.add(result)
+            if verbose:
+                print(f"[{done}/{len(scenarios)}] period {result['period']:<3} ECUs {result['ecuNumber']:<3} "
+                      f"seed {result['seed']:<3} -> bus-off at {result['busOffTime']:.3f} s, "
+                      f"{result['retransmissions']} retransmissions")
+    writer.close()
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep of the bus-off attack over the periods of the report.")
+    parser.add_argument("--output", default=os.path.join(tempfile.gettempdir(), "sweep_results.npz"),
+                        help="results file (.npz, default: sweep_results.npz in the temporary directory)")
+    arguments = parser.parse_args()
+
+    # Periods of the report, with and without additional traffic
+    scenarios = parameterGrid(period=[5, 10, 20], ecuNumber=[0, 5, 20], seed=[0, 1, 2])
+    start = time.perf_counter()
+    path = runSweep(scenarios, arguments.output)
+    print(f"{len(scenarios)} scenarios in {time.perf_counter() - start:.1f} s on {os.cpu_count()} cores, results in {path}")
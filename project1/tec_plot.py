@@ -0,0 +1,194 @@
+"""
+tec_plot.py - TEC plots that scale with the length of the run and the number of ECUs.
+
+Each TEC history is downsampled with LTTB (Largest Triangle Three Buckets)
+to at most maxPoints points (and MAX_TOTAL_POINTS for all the ECUs
+together) before it is handed to matplotlib: the series
+is split into buckets and the point of each bucket forming the largest
+triangle with the point kept in the previous bucket and the average of the
+next one is kept, so the peaks and the ramps of the TEC survive. The points
+where the ECU changes state are always kept and marked:
+
+    ERROR_PASSIVE   TEC above 127 (an ECU that goes back to ERROR_ACTIVE is
+                    marked when the TEC falls to 127 again)
+    BUS_OFF         TEC above 255
+
+With a path the figure is rendered by the Agg backend straight to the file
+(PNG, SVG, ... from its extension), without a display. Rendering time
+depends on maxPoints only, not on the length of the histories; run this
+module to measure it. numpy and matplotlib are imported only when plotting.
+"""
+
+import time
+
+from ecu import ECU
+
+MAX_POINTS = 2000  # Points per ECU after downsampling
+MAX_TOTAL_POINTS = 20000  # Points of all the ECUs, the budget of each ECU shrinks with their number
+MIN_POINTS = 100  # Points per ECU, however many ECUs there are
+MAX_LEGEND = 10  # ECUs named in the legend, the first ones (Victim and Adversary in main.py)
+PASSIVE_TEC = ECU.PASSIVE_LIMIT  # ERROR_PASSIVE above this TEC
+BUS_OFF_TEC = ECU.BUS_OFF_LIMIT  # BUS_OFF above this TEC
+
+
+def lttb(x, y, threshold: int) -> 'np.ndarray':
+    """
+    Select the points of a series with the Largest Triangle Three Buckets algorithm.
+
+    Args:
+        x (np.ndarray): Increasing x values.
+        y (np.ndarray): y values.
+        threshold (int): Number of points to keep (at least 3).
+
+    Returns:
+        np.ndarray: Indices of the points kept, increasing, the first and the last included.
+    """
+
+    import numpy as np
+
+    length = len(x)
+    if threshold >= length or threshold < 3:
+        return np.arange(length)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Bucket k (1 .. threshold - 2) covers edges[k - 1]:edges[k], the first and the last points are kept
+    edges = (np.arange(threshold - 1) * ((length - 2) / (threshold - 2))).astype(np.int64) + 1
+    edges[-1] = length - 1  # the product can round below it
+    # Average point of each bucket, and of the last point as the bucket following the last one
+    sums = np.add.reduceat(np.column_stack((x[:-1], y[:-1])), edges[:-1], axis=0)
+    counts = np.diff(edges)[:, None]
+    averages = np.vstack((sums / counts, [[x[-1], y[-1]]]))
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = length - 1
+    a = 0
+    for k in range(threshold - 2):
+        start, end = edges[k], edges[k + 1]
+        nextX, nextY = averages[k + 1]
+        ax, ay = x[a], y[a]
+        # Twice the area of the triangles (a, candidate, next average)
+        areas = np.abs((ax - nextX) * (y[start:end] - ay) - (ax - x[start:end]) * (nextY - ay))
+        a = start + int(np.argmax(areas))
+        selected[k + 1] = a
+    return selected
+
+
+def transitions(tec) -> tuple:
+    """
+    Find the state changes of an ECU in its TEC history.
+
+    Args:
+        tec (np.ndarray): TEC values.
+
+    Returns:
+        tuple: (passive, busOff) index arrays: samples where the TEC crosses PASSIVE_TEC
+               (in either direction), and the first sample above BUS_OFF_TEC (at most one).
+    """
+
+    import numpy as np
+
+    passive = np.asarray(tec) > PASSIVE_TEC
+    crossings = np.flatnonzero(passive[1:] != passive[:-1]) + 1
+    if len(passive) and passive[0]:
+        crossings = np.concatenate(([0], crossings))
+    busOff = np.flatnonzero(np.asarray(tec) > BUS_OFF_TEC)[:1]
+    return crossings, busOff
+
+
+def plotTECs(histories: list, names: list, period: float, path: str = None, maxPoints: int = MAX_POINTS,
+             title: str = "TEC Values over time"):
+    """
+    Plot the TEC histories of the ECUs, downsampled, with their state changes marked.
+
+    Args:
+        histories (list): TEC history of each ECU (CounterHistory, or (values, ticks) arrays),
+                          an empty list for an ECU that did not start.
+        names (list): Name of each ECU.
+        period (float): Duration of a clock tick in seconds.
+        path (str, optional): Render to this file with the Agg backend, None to show the plot.
+        maxPoints (int): Points per ECU after downsampling (at most MAX_TOTAL_POINTS for all the ECUs),
+                         None to plot every sample.
+        title (str): Title of the plot.
+    """
+
+    import numpy as np
+    import matplotlib
+    if path is not None:
+        matplotlib.use("Agg")  # no window, works without a display
+    import matplotlib.pyplot as plt
+
+    figure, axes = plt.subplots(figsize=(10, 6))
+    milliseconds = period * 1000
+    if maxPoints is not None:
+        started = sum(1 for history in histories if len(history))
+        maxPoints = max(min(maxPoints, MAX_TOTAL_POINTS // max(started, 1)), MIN_POINTS)
+    passiveMarks = ([], [])
+    busOffMarks = ([], [])
+
+    for i, history in enumerate(histories):
+        if not len(history):
+            continue
+        tec, ticks = history.toNumpy() if hasattr(history, "toNumpy") else history
+        passive, busOff = transitions(tec)
+        if maxPoints is not None and len(tec) > maxPoints:
+            kept = np.union1d(lttb(ticks, tec, maxPoints), np.concatenate((passive, busOff)))
+            tec, ticks = tec[kept], ticks[kept]
+            passive, busOff = transitions(tec)  # same state changes, at their new positions
+        times = ticks * milliseconds
+        label = names[i] + "'s TEC" if i < MAX_LEGEND else None
+        axes.plot(times, tec, label=label, linestyle='-')
+        passiveMarks[0].extend(times[passive])
+        passiveMarks[1].extend(tec[passive])
+        busOffMarks[0].extend(times[busOff])
+        busOffMarks[1].extend(tec[busOff])
+
+    # One scatter per state for all the ECUs, a single legend entry each
+    if passiveMarks[0]:
+        axes.scatter(*passiveMarks, marker='o', color='orange', zorder=3, label=f"ERROR_PASSIVE (TEC > {PASSIVE_TEC})")
+    if busOffMarks[0]:
+        axes.scatter(*busOffMarks, marker='X', s=80, color='red', zorder=3, label=f"BUS_OFF (TEC > {BUS_OFF_TEC})")
+
+    axes.set_xlabel('Time [ms]')
+    axes.set_ylabel('TEC Value')
+    axes.set_title(title)
+    axes.legend()
+    axes.grid(True)
+    figure.tight_layout()
+
+    if path is not None:
+        figure.savefig(path)
+        plt.close(figure)
+    else:
+        plt.show()
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    import numpy as np
+
+    # Rendering time of a random walk TEC that reaches BUS_OFF, for growing histories
+    rng = np.random.default_rng(0)
+    path = os.path.join(tempfile.gettempdir(), "tec_plot_benchmark.png")
+    print(f"{'Samples':>9} | {'ECUs':>4} | {'Full [s]':>8} | {'LTTB [s]':>8}")  # samples of all the ECUs
+    for samples in (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6):
+        for ecus in (2, 100):
+            histories = []
+            for _ in range(ecus):
+                steps = rng.choice(np.array([8, -1], dtype=np.int16), max(samples // ecus, 2), p=[0.2, 0.8])
+                tec = np.clip(np.cumsum(steps), 0, 256).astype(np.int16)
+                histories.append((tec, np.arange(len(tec), dtype=np.int64) * 3))
+            names = [f"ECU{i}" for i in range(ecus)]
+
+            timings = []
+            for maxPoints in (None, MAX_POINTS):
+                best = None
+                for _ in range(3):  # best of 3, the first plot also loads matplotlib
+                    start = time.perf_counter()
+                    plotTECs(histories, names, 0.003, path, maxPoints)
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                timings.append(best)
+            print(f"{samples:>9,} | {ecus:>4} | {timings[0]:>8.3f} | {timings[1]:>8.3f}")
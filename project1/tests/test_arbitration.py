@@ -0,0 +1,77 @@
+"""
+Tests of the frame-level contention resolution against the bit by bit checks of ECU.checkBit.
+"""
+
+import random
+
+from arbitration import resolveContention
+from can_bus import CanBus
+from ecu import ECU
+from engine import VirtualClock
+from frame import Frame
+
+
+def bitByBit(frames: list) -> tuple:
+    """Send frames starting in the same bus cycle one bit at a time, as the bit-level simulation does."""
+    clock = VirtualClock(0.003)
+    canBus = CanBus(clock)
+    ecus = [ECU(f"ECU{i}", canBus, clock) for i in range(len(frames))]
+    for ecu, frame in zip(ecus, frames):
+        ecu.startFrame(frame)
+
+    busBits = []
+    outcomes = [None] * len(frames)
+    active = list(range(len(frames)))
+    while active:
+        for i in active:
+            canBus.transmitBit(ecus[i].getNextBit(), ecus[i].name)
+        canBus.process()
+        bit = canBus.getSendedBit()
+        for i in list(active):
+            status = ecus[i].checkBit(bit)
+            if status is not None:
+                outcomes[i] = (status, len(busBits))
+                active.remove(i)
+        busBits.append(bit)
+    return busBits, outcomes
+
+
+def frameLevel(frames: list) -> tuple:
+    """Resolve the same contention at once."""
+    clock = VirtualClock(0.003)
+    ecu = ECU("ECU", CanBus(clock), clock)
+    busBits, outcomes = resolveContention([(frame.getBits(), ecu.getErrorFlag()) for frame in frames])
+    return list(busBits), [tuple(outcome) for outcome in outcomes]
+
+
+def randomFrame(rng: 'random.Random', ID: int = None) -> 'Frame':
+    dlc = rng.randint(0, 8)
+    ID = rng.randint(0, 0b11111111111) if ID is None else ID
+    return Frame(ID, dlc, [rng.randint(0, 255) for _ in range(dlc)])
+
+
+def test_attack_collision():
+    frames = [Frame(671, 3, [217, 16, 133]), Frame(671, 0, [])]
+    busBits, outcomes = frameLevel(frames)
+    assert (busBits, outcomes) == bitByBit(frames)
+    assert outcomes[0][0] == ECU.BIT_ERROR  # the Victim's first data bit is overwritten
+
+
+def test_arbitration_loss():
+    frames = [Frame(0x400, 1, [1]), Frame(0x0FF, 1, [2]), Frame(0x3FF, 0, [])]
+    busBits, outcomes = frameLevel(frames)
+    assert (busBits, outcomes) == bitByBit(frames)
+    assert [status for status, _ in outcomes] == [ECU.LOWER_FRAME_ID, ECU.COMPLITED, ECU.LOWER_FRAME_ID]
+
+
+def test_random_contentions():
+    """Distinct and shared IDs: arbitration losses, bit errors, stuff errors and completed frames."""
+    rng = random.Random(0)
+    statuses = set()
+    for _ in range(300):
+        shared = rng.randint(0, 0b11111111111)
+        frames = [randomFrame(rng, shared if rng.random() < 0.5 else None) for _ in range(rng.randint(1, 4))]
+        expected = bitByBit(frames)
+        assert frameLevel(frames) == expected, frames
+        statuses.update(status for status, _ in expected[1])
+    assert statuses >= {ECU.COMPLITED, ECU.LOWER_FRAME_ID, ECU.BIT_ERROR}
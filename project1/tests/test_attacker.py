@@ -0,0 +1,36 @@
+"""
+Tests of the choice of the Victim by the attacker of the virtual time simulation.
+"""
+
+import io
+
+from event_log import EventLog
+from frame import Frame
+from simulation import Simulation, RECEIVE, WAIT_SLOT
+
+
+def test_attacker_chooses_the_confident_period():
+    """An ID with irregular gaps is skipped for the ID whose period is stable."""
+    stream = io.StringIO()
+    simulation = Simulation(0.003, eventLog=EventLog(stream))
+    attacker = simulation.attackerTask("Adversary", minGaps=2, minConfidence=0.9)
+    assert next(attacker) == (RECEIVE,)
+
+    # ID 100 first, with gaps 3 and 7 (confidence 0.5); ID 671 with gaps 7 and 7
+    arrivals = [(100, 0), (671, 1), (100, 3), (671, 8), (100, 10), (671, 15)]
+    for ID, slot in arrivals:
+        request = attacker.send((Frame(ID, 0, []), slot))
+    simulation.eventLog.flush()
+
+    assert request == (WAIT_SLOT, 21)  # first multiple of the period after the Victim's last frame
+    assert "Adversary found Victim's period: 7" in stream.getvalue()
+    assert "ID=671" in stream.getvalue()
+
+
+def test_attacker_with_more_gaps_still_attacks():
+    """Waiting for more gaps delays the attack but the Victim still ends in BUS_OFF."""
+    simulation = Simulation(0.003, verbose=False)
+    simulation.addECU("Victim", 7, Frame(671, 3, [217, 16, 133]))
+    simulation.addAttacker("Adversary", minGaps=3)
+    busOffECU = simulation.run()
+    assert busOffECU is not None and busOffECU.name == "Victim"
@@ -0,0 +1,66 @@
+"""
+Tests of the vectorized codec: Frame.encodeMany/decodeMany against the per-frame codec.
+"""
+
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from frame import Frame
+
+
+def randomFrames(count: int, seed: int = 0) -> list:
+    """Random frames of any DLC."""
+    rng = random.Random(seed)
+    frames = []
+    for _ in range(count):
+        dlc = rng.randint(0, 8)
+        frames.append(Frame(rng.randint(0, 0b11111111111), dlc, [rng.randint(0, 255) for _ in range(dlc)]))
+    return frames
+
+
+FRAMES = randomFrames(300)
+
+
+def test_encodeMany_matches_getBits():
+    bits, lengths = Frame.encodeMany(FRAMES)
+    assert bits.shape[0] == len(FRAMES)
+    for row, frame in enumerate(FRAMES):
+        assert bits[row, :lengths[row]].tolist() == frame.getBits()
+        assert not bits[row, lengths[row]:].any()  # zero padding
+
+
+def test_decodeMany_matches_fromBits():
+    ids, dlcs, data, valid = Frame.decodeMany(*Frame.encodeMany(FRAMES))
+    for row, frame in enumerate(FRAMES):
+        decoded = Frame.fromBits(frame.getBits())
+        assert bool(valid[row]) == (decoded is not None)
+        if decoded is not None:
+            assert Frame(int(ids[row]), int(dlcs[row]), data[row, :dlcs[row]].tolist()) == decoded
+
+
+def test_decodeMany_agrees_with_fromBits_on_corrupted_rows():
+    """valid marks exactly the rows that Frame.fromBits decodes, whatever the damage."""
+    rng = random.Random(1)
+    rows = []
+    for frame in FRAMES:
+        bits = frame.getBits()
+        for _ in range(rng.randint(0, 2)):
+            bits[rng.randrange(len(bits))] ^= 1
+        if rng.random() < 0.2:
+            bits = bits[:rng.randint(1, len(bits))]
+        rows.append(bits)
+    lengths = np.array([len(bits) for bits in rows])
+    matrix = np.zeros((len(rows), lengths.max()), dtype=np.uint8)
+    for row, bits in enumerate(rows):
+        matrix[row, :len(bits)] = bits
+
+    ids, dlcs, data, valid = Frame.decodeMany(matrix, lengths)
+    decoded = [Frame.fromBits(bits) for bits in rows]
+    assert valid.tolist() == [frame is not None for frame in decoded]
+    assert 0 < valid.sum() < len(rows)
+    for row, frame in enumerate(decoded):
+        if frame is not None:
+            assert frame == Frame(int(ids[row]), int(dlcs[row]), data[row, :dlcs[row]].tolist())
@@ -0,0 +1,76 @@
+"""
+Tests of the buffered event log and of the batch mode of main.py (JSON/CSV results).
+"""
+
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from event_log import EventLog
+
+PROJECT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_events_are_written_in_blocks():
+    stream = io.StringIO()
+    log = EventLog(stream, bufferEvents=3)
+    log.log("a")
+    log.log("b")
+    assert stream.getvalue() == ""  # buffered
+    log.log("c")
+    assert stream.getvalue() == "a\nb\nc\n"
+    log.log("d")
+    log.flush()
+    assert stream.getvalue() == "a\nb\nc\nd\n"
+    assert log.getCount() == 4
+
+
+def test_timestamps_and_counting_only():
+    stream = io.StringIO()
+    log = EventLog(stream, bufferEvents=1, timestamps=True)
+    log.log("first", 0.25)
+    log.log("second")
+    assert stream.getvalue() == "0.250000\tfirst\n\tsecond\n"
+
+    counter = EventLog()
+    threads = [threading.Thread(target=lambda: [counter.log("event") for _ in range(1000)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counter.flush()
+    assert counter.getCount() == 4000
+
+
+def batch(*arguments) -> None:
+    subprocess.run([sys.executable, "main.py", "--batch", *arguments], cwd=PROJECT, check=True,
+                   stdout=subprocess.DEVNULL, env=dict(os.environ, MPLBACKEND="Agg"))
+
+
+def withoutWallTime(row: dict) -> dict:
+    return {key: value for key, value in row.items() if key != "wallTime"}
+
+
+def test_batch_results_are_seeded(tmp_path):
+    results, table, log = tmp_path / "runs.json", tmp_path / "runs.csv", tmp_path / "runs.log"
+    batch("--runs", "2", "--ecus", "2", "--output", str(results), "--log", str(log))
+    batch("--runs", "2", "--ecus", "2", "--output", str(table))
+    batch("--runs", "1", "--ecus", "2", "--seed", "1", "--output", str(tmp_path / "second.json"))
+
+    rows = json.loads(results.read_text())
+    assert [(row["run"], row["seed"]) for row in rows] == [(0, 0), (1, 1)]
+    assert all(row["busOff"] is not None for row in rows)
+    with open(table, newline="") as file:
+        assert [withoutWallTime(row) for row in csv.DictReader(file)] == \
+               [{key: "" if value is None else str(value) for key, value in withoutWallTime(row).items()} for row in rows]
+
+    second = json.loads((tmp_path / "second.json").read_text())[0]
+    assert withoutWallTime(second) == dict(withoutWallTime(rows[1]), run=0)  # a run is reproduced from its seed
+
+    lines = log.read_text().splitlines()
+    assert len(lines) == sum(row["events"] + 1 for row in rows)  # the events of each run after its "Run" line
+    assert "\tRun 0, seed 0" in lines and "\tRun 1, seed 1" in lines
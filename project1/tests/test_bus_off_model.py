@@ -0,0 +1,27 @@
+"""
+Tests of the closed-form bus-off model against the simulator.
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from bus_off_model import busOffSweep, simulate, NONE
+
+CONFIGURATIONS = [(period, dlc, retransmission)
+                  for period in (1, 3, 7, 16)
+                  for dlc in (0, 3, 8)
+                  for retransmission in (True, False)]
+
+
+def test_model_matches_the_simulator():
+    period, dlc, retransmission = (np.array(column) for column in zip(*CONFIGURATIONS))
+    model = busOffSweep(period, dlc, 0.003, retransmission)
+
+    for k, configuration in enumerate(CONFIGURATIONS):
+        expected = simulate(*configuration[:2], 0.003, configuration[2])
+        found = (int(model["busOff"][k]), int(model["slot"][k]), int(model["ticks"][k]),
+                 int(model["victimTEC"][k]), int(model["adversaryTEC"][k]))
+        if expected[0] == NONE:
+            found = (found[0], -1, -1, None, None) if found[0] == NONE else found
+        assert found == expected, configuration
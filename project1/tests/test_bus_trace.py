@@ -0,0 +1,73 @@
+"""
+Tests of the binary bus trace: appended runs, tick range queries and the index cache.
+"""
+
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from bus_trace import TraceWriter, TraceReader
+from can_bus import CanBus
+from engine import VirtualClock
+from frame import Frame
+
+
+def recordRun(path: str, ticks: list, frame: 'Frame' = Frame(671, 3, [217, 16, 133])):
+    """Record frames ending at the given bus cycles, as a new run of the trace."""
+    canBus = CanBus(VirtualClock(0.003), idleGap=None)
+    writer = TraceWriter(canBus, path)
+    canBus.addListener(writer)
+    for tick in ticks:
+        bits = frame.getBits()
+        while canBus.getTick() < tick - len(bits):
+            canBus.process()  # idle bus cycles
+        for bit in bits[:-1]:
+            canBus.transmitBit(bit, "Victim")
+            canBus.process()
+        canBus.transmitBit(bits[-1], "Victim")
+        canBus.process()  # the frame ends at this bus cycle
+        canBus.process()  # WAIT -> IDLE, endFrame
+    writer.close()
+
+
+def frameTicks(reader: 'TraceReader', ID: int, start: int = None, end: int = None, run: int = None) -> list:
+    return [int(tick) for tick in reader.query(ID, start, end, run)["tick"]]
+
+
+def test_appended_runs_are_queried_by_tick(tmp_path):
+    path = str(tmp_path / "bus.trace")
+    bits = len(Frame(671, 3, [217, 16, 133]).getBits())
+    recordRun(path, [100 + bits, 200 + bits, 300 + bits])
+    recordRun(path, [50 + bits, 150 + bits])
+
+    reader = TraceReader(path)
+    first, second = frameTicks(reader, 671, run=0), frameTicks(reader, 671, run=1)
+    assert reader.getRunCount() == 2
+    assert len(first) == 3 and len(second) == 2
+    assert second[0] < first[0] < second[1] < first[1]  # the second run restarted from tick 0
+
+    assert frameTicks(reader, 671) == sorted(first + second)
+    assert frameTicks(reader, 671, 0, first[1]) == [second[0], first[0], second[1], first[1]]
+    assert frameTicks(reader, 671, second[0] + 1, second[1]) == [first[0], second[1]]
+    assert reader.getNodeName(0, run=0) == reader.getNodeName(0, run=1) == "Victim"
+    reader.close()
+
+
+def test_rewritten_trace_does_not_reuse_a_stale_index(tmp_path):
+    path = str(tmp_path / "bus.trace")
+    recordRun(path, [200, 400])
+    reader = TraceReader(path)
+    assert len(reader.query(671)) == 2
+    reader.close()
+    assert os.path.exists(path + ".idx.npz")
+
+    # Same number of records, other IDs
+    os.remove(path)
+    recordRun(path, [200, 400], Frame(100, 1, [1]))
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10 ** 9))
+    reader = TraceReader(path)
+    assert len(reader.query(671)) == 0
+    assert len(reader.query(100)) == 2
+    reader.close()
@@ -0,0 +1,44 @@
+"""
+Tests of the CanBus background frames in the threaded simulation.
+"""
+
+import threading
+
+from can_bus import CanBus
+
+
+class GatedClock:
+    """Clock whose waitTicks blocks until the test releases it."""
+
+    def __init__(self):
+        self.waiting = threading.Event()
+        self.release = threading.Event()
+
+    def getTick(self) -> int:
+        return 0
+
+    def waitTicks(self, ticks: int):
+        self.waiting.set()
+        self.release.wait()
+
+
+def test_bits_wait_for_the_end_of_the_background_frame():
+    clock = GatedClock()
+    canBus = CanBus(clock, idleGap=2, backgroundBits=30)
+    canBus.process()  # first idle cycle
+    bus = threading.Thread(target=canBus.process, daemon=True)  # second idle cycle: background frame
+    bus.start()
+    assert clock.waiting.wait(5)
+    assert canBus.getStatus() == CanBus.BUSY
+
+    ecu = threading.Thread(target=canBus.transmitBit, args=(0, "ECU"), daemon=True)
+    ecu.start()
+    ecu.join(0.05)
+    assert ecu.is_alive()  # blocked while the background frame is on the bus
+    assert canBus.getCount() == 0
+
+    clock.release.set()
+    bus.join(5)
+    ecu.join(5)
+    assert canBus.getCount() == 1 and canBus.getBackgroundFrames() == 1
+    assert canBus.getStatus() == CanBus.ACTIVE  # the bit is sent after the background frame
@@ -0,0 +1,52 @@
+"""
+Tests of ECU.checkBit against the original bit-list implementation (benchmark_ecu.LegacyTransmitter).
+"""
+
+import random
+
+from benchmark_ecu import LegacyTransmitter, stuffedBits
+from can_bus import CanBus
+from ecu import ECU
+from engine import VirtualClock
+
+
+def transmit(transmitter, startFrame, bits: tuple, flips: list) -> tuple:
+    """
+    Send a frame on a noisy bus.
+
+    Returns:
+        tuple: (status, number of bus cycles until the status).
+    """
+
+    startFrame(bits)
+    status = None
+    cycles = 0
+    while status is None:
+        status = transmitter.checkBit(transmitter.getNextBit() ^ flips[cycles])
+        cycles += 1
+    return status, cycles
+
+
+def test_same_outcomes_as_the_bit_list_check():
+    """Random frames of 0-64 bytes, each bus bit flipped with a probability of 0-20%."""
+    rng = random.Random(0)
+    random.seed(0)  # stuffedBits draws from the random module
+    clock = VirtualClock(0.003)
+    canBus = CanBus(clock)
+    legacy = LegacyTransmitter()
+    statuses = set()
+
+    for n in range(3000):
+        bits = stuffedBits(rng.choice((0, 1, 3, 8, 16, 64)))
+        noise = rng.choice((0.0, 0.002, 0.01, 0.05, 0.2))
+        flips = [int(rng.random() < noise) for _ in range(len(bits) + 6)]
+        ecu = ECU(f"ECU{n}", canBus, clock)  # a fresh ECU, so the error flag is always active
+
+        expected = transmit(legacy, legacy.startFrame, bits, flips)
+        found = transmit(ecu, lambda bits: ecu.startFrame(None, bits), bits, flips)
+        if expected[0] in (ECU.BIT_ERROR, ECU.STUFF_ERROR):
+            expected = (expected[0], expected[1] + len(ecu.getErrorFlag()))  # the ECU reports after its error flag
+        assert found == expected, (bits, flips)
+        statuses.add(found[0])
+
+    assert statuses == {ECU.COMPLITED, ECU.LOWER_FRAME_ID, ECU.BIT_ERROR, ECU.STUFF_ERROR}
@@ -0,0 +1,57 @@
+"""
+Tests of the coroutine scheduler of the simulation: slot waits, reception and creation order.
+"""
+
+from frame import Frame
+from simulation import Simulation, WAIT_SLOT, RECEIVE
+
+
+def test_wait_slot_resumes_on_the_frame_count():
+    simulation = Simulation(0.003, verbose=False)
+    simulation.addECU("ECU", 2, Frame(100, 1, [7]))
+    resumed = []
+
+    def waiter():
+        for count in (3, 5, 10):
+            resumed.append((count, (yield (WAIT_SLOT, count))))
+
+    simulation.spawn("Waiter", waiter())
+    simulation.run(3 * 2000)
+    assert [count for count, _ in resumed] == [3, 5, 10]
+    assert all(slot >= count for count, slot in resumed)
+    assert resumed[0][1] == 3  # resumed as soon as the count is reached
+
+
+def test_receive_gets_every_decoded_frame():
+    simulation = Simulation(0.003, verbose=False)
+    frames = [Frame(200, 2, [1, 2]), Frame(300, 0, [])]
+    simulation.addECU("First", 3, frames[0])
+    simulation.addECU("Second", 5, frames[1])
+    received = []
+
+    def receiver():
+        while len(received) < 6:
+            received.append((yield (RECEIVE,)))
+
+    simulation.spawn("Receiver", receiver())
+    simulation.run(3 * 3000)
+    assert len(received) == 6
+    assert {frame for frame, _ in received} == set(frames)
+    counts = [count for _, count in received]
+    assert counts == sorted(counts)
+
+
+def test_tasks_are_resumed_in_creation_order():
+    """Two coroutines waiting for the same slot are resumed in the order they were spawned."""
+    simulation = Simulation(0.003, verbose=False)
+    simulation.addECU("ECU", 1, Frame(100, 1, [7]))
+    order = []
+
+    def waiter(name):
+        yield (WAIT_SLOT, 4)
+        order.append(name)
+
+    for name in ("a", "b", "c"):
+        simulation.spawn(name, waiter(name))
+    simulation.run(3 * 1000)
+    assert order == ["a", "b", "c"]
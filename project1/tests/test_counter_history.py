@@ -0,0 +1,47 @@
+"""
+Tests of CounterHistory: growth, ring buffer wrap-around and the zero-copy views.
+"""
+
+import pytest
+
+from counter_history import CounterHistory
+
+
+def test_unbounded_history_grows():
+    history = CounterHistory(capacity=2)
+    assert history.getLast() is None
+    for i in range(10):
+        history.append(8 * i, 3 * i)
+
+    assert len(history) == 10 and history.getDropped() == 0
+    assert history.getValues().tolist() == [8 * i for i in range(10)]
+    assert history.getTicks().tolist() == [3 * i for i in range(10)]
+    assert history.getLast() == (72, 27)
+
+
+def test_ring_buffer_keeps_the_last_changes():
+    history = CounterHistory(maxlen=4)
+    for i in range(11):
+        history.append(i, 100 + i)
+        assert history.getLast() == (i, 100 + i)
+
+    assert len(history) == 4
+    assert history.getDropped() == 7
+    assert history.toList() == [[i, 100 + i] for i in range(7, 11)]
+
+    history.append(11, 111)  # appending after the views were taken keeps the order
+    assert history.getValues().tolist() == [8, 9, 10, 11]
+    assert history.getTicks().tolist() == [108, 109, 110, 111]
+
+
+def test_toNumpy_wraps_the_buffers():
+    np = pytest.importorskip("numpy")
+    history = CounterHistory(maxlen=3)
+    for i in range(5):
+        history.append(-i, 1 << 40 | i)  # negative values and ticks beyond 32 bits
+
+    values, ticks = history.toNumpy()
+    assert (values.dtype, ticks.dtype) == (np.int16, np.int64)
+    assert values.tolist() == [-2, -3, -4]
+    assert ticks.tolist() == [1 << 40 | 2, 1 << 40 | 3, 1 << 40 | 4]
+    assert not values.flags.owndata and not ticks.flags.owndata  # no copy
@@ -0,0 +1,76 @@
+"""
+Tests of the CRC-15 field and the ACK slot: table-driven CRC, error detection and batch verification.
+"""
+
+import random
+
+import pytest
+
+from benchmark_codec import legacyCrc
+from bit_codec import crc15, packBits
+from frame import Frame
+
+
+def randomFrames(count: int, seed: int = 0) -> list:
+    """Random frames of any DLC."""
+    rng = random.Random(seed)
+    frames = []
+    for _ in range(count):
+        dlc = rng.randint(0, 8)
+        frames.append(Frame(rng.randint(0, 0b11111111111), dlc, [rng.randint(0, 255) for _ in range(dlc)]))
+    return frames
+
+
+FRAMES = randomFrames(300)
+
+
+def test_crc15_matches_the_bitwise_crc():
+    rng = random.Random(1)
+    for length in range(12):
+        data = bytes(rng.randint(0, 255) for _ in range(length))
+        bits = [(byte >> (7 - i)) & 1 for byte in data for i in range(8)]
+        assert crc15(data) == int("".join(map(str, legacyCrc(bits))), 2)
+
+
+def test_frames_round_trip():
+    for frame in FRAMES:
+        assert Frame.fromBits(frame.getBits()) == frame
+
+
+def test_dominant_ack_slot_is_accepted():
+    for frame in FRAMES[:50]:
+        bits = frame.getBits()
+        bits[-Frame.ACK_OFFSET] = 0  # acknowledged by a receiver
+        assert Frame.fromBits(bits) == frame
+
+
+def test_single_bit_errors_are_detected():
+    """Any flipped bit before the tail is a CRC or stuffing error, a flipped tail bit a form error."""
+    for frame in FRAMES[:50]:
+        bits = frame.getBits()
+        for position in range(1, len(bits)):
+            if position == len(bits) - Frame.ACK_OFFSET:
+                continue
+            corrupted = list(bits)
+            corrupted[position] ^= 1
+            decoded, error = Frame.decodePackedBits(*packBits(corrupted))
+            assert decoded is None, (frame, position)
+            if position >= len(bits) - Frame.TAIL_LENGTH:
+                assert error == Frame.FORM_ERROR
+            else:
+                assert error in (Frame.CRC_ERROR, Frame.STUFF_ERROR, Frame.FORM_ERROR)
+
+
+def test_verifyMany_matches_fromBits():
+    pytest.importorskip("numpy")
+    rng = random.Random(2)
+    recorded = []
+    for frame in FRAMES:
+        bits = frame.getBits()
+        if rng.random() < 0.3:
+            bits[rng.randrange(1, len(bits) - Frame.TAIL_LENGTH)] ^= 1
+        recorded.append(bits)
+    recorded.append([])  # nothing recorded
+    valid = Frame.verifyMany(recorded)
+    assert valid.tolist() == [Frame.fromBits(bits) is not None for bits in recorded]
+    assert 0 < valid.sum() < len(recorded) - 1
@@ -0,0 +1,74 @@
+"""
+Tests of the discrete-event engine: event ordering, virtual clock and deterministic simulations.
+"""
+
+from engine import Engine, VirtualClock
+from frame import Frame
+from simulation import Simulation
+
+
+def test_events_run_by_tick_then_phase_then_scheduling_order():
+    engine = Engine(VirtualClock(0.003))
+    order = []
+
+    def event(name):
+        return lambda: order.append((name, engine.clock.getTick()))
+
+    engine.schedule(5, event("observe"), Engine.OBSERVE)
+    engine.schedule(5, event("process"), Engine.PROCESS)
+    engine.schedule(5, event("transmit 1"), Engine.TRANSMIT)
+    engine.schedule(2, event("early"), Engine.OBSERVE)
+    engine.schedule(5, event("transmit 2"), Engine.TRANSMIT)
+    assert engine.getPending() == 5
+
+    assert engine.run() == 5
+    assert order == [("early", 2), ("transmit 1", 5), ("transmit 2", 5), ("process", 5), ("observe", 5)]
+    assert engine.getEvents() == 5 and engine.getPending() == 0
+
+
+def test_past_events_run_without_moving_the_clock_back():
+    engine = Engine(VirtualClock(0.003))
+    ticks = []
+    engine.schedule(10, lambda: engine.schedule(3, lambda: ticks.append(engine.clock.getTick())))
+    engine.run()
+    assert ticks == [10]
+
+
+def test_run_stops_at_maxTick_and_on_stop():
+    engine = Engine(VirtualClock(0.001))
+    seen = []
+    for tick in range(0, 100, 10):
+        engine.schedule(tick, lambda tick=tick: seen.append(tick))
+    assert engine.run(maxTick=35) == 30
+    assert seen == [0, 10, 20, 30] and engine.getPending() == 6
+
+    engine.schedule(45, engine.stop)  # runs after the event of tick 40
+    engine.run()
+    assert seen[-1] == 40 and engine.getPending() == 5
+    assert engine.clock.time() == 0.045
+
+
+def test_virtual_clock_advances_only_forward():
+    clock = VirtualClock(0.5)
+    clock.wait()
+    clock.advance(4)
+    clock.advance(2)
+    assert clock.getTick() == 4 and clock.time() == 2.0
+
+
+def attack(capsys) -> tuple:
+    """Run the attack of main.py and return its result and printed transmissions."""
+    simulation = Simulation(0.003)
+    simulation.addECU("Victim", 7, Frame(671, 3, [217, 16, 133]))
+    simulation.addAttacker("Adversary")
+    busOffECU = simulation.run()
+    result = (busOffECU.name, simulation.getBusOffTime(), simulation.canBus.getTick(), simulation.canBus.getCount(),
+              [len(tecs) for tecs in simulation.getTECs()])
+    return result, capsys.readouterr().out
+
+
+def test_simulation_is_deterministic(capsys):
+    first, log = attack(capsys)
+    assert first[0] == "Victim"
+    assert "BUS_OFF" in log
+    assert attack(capsys) == (first, log)
@@ -0,0 +1,62 @@
+"""
+Tests of the LRU cache of the stuffed frame bits.
+"""
+
+import threading
+
+from frame import Frame
+from frame_cache import FrameCache, FRAME_CACHE
+
+
+def test_hits_and_misses():
+    cache = FrameCache(maxsize=4)
+    frame = Frame(671, 3, [217, 16, 133])
+    bits = cache.getBits(frame)
+    assert list(bits) == frame.getBits()
+    assert cache.getBits(Frame(671, 3, [217, 16, 133])) is bits  # equal frames share the entry
+    stats = cache.getStats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["size"]) == (1, 1, 0, 1)
+    assert stats["hitRatio"] == 0.5
+
+
+def test_least_recently_used_is_evicted():
+    cache = FrameCache(maxsize=2)
+    first, second, third = (Frame(ID, 1, [ID]) for ID in (1, 2, 3))
+    cache.getBits(first)
+    cache.getBits(second)
+    cache.getBits(first)  # second is now the least recently used
+    cache.getBits(third)
+    assert cache.getStats()["evictions"] == 1 and cache.getStats()["size"] == 2
+
+    cache.getBits(first)  # still cached
+    assert cache.getStats()["hits"] == 2
+    cache.getBits(second)  # evicted, encoded again
+    assert cache.getStats()["misses"] == 4
+
+
+def test_clear_resets_the_counters():
+    cache = FrameCache(maxsize=2)
+    for ID in range(5):
+        cache.getBits(Frame(ID, 0, []))
+    cache.clear()
+    assert cache.getStats() == {"hits": 0, "misses": 0, "evictions": 0, "size": 0, "hitRatio": 0.0}
+
+
+def test_concurrent_lookups():
+    cache = FrameCache(maxsize=8)
+    frames = [Frame(ID, 2, [ID, 255 - ID]) for ID in range(16)]
+
+    def lookups():
+        for _ in range(50):
+            for frame in frames:
+                assert list(cache.getBits(frame)) == frame.getBits()
+
+    threads = [threading.Thread(target=lookups) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = cache.getStats()
+    assert stats["hits"] + stats["misses"] == 4 * 50 * 16
+    assert stats["size"] == 8
+    assert isinstance(FRAME_CACHE, FrameCache)
@@ -0,0 +1,50 @@
+"""
+Tests of the packed frame codec against the bit-list implementation of benchmark_codec.
+"""
+
+import random
+
+from benchmark_codec import legacyGetBits, legacyFromBits
+from bit_codec import packBits, unpackBits
+from frame import Frame
+
+
+def randomFrames(count: int, seed: int = 0) -> list:
+    """(ID, DLC, data) of random frames of any DLC."""
+    rng = random.Random(seed)
+    frames = []
+    for _ in range(count):
+        dlc = rng.randint(0, 8)
+        frames.append((rng.randint(0, 0b11111111111), dlc, [rng.randint(0, 255) for _ in range(dlc)]))
+    return frames
+
+
+FRAMES = randomFrames(500) + [(0, 0, []), (0b11111111111, 8, [255] * 8), (0, 8, [0] * 8)]
+
+
+def test_getBits_matches_the_bit_list_encoder():
+    for frame in FRAMES:
+        assert Frame(*frame).getBits() == legacyGetBits(*frame)
+
+
+def test_fromBits_matches_the_bit_list_decoder():
+    for frame in FRAMES:
+        bits = legacyGetBits(*frame)
+        expected = legacyFromBits(bits)
+        expected = Frame(*expected) if expected is not None else None
+        assert Frame.fromBits(bits) == expected
+        assert Frame.fromPackedBits(*packBits(bits)) == expected
+
+
+def test_packBits_keeps_the_leading_zeros():
+    for bits in ([], [0], [0, 0, 1], [1, 0, 0], [0] * 70 + [1] + [0] * 3):
+        value, length = packBits(bits)
+        assert length == len(bits)
+        assert unpackBits(value, length) == bits
+
+
+def test_truncated_frames_are_rejected():
+    for frame in FRAMES[:50]:
+        bits = Frame(*frame).getBits()
+        assert Frame.fromBits(bits[:-8]) is None
+    assert Frame.fromBits([]) is None
@@ -0,0 +1,70 @@
+"""
+Tests of the frame count waits of CanBus: the waiters are woken by process() on their frame count.
+"""
+
+import threading
+import time
+
+from can_bus import CanBus
+from engine import VirtualClock
+
+
+def test_waiters_wake_on_their_frame_count():
+    canBus = CanBus(VirtualClock(0.003))  # every other idle bus cycle counts a background frame
+    woken = []  # (name, value returned, frame count when the thread ran)
+    lock = threading.Lock()
+
+    def waiter(name, wait):
+        returned = wait()
+        with lock:
+            woken.append((name, returned, canBus.getCount()))
+
+    waits = {
+        "count 7": lambda: canBus.waitFrameCount(7),
+        "count 3": lambda: canBus.waitFrameCount(3),
+        "multiple of 4": lambda: canBus.waitFrameCountMultiple(4),
+        "multiple of 5": lambda: canBus.waitFrameCountMultiple(5),
+        "count 3 again": lambda: canBus.waitFrameCount(3),
+    }
+    threads = [threading.Thread(target=waiter, args=item, daemon=True) for item in waits.items()]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)  # every thread is registered
+    assert sorted(woken) == [("multiple of 4", 0, 0), ("multiple of 5", 0, 0)]  # 0 is a multiple of every period
+    woken.clear()
+
+    # Drive the bus one cycle at a time, letting the woken threads run when the count changes
+    while canBus.getCount() < 8:
+        count = canBus.getCount()
+        canBus.process()
+        if canBus.getCount() != count:
+            time.sleep(0.02)
+    for thread in threads:
+        thread.join(1)
+
+    assert sorted(woken) == [("count 3", None, 3), ("count 3 again", None, 3), ("count 7", None, 7)]
+
+
+def test_multiple_waits_for_the_next_multiple():
+    canBus = CanBus(VirtualClock(0.003))
+    while canBus.getCount() < 5:
+        canBus.process()
+    result = []
+    thread = threading.Thread(target=lambda: result.append(canBus.waitFrameCountMultiple(4)), daemon=True)
+    thread.start()
+    while canBus.getCount() < 7:
+        canBus.process()
+    time.sleep(0.02)
+    assert result == []  # 8 not reached
+    while canBus.getCount() < 8:
+        canBus.process()
+    thread.join(1)
+    assert result == [8]
+
+
+def test_reached_count_returns_at_once():
+    canBus = CanBus(VirtualClock(0.003))
+    while canBus.getCount() < 6:
+        canBus.process()
+    canBus.waitFrameCount(4)  # would block forever if the count were not checked first
+    assert canBus.waitFrameCountMultiple(3) == 6
@@ -0,0 +1,92 @@
+"""
+Tests of the streaming frame decoder fed bit by bit.
+"""
+
+import random
+
+from frame import Frame
+from frame_decoder import FrameDecoder
+
+
+class Events:
+    """Callbacks of a FrameDecoder, recorded in order."""
+
+    def __init__(self):
+        self.events = []
+
+    def decoder(self, intern: bool = False) -> 'FrameDecoder':
+        return FrameDecoder(onID=lambda ID: self.events.append(("ID", ID)),
+                            onDLC=lambda DLC: self.events.append(("DLC", DLC)),
+                            onFrame=lambda frame: self.events.append(("frame", frame)),
+                            onError=lambda error: self.events.append(("error", error)),
+                            intern=intern)
+
+
+def feed(decoder: 'FrameDecoder', bits: list):
+    for bit in bits:
+        decoder.feedBit(bit)
+
+
+def test_valid_frames_are_reported_field_by_field():
+    rng = random.Random(0)
+    for _ in range(200):
+        dlc = rng.randint(0, 8)
+        frame = Frame(rng.randint(0, 0b11111111111), dlc, [rng.randint(0, 255) for _ in range(dlc)])
+        events = Events()
+        decoder = events.decoder()
+        feed(decoder, frame.getBits())
+        assert events.events == [("ID", frame.getID()), ("DLC", dlc), ("frame", frame)]
+        assert decoder.getStatus() == FrameDecoder.DONE and decoder.getFrame() == frame
+        decoder.endFrame()
+        assert decoder.getStatus() == FrameDecoder.IDLE and events.events[-1][0] == "frame"
+
+
+def test_decoder_is_reused_across_frames():
+    events = Events()
+    decoder = events.decoder(intern=True)
+    frames = [Frame(671, 3, [217, 16, 133]), Frame(100, 0, []), Frame(671, 3, [217, 16, 133])]
+    for frame in frames:
+        feed(decoder, frame.getBits())
+        decoder.endFrame()
+    decoded = [event[1] for event in events.events if event[0] == "frame"]
+    assert decoded == frames
+    assert decoded[0] is decoded[2]  # interned
+
+
+def test_corrupted_crc_reports_an_error():
+    frame = Frame(671, 3, [217, 16, 133])
+    bits = frame.getBits()
+    bits[len(bits) - Frame.TAIL_LENGTH - 3] ^= 1  # in the CRC
+    events = Events()
+    decoder = events.decoder()
+    feed(decoder, bits)
+    errors = [event[1] for event in events.events if event[0] == "error"]
+    assert errors in ([Frame.CRC_ERROR], [Frame.STUFF_ERROR])
+    assert not any(event[0] == "frame" for event in events.events)
+    assert decoder.getStatus() == FrameDecoder.ERROR and decoder.getError() == errors[0]
+
+
+def test_stuffing_violation_is_detected_on_its_bit():
+    events = Events()
+    decoder = events.decoder()
+    feed(decoder, [0] * 6)  # SOF and 5 dominant bits must be followed by a stuff bit
+    assert events.events == [("error", Frame.STUFF_ERROR)]
+
+
+def test_dominant_tail_bit_is_a_form_error():
+    frame = Frame(1, 1, [0x55])
+    bits = frame.getBits()
+    bits[-1] = 0  # last bit of the EOF
+    events = Events()
+    decoder = events.decoder()
+    feed(decoder, bits)
+    assert events.events[-1] == ("error", Frame.FORM_ERROR)
+
+
+def test_frame_ending_early_is_a_form_error():
+    events = Events()
+    decoder = events.decoder()
+    feed(decoder, Frame(671, 3, [217, 16, 133]).getBits()[:20])
+    decoder.endFrame()
+    assert events.events[-1] == ("error", Frame.FORM_ERROR)
+    assert decoder.getStatus() == FrameDecoder.IDLE
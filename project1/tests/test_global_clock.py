@@ -0,0 +1,57 @@
+"""
+Tests of the GlobalClock timing statistics.
+"""
+
+import threading
+import time
+
+from global_clock import GlobalClock
+
+
+def test_drift_does_not_count_the_skipped_deadlines():
+    stop = threading.Event()
+    clock = GlobalClock(0.002, stop)
+    thread = threading.Thread(target=clock.start)
+    thread.start()
+    try:
+        clock.waitTicks(5)
+        # Block the clock thread for many periods: its next signal is late and skips the missed deadlines
+        lock = clock._GlobalClock__lock
+        with lock:
+            time.sleep(0.05)
+        clock.waitTicks(5)
+    finally:
+        stop.set()
+        thread.join()
+
+    stats = clock.getStats()
+    assert stats["overruns"] >= 10
+    assert 0 <= stats["drift"] < clock.period  # the delay of the last signal, not overruns * period
+
+
+def test_statistics_change_under_the_lock_only():
+    """getStats reads under the lock, so the clock thread must not update the statistics while it is held."""
+    stop = threading.Event()
+    clock = GlobalClock(0.002, stop)
+    thread = threading.Thread(target=clock.start)
+    thread.start()
+    try:
+        clock.waitTicks(3)
+
+        def counters() -> tuple:
+            return (clock._GlobalClock__tick, clock._GlobalClock__lateness,
+                    clock._GlobalClock__maxLateness, clock._GlobalClock__overruns)
+
+        lock = clock._GlobalClock__lock
+        with lock:
+            before = counters()
+            time.sleep(0.02)  # the clock thread reaches several deadlines meanwhile
+            assert counters() == before
+        clock.waitTicks(2)
+    finally:
+        stop.set()
+        thread.join()
+
+    stats = clock.getStats()
+    assert stats["overruns"] >= 5
+    assert stats["ticks"] >= 5 and stats["maxLateness"] < clock.period
@@ -0,0 +1,72 @@
+"""
+Tests of the intrusion detection: no alert on normal traffic, early alerts on the bus-off attack,
+latency and cost reported by getStats.
+"""
+
+import random
+
+import pytest
+
+from can_bus import CanBus
+from engine import VirtualClock
+from frame import Frame
+from frame_decoder import FrameDecoder
+from ids import IDS, ERROR_STREAK, ERROR_RATE
+from simulation import Simulation
+
+
+def test_no_false_positive_on_many_ecus():
+    """50 periodic ECUs with distinct IDs and no attacker: the arbitration losses raise no alert."""
+    rng = random.Random(0)
+    simulation = Simulation(0.003, verbose=False)
+    ids = IDS(simulation.canBus)
+    for i, ID in enumerate(rng.sample(range(0b11111111111 + 1), 50)):
+        dlc = rng.randint(1, 4)
+        simulation.addECU(f"ECU{i+1}", rng.randint(20, 60), Frame(ID, dlc, [rng.randint(0, 255) for _ in range(dlc)]))
+    simulation.run(300000)
+
+    assert ids.getStats()["frames"] > 1000
+    assert ids.getAlerts() == [] and ids.getStats()["alerts"] == 0
+
+
+@pytest.mark.parametrize("period", [5, 7, 10, 20])
+def test_attack_is_detected_before_bus_off(period):
+    simulation = Simulation(0.003, verbose=False)
+    ids = IDS(simulation.canBus)
+    simulation.addECU("Victim", period, Frame(671, 3, [217, 16, 133]))
+    simulation.addAttacker("Adversary")
+    busOffECU = simulation.run()
+
+    first = ids.getFirstAlert()
+    start = simulation.getAttackStart()
+    assert busOffECU.name == "Victim"
+    assert first is not None and first.rule in (ERROR_STREAK, ERROR_RATE)
+    assert first.ID == 671
+    assert first.slot - start <= period + 2  # the second collision of the attack at most
+    assert first.slot < simulation.canBus.getCount()
+
+
+def test_latency_and_cpu_cost():
+    """Alert latencies count from the first error decoded on the ID, the time spent in the IDS is reported per bit."""
+    simulation = Simulation(0.003, verbose=False)
+    ids = IDS(simulation.canBus)
+    errors = []
+    decoder = FrameDecoder(onError=lambda error: errors.append((decoder.getID(), simulation.canBus.getTick())))
+    simulation.canBus.addListener(decoder)
+    simulation.addECU("Victim", 7, Frame(671, 3, [217, 16, 133]))
+    simulation.addAttacker("Adversary")
+    simulation.run()
+
+    firstError = next(tick for ID, tick in errors if ID == 671)
+    alerts = ids.getAlerts()
+    assert alerts and all(alert.latency == alert.tick - firstError for alert in alerts)
+
+    stats = ids.getStats()
+    assert stats["latency"] == ids.getFirstAlert().latency > 0
+    assert 0 < stats["cpuPerBit"] < 1e-3
+    assert stats["cpuTime"] == pytest.approx(stats["cpuPerBit"] * stats["bits"])
+
+    untimed = IDS(CanBus(VirtualClock(0.003)), timing=False)
+    untimed.feedBit(0)
+    assert untimed.getStats()["cpuTime"] is None and untimed.getStats()["cpuPerBit"] is None
+    assert untimed.getStats()["latency"] is None
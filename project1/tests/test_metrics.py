@@ -0,0 +1,67 @@
+"""
+Tests of the metrics: LatencyHistogram percentiles and the JSON export of BusMetrics.
+"""
+
+import json
+
+from frame import Frame
+from metrics import LatencyHistogram
+from simulation import Simulation
+
+STATUSES = ("COMPLITED", "LOWER_FRAME_ID", "BIT_ERROR", "STUFF_ERROR")
+
+
+def test_small_values_are_exact():
+    histogram = LatencyHistogram()
+    assert histogram.getPercentile(50) is None and histogram.getMean() is None
+    for value in range(100):
+        histogram.record(value)
+
+    assert histogram.getCount() == 100
+    assert histogram.getMean() == 49.5
+    assert [histogram.getPercentile(p) for p in (0, 50, 90, 99, 100)] == [0, 49, 89, 98, 99]
+    summary = histogram.toDict()
+    assert (summary["min"], summary["max"], summary["p50"]) == (0, 99, 49)
+    assert sum(summary["buckets"].values()) == 100
+
+
+def test_large_values_have_a_bounded_relative_error():
+    histogram = LatencyHistogram(subBucketBits=7)
+    values = [1000 + 37 * i for i in range(1000)] + [123456]
+    for value in values:
+        histogram.record(value)
+
+    values.sort()
+    for percentile in (10, 50, 90, 99):
+        exact = values[-(-len(values) * percentile // 100) - 1]
+        found = histogram.getPercentile(percentile)
+        assert exact * (1 - 2 ** -6) <= found <= exact
+    assert histogram.getPercentile(100) == 123456
+    assert histogram.getMean() == sum(values) / len(values)  # the mean is exact
+    assert len(histogram.toDict()["buckets"]) < len(values)
+
+
+def test_attack_metrics_are_exported_as_json(tmp_path):
+    simulation = Simulation(0.003, verbose=False, metrics=True)
+    simulation.addECU("Victim", 10, Frame(671, 3, [217, 16, 133]))
+    simulation.addAttacker("Adversary")
+    assert simulation.run().name == "Victim"
+
+    path = tmp_path / "metrics.json"
+    document = simulation.metrics.toJSON(str(path))
+    metrics = json.loads(path.read_text())
+    assert json.loads(document) == metrics == simulation.metrics.toDict()
+
+    bus = metrics["bus"]
+    assert 0 < bus["busyCycles"] <= bus["cycles"]
+    assert 0 < bus["utilization"] <= 1
+    assert bus["frames"] > 0
+
+    victim = metrics["ecus"]["Victim"]
+    assert victim["BIT_ERROR"] > 0
+    assert victim["latency"]["count"] > 0
+    for counters in list(metrics["ecus"].values()) + list(metrics["ids"].values()):
+        assert counters["attempts"] == sum(counters[status] for status in STATUSES)
+        assert counters["activeErrorFlags"] + counters["passiveErrorFlags"] == counters["BIT_ERROR"] + counters["STUFF_ERROR"]
+    assert bus["errorFlags"] == sum(c["activeErrorFlags"] + c["passiveErrorFlags"] for c in metrics["ecus"].values())
+    assert metrics["ids"]["671"]["attempts"] == sum(c["attempts"] for c in metrics["ecus"].values())
@@ -0,0 +1,84 @@
+"""
+Tests of the per-ID period detector: statistics of the gaps, ranking, and accuracy on a busy bus.
+"""
+
+import random
+
+from frame import Frame
+from period_detector import PeriodDetector
+from simulation import Simulation
+
+
+def test_periodic_id():
+    reported = []
+    detector = PeriodDetector(minGaps=2, onPeriod=reported.append)
+    detector.observe(100, 3)
+    detector.observe(100, 10)
+    assert detector.getPeriod(100) is None  # a single gap
+    detector.observe(100, 17)
+    detector.observe(100, 24)
+
+    period = detector.getPeriod(100)
+    assert (period.period, period.confidence, period.gaps, period.mean, period.jitter) == (7, 1.0, 3, 7.0, 0.0)
+    assert (period.lastSlot, period.nextSlot) == (24, 31)
+    assert [estimate.ID for estimate in reported] == [100]  # reported once, at the second gap
+    assert detector.getStats() == {"frames": 4, "ids": 1}
+
+
+def test_delayed_frames_lower_the_confidence():
+    detector = PeriodDetector()
+    for slot in (0, 10, 21, 30, 40, 50):  # one frame delayed by an arbitration loss
+        detector.observe(200, slot)
+    period = detector.getPeriod(200)
+    assert period.period == 10
+    assert period.confidence == 3 / 5
+    assert period.jitter > 0
+
+
+def test_periods_are_ranked_by_confidence():
+    detector = PeriodDetector()
+    for slot in range(0, 60, 6):
+        detector.observe(1, slot)  # exact period
+    for slot in (0, 5, 9, 15, 20):
+        detector.observe(2, slot)  # irregular
+    detector.observe(3, 0)  # no gap yet
+
+    assert [period.ID for period in detector.getPeriods()] == [1, 2]
+    assert [period.ID for period in detector.getPeriods(minConfidence=0.9)] == [1]
+
+
+def test_ranking_is_kept_up_to_date():
+    """After every frame, the kept ranking is the sort of every estimate, and getBestPeriod its first entry."""
+    rng = random.Random(1)
+    detector = PeriodDetector(minGaps=2)
+    periods = {ID: rng.randint(3, 12) for ID in rng.sample(range(0b11111111111 + 1), 30)}
+    for slot in range(1500):
+        ID = rng.choice(list(periods)) if rng.random() < 0.3 else min(periods, key=lambda ID: slot % periods[ID])
+        detector.observe(ID, slot)
+        if slot % 7 == 0 or slot > 1450:
+            for minConfidence in (0.0, 0.5, 0.9):
+                expected = sorted((period for period in map(detector.getPeriod, periods)
+                                   if period is not None and period.confidence >= minConfidence),
+                                  key=lambda period: (-period.confidence, -period.gaps, period.ID))
+                assert detector.getPeriods(minConfidence) == expected
+                assert detector.getBestPeriod(minConfidence) == (expected[0] if expected else None)
+    assert len(detector.getPeriods()) == len(periods)
+    assert detector.getBestPeriod(minConfidence=1.1) is None
+
+
+def test_accuracy_on_a_busy_bus():
+    """The confident estimates of 50 ECUs under priority scheduling are the true periods."""
+    rng = random.Random(0)
+    simulation = Simulation(0.003, verbose=False, priorityScheduling=True)
+    detector = PeriodDetector(simulation.canBus, minGaps=3)
+    periods = {}
+    for i, ID in enumerate(rng.sample(range(0b11111111111 + 1), 50)):
+        periods[ID] = rng.randint(50, 150)
+        dlc = rng.randint(1, 4)
+        simulation.addECU(f"ECU{i+1}", periods[ID], Frame(ID, dlc, [rng.randint(0, 255) for _ in range(dlc)]))
+    simulation.run(150 * 1500)
+
+    estimates = detector.getPeriods()
+    confident = detector.getPeriods(minConfidence=0.9)
+    assert len(estimates) == len(periods)
+    assert confident and all(estimate.period == periods[estimate.ID] for estimate in confident)
@@ -0,0 +1,44 @@
+"""
+Tests of the priority scheduling: the bus pulls the pending frame with the lowest ID first.
+"""
+
+import random
+
+from frame import Frame
+from frame_decoder import FrameDecoder
+from simulation import Simulation
+
+
+def traffic(frames: list, periods: list, ticks: int, **options) -> tuple:
+    """Decoded bus traffic, TECs and number of TEC changes of one ECU per frame."""
+    simulation = Simulation(0.003, verbose=False, **options)
+    decoded = []
+    simulation.canBus.addListener(FrameDecoder(onFrame=decoded.append))
+    for i, (frame, period) in enumerate(zip(frames, periods)):
+        simulation.addECU(f"ECU{i+1}", period, frame)
+    simulation.run(ticks)
+    return decoded, [(ecu.getTEC(), len(tecs)) for ecu, tecs in zip(simulation.getECUs(), simulation.getTECs())]
+
+
+def test_lowest_id_is_sent_first():
+    frames = [Frame(0x300, 1, [3]), Frame(0x010, 1, [1]), Frame(0x200, 1, [2]), Frame(0x100, 0, [])]
+    decoded, _ = traffic(frames, [8] * 4, 3000, priorityScheduling=True)
+
+    IDs = [frame.getID() for frame in decoded]
+    assert len(IDs) >= 12
+    for start in range(0, len(IDs) - 3, 4):  # every period, the four frames by increasing ID
+        assert IDs[start:start + 4] == [0x010, 0x100, 0x200, 0x300]
+
+
+def test_same_traffic_as_frame_level_arbitration():
+    """Pending frames that would lose the arbitration leave the bus traffic and the TECs unchanged."""
+    rng = random.Random(0)
+    frames, periods = [], []
+    for ID in rng.sample(range(0b11111111111 + 1), 20):
+        dlc = rng.randint(0, 4)
+        frames.append(Frame(ID, dlc, [rng.randint(0, 255) for _ in range(dlc)]))
+        periods.append(rng.randint(7, 21))
+
+    expected = traffic(frames, periods, 30000, frameLevel=True)
+    assert len(expected[0]) > 100
+    assert traffic(frames, periods, 30000, priorityScheduling=True) == expected
@@ -0,0 +1,89 @@
+"""
+Tests of the receiver side: REC updates, its bound, and the batch verification of the bus frames.
+"""
+
+import pytest
+
+from can_bus import CanBus
+from ecu import ECU
+from engine import VirtualClock
+from frame import Frame
+from receivers import Receivers
+from simulation import Simulation
+
+
+def sendBits(canBus: 'CanBus', bits: list, sender: str = "Sender"):
+    """Put a frame on the bus bit by bit, then end it."""
+    for bit in bits:
+        canBus.transmitBit(bit, sender)
+        canBus.process()
+    canBus.process()  # WAIT -> IDLE, endFrame
+
+
+def test_receivers_update_the_rec_of_the_other_ecus():
+    clock = VirtualClock(0.003)
+    canBus = CanBus(clock, idleGap=None)
+    receivers = Receivers(canBus)
+    sender, receiver = ECU("Sender", canBus, clock), ECU("Receiver", canBus, clock)
+    receivers.addECU(sender)
+    receivers.addECU(receiver)
+
+    bits = Frame(671, 3, [217, 16, 133]).getBits()
+    corrupted = list(bits)
+    corrupted[20] ^= 1  # CRC or stuff error
+    sendBits(canBus, corrupted)
+    assert receiver.getREC() == 1 and sender.getREC() == 0  # the sender does not receive its own frame
+
+    sendBits(canBus, bits)
+    assert receiver.getREC() == 0
+    assert receiver.getReceivedFrame() == Frame(671, 3, [217, 16, 133])
+    assert receivers.getStats() == {"frames": 2, "errors": 1}
+
+
+def test_rec_is_bounded():
+    clock = VirtualClock(0.003)
+    canBus = CanBus(clock, idleGap=None)
+    ecu = ECU("Receiver", canBus, clock)
+    errorFrame = [0] * 12  # error flag and more dominant bits: stuff error
+
+    for _ in range(40000):  # beyond the int16 range of the history
+        assert ecu.receiveFrame(errorFrame) == Frame.STUFF_ERROR
+    assert ecu.getREC() == 128
+    assert ecu.getStatus() == ECU.ERROR_PASSIVE
+    assert list(ecu.getRECs().getValues())[-1] == 128
+
+    assert ecu.receiveFrame(Frame(1, 1, [2]).getBits()) == ECU.COMPLITED
+    assert ecu.getREC() == 127 and ecu.getStatus() == ECU.ERROR_ACTIVE
+
+
+def test_verify_many_matches_the_receivers():
+    pytest.importorskip("numpy")
+    simulation = Simulation(0.003, verbose=False)
+    recorder = Receivers(simulation.canBus, keepFrames=True)
+    simulation.addECU("Victim", 7, Frame(671, 3, [217, 16, 133]))
+    simulation.addAttacker("Adversary")
+    simulation.run()
+
+    frames = recorder.getFrames()
+    valid = recorder.verify()
+    assert len(valid) == len(frames) == recorder.getStats()["frames"]
+    assert [bool(flag) for flag in valid] == [Frame.fromBits(bits) is not None for bits in frames]
+    assert len(frames) - int(valid.sum()) == recorder.getStats()["errors"] == 16  # the error active collisions
+
+
+def test_reception_is_opt_in():
+    def attack(**options) -> 'Simulation':
+        simulation = Simulation(0.003, verbose=False, **options)
+        simulation.addECU("Victim", 7, Frame(671, 3, [217, 16, 133]))
+        simulation.addAttacker("Adversary")
+        simulation.addECU("ECU1", 20, Frame(0x100, 1, [1]))
+        assert simulation.run().name == "Victim"
+        return simulation
+
+    off = attack()
+    assert off.receivers is None
+    assert all(list(ecu.getRECs().getValues()) == [0] for ecu in off.getECUs())  # the initial value only
+
+    on = attack(reception=True)
+    assert on.receivers.getStats()["frames"] > 0
+    assert any(len(ecu.getRECs()) > 1 for ecu in on.getECUs())
@@ -0,0 +1,30 @@
+"""
+Tests of the attack scenario shared by the batch mode of main.py and the sweeps.
+"""
+
+from simulation import Simulation
+from sweep import DEFAULTS, runScenario
+
+
+def attack(seed: int, ecuNumber: int = 3) -> tuple:
+    """Run the attack scenario, return the names of the ECUs and the bus-off slot."""
+    simulation = Simulation(0.003, verbose=False)
+    simulation.addAttackScenario(7, ecuNumber, seed)
+    busOffECU = simulation.run()
+    assert busOffECU is not None and busOffECU.name == "Victim"
+    return sorted(simulation.getNames()), simulation.canBus.getCount()
+
+
+def test_scenario_is_reproducible():
+    """The same seed gives the same run, another seed other additional ECUs."""
+    names, slot = attack(1)
+    assert names == sorted(["Victim", "Adversary", "ECU1", "ECU2", "ECU3"])
+    assert attack(1) == (names, slot)
+    assert attack(0)[1] != slot
+
+
+def test_sweep_runs_the_same_scenario():
+    """sweep.runScenario (priority scheduling) reaches bus-off on the same slot as the bit-level run."""
+    result = runScenario(dict(DEFAULTS, ecuNumber=3, seed=1))
+    assert result["victimBusOff"]
+    assert result["busOffSlot"] == attack(1)[1]
@@ -0,0 +1,63 @@
+"""
+Tests of the sweep runner: .npz round-trip of the columnar results.
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from sweep import COLUMNS, HISTORIES, ResultsWriter, parameterGrid, runScenario, runSweep
+
+
+def fakeResult(scenario: int) -> dict:
+    """A result with every column, and histories of scenario + 1 changes."""
+    result = {name: np.asarray(scenario).astype(dtype).item() for name, dtype in COLUMNS.items()}
+    for k, name in enumerate(HISTORIES):
+        values = np.arange(scenario + 1, dtype=np.int16) * 8 + k
+        result[name] = (values, values.astype(np.int64) * 3)
+    return result
+
+
+def history(results, name: str, row: int) -> tuple:
+    offsets = results[name + "_offsets"]
+    span = slice(offsets[row], offsets[row + 1])
+    return results[name + "_values"][span].tolist(), results[name + "_ticks"][span].tolist()
+
+
+def test_results_round_trip(tmp_path):
+    path = str(tmp_path / "results.npz")
+    writer = ResultsWriter(path, flushEvery=2)
+    for scenario in (3, 0):
+        writer.add(fakeResult(scenario))
+    with np.load(path) as partial:  # flushed after 2 results, in completion order
+        assert partial["scenario"].tolist() == [3, 0]
+
+    for scenario in (4, 1, 2):
+        writer.add(fakeResult(scenario))
+    writer.close()
+
+    with np.load(path) as results:
+        assert set(results.files) == set(COLUMNS) | {name + suffix for name in HISTORIES
+                                                     for suffix in ("_offsets", "_values", "_ticks")}
+        assert results["scenario"].tolist() == [0, 1, 2, 3, 4]
+        for name, dtype in COLUMNS.items():
+            assert results[name].dtype == dtype
+        for row in range(5):
+            for name in HISTORIES:
+                values, ticks = fakeResult(row)[name]
+                assert history(results, name, row) == (values.tolist(), ticks.tolist())
+    assert list(tmp_path.iterdir()) == [tmp_path / "results.npz"]  # no temporary file left
+
+
+def test_sweep_matches_the_scenarios(tmp_path):
+    scenarios = parameterGrid(period=[5, 10], ecuNumber=[0, 3])
+    path = runSweep(scenarios, str(tmp_path / "sweep.npz"), workers=2, verbose=False)
+
+    with np.load(path) as results:
+        for row, scenario in enumerate(scenarios):
+            expected = runScenario(scenario)
+            for name in COLUMNS:
+                if name not in ("scenario", "wallTime"):
+                    assert results[name][row] == expected[name] or np.isnan(expected[name]), name
+            assert history(results, "victimTECs", row) == tuple(array.tolist() for array in expected["victimTECs"])
+        assert results["victimBusOff"][results["ecuNumber"] == 0].all()
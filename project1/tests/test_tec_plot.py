@@ -0,0 +1,92 @@
+"""
+Tests of the TEC plots: LTTB against a reference loop, the state changes, and the rendering to a file.
+"""
+
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ecu import ECU
+from frame import Frame
+from simulation import Simulation
+from tec_plot import lttb, transitions, plotTECs
+
+
+def referenceLttb(x: list, y: list, threshold: int) -> list:
+    """Largest Triangle Three Buckets, point by point as published (Steinarsson, 2013)."""
+    length = len(x)
+    if threshold >= length or threshold < 3:
+        return list(range(length))
+    every = (length - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        nextStart = end
+        nextEnd = min(int((i + 2) * every) + 1, length)
+        if i == threshold - 3:
+            nextStart, nextEnd = length - 1, length  # the last point follows the last bucket
+        averageX = sum(x[nextStart:nextEnd]) / (nextEnd - nextStart)
+        averageY = sum(y[nextStart:nextEnd]) / (nextEnd - nextStart)
+        best, bestArea = None, -1.0
+        for k in range(start, end):
+            area = abs((x[a] - averageX) * (y[k] - y[a]) - (x[a] - x[k]) * (averageY - y[a]))
+            if area > bestArea:
+                best, bestArea = k, area
+        selected.append(best)
+        a = best
+    selected.append(length - 1)
+    return selected
+
+
+def randomWalk(length: int, seed: int = 0) -> tuple:
+    """TEC-like random walk (+8 on an error, -1 on a success) and its ticks."""
+    rng = np.random.default_rng(seed)
+    steps = rng.choice(np.array([8, -1], dtype=np.int16), length, p=[0.2, 0.8])
+    tec = np.clip(np.cumsum(steps), 0, 300).astype(np.int16)
+    return tec, np.arange(length, dtype=np.int64) * 3
+
+
+@pytest.mark.parametrize("length, threshold", [(10, 3), (100, 7), (1000, 100), (5003, 250)])
+def test_lttb_matches_the_reference(length, threshold):
+    tec, ticks = randomWalk(length, seed=length)
+    selected = lttb(ticks, tec, threshold)
+    assert selected.tolist() == referenceLttb(ticks.tolist(), tec.astype(float).tolist(), threshold)
+    assert len(selected) == threshold and np.all(np.diff(selected) > 0)
+
+
+def test_lttb_keeps_short_series():
+    assert lttb(np.arange(5), np.arange(5), 10).tolist() == list(range(5))
+
+
+def test_transitions():
+    tec = np.array([0, 120, 130, 140, 120, 128, 260, 270])
+    passive, busOff = transitions(tec)
+    assert passive.tolist() == [2, 4, 5]  # crossings of PASSIVE_TEC, in both directions
+    assert busOff.tolist() == [6]  # the first sample above BUS_OFF_TEC only
+    assert transitions(np.array([200, 100]))[0].tolist() == [0, 1]  # passive from the first sample
+
+
+def test_transitions_follow_the_ecu_states():
+    """On the attack, the marks fall on the TEC changes that move the Victim to ERROR_PASSIVE and BUS_OFF."""
+    simulation = Simulation(0.003, verbose=False)
+    simulation.addECU("Victim", 7, Frame(671, 3, [217, 16, 133]))
+    simulation.addAttacker("Adversary")
+    victim = simulation.run()
+    tec, _ = victim.getTECs().toNumpy()
+
+    passive, busOff = transitions(tec)
+    assert victim.getStatus() == ECU.BUS_OFF
+    assert busOff.tolist() == [len(tec) - 1]
+    assert tec[passive[0] - 1] <= ECU.PASSIVE_LIMIT < tec[passive[0]]
+
+
+def test_plot_is_rendered_to_a_file(tmp_path):
+    pytest.importorskip("matplotlib")
+    histories = [randomWalk(20000, seed) for seed in range(3)] + [[]]  # the last ECU did not start
+    path = str(tmp_path / "tec.png")
+    plotTECs(histories, ["Victim", "Adversary", "ECU1", "ECU2"], 0.003, path, maxPoints=500)
+    assert os.path.getsize(path) > 0
@@ -0,0 +1,65 @@
+"""
+Tests of GlobalClock.waitUntil: the waiters are woken in the order of their target ticks, never early.
+"""
+
+import threading
+
+from global_clock import GlobalClock
+
+
+def runClock(period: float) -> tuple:
+    stop = threading.Event()
+    clock = GlobalClock(period, stop)
+    thread = threading.Thread(target=clock.start, daemon=True)
+    thread.start()
+    return clock, stop, thread
+
+
+def test_waiters_wake_in_tick_order():
+    clock, stop, thread = runClock(0.005)
+    woken = []
+    lock = threading.Lock()
+
+    def waiter(target: int):
+        reached = clock.waitUntil(target)
+        with lock:
+            woken.append((target, reached, clock.getTick()))
+
+    targets = [40, 10, 30, 20, 10]  # registered out of order, two on the same tick
+    waiters = [threading.Thread(target=waiter, args=(target,), daemon=True) for target in targets]
+    try:
+        for waiterThread in waiters:
+            waiterThread.start()
+        for waiterThread in waiters:
+            waiterThread.join(timeout=10)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert [target for target, _, _ in woken] == sorted(targets)
+    for target, reached, tick in woken:
+        assert reached == target
+        assert tick >= target  # never woken before the tick
+
+
+def test_successive_waits_of_one_thread():
+    clock, stop, thread = runClock(0.002)
+    try:
+        reached = [clock.waitUntil(target) for target in (3, 6, 9)]
+        assert reached == [3, 6, 9]
+        assert clock.getTick() >= 9
+        start = clock.waitTicks(4) - 4
+        assert start >= 9
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_reached_tick_returns_immediately():
+    clock, stop, thread = runClock(0.002)
+    try:
+        clock.waitUntil(5)
+        assert clock.waitUntil(2) >= 5  # the current tick, without blocking
+    finally:
+        stop.set()
+        thread.join()